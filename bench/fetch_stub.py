@@ -0,0 +1,92 @@
+"""
+Local stand-in for a rate-limited market-data provider.
+
+`ThrottlingProvider` serves synthetic bars like a remote provider would:
+each request takes `latency` seconds plus `latency_per_request` for every
+other request in flight, requests beyond `capacity` concurrent or `rate` per
+second are rejected with `ThrottledError` (HTTP 429), and `failing` symbols
+always raise a connection error. Used to exercise `core.fetch_control`
+without touching the network.
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, Optional
+
+from bench.synthetic import generate_ohlcv
+from core.data_fetch import DataProvider, ThrottledError
+
+
+class ThrottlingProvider(DataProvider):
+    name = "stub"
+    remote = True
+
+    def __init__(self, capacity: int = 4, rate: float = 0, latency: float = 0.005,
+                 latency_per_request: float = 0.002, failing: Iterable[str] = (), frames: Optional[Dict] = None):
+        self.capacity = capacity
+        self.rate = rate
+        self.latency = latency
+        self.latency_per_request = latency_per_request
+        self.failing = set(failing)
+        self.frames = frames or {}
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.stats = {"requests": 0, "served": 0, "throttled": 0, "failed": 0}
+        self._window = [0, 0]
+        self._lock = threading.Lock()
+
+    def fetch(self, symbol, period=None, interval=None):
+        with self._lock:
+            self.stats["requests"] += 1
+            second = int(time.monotonic())
+            if self._window[0] != second:
+                self._window = [second, 0]
+            self._window[1] += 1
+            if self.in_flight >= self.capacity or (self.rate and self._window[1] > self.rate):
+                self.stats["throttled"] += 1
+                raise ThrottledError(f"{symbol}: 429 Too Many Requests")
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            delay = self.latency + self.latency_per_request * (self.in_flight - 1)
+        try:
+            time.sleep(delay)
+            if symbol in self.failing:
+                self.stats["failed"] += 1
+                raise ConnectionError(f"{symbol}: connection reset")
+            self.stats["served"] += 1
+            return self.frames[symbol] if symbol in self.frames else generate_ohlcv(symbol)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+class SessionProvider(DataProvider):
+    """
+    Serves today's session at the requested interval, built per request like
+    a provider response would be: 375 rows at 1m, one row at 1d. `rows`
+    counts the rows served, i.e. the payload a remote provider would send.
+    Local, so the fetch controller's rate limit stays out of the timings.
+    """
+
+    name = "session-stub"
+
+    def __init__(self, end: str = "2026-02-13 15:29"):
+        self.end = end
+        self.rows = 0
+
+    def fetch(self, symbol, period=None, interval=None):
+        import numpy as np
+        import pandas as pd
+
+        interval = interval or "5m"
+        if interval.endswith("d"):
+            index = pd.DatetimeIndex([pd.Timestamp(self.end).normalize()])
+        else:
+            step = pd.Timedelta(interval.replace("m", "min"))
+            index = pd.date_range(end=self.end, periods=int(pd.Timedelta("375min") / step), freq=step)
+        n = len(index)
+        close = 100.0 + np.cumsum(np.full(n, 0.01))
+        self.rows += n
+        columns = pd.MultiIndex.from_product([["Open", "High", "Low", "Close", "Adj Close", "Volume"], [symbol + ".NS"]])
+        values = np.column_stack([close, close + 0.1, close - 0.1, close, close, np.full(n, 1000.0)])
+        return pd.DataFrame(values, index=index.tz_localize("Asia/Kolkata"), columns=columns)
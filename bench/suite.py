@@ -0,0 +1,301 @@
+"""
+Benchmark runner for the scan hot path.
+
+Runs fully offline: market data comes from `bench.synthetic`, news and the
+FinBERT model are stubbed, and snapshots/graphs go to a temporary
+directory. Results are compared against `bench/baselines.json` and any case
+slower than its baseline by more than the threshold is flagged.
+"""
+
+import json
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+from bench.synthetic import generate_ohlcv, synthetic_symbols
+from core.bars import Bars
+from infra.logging import log
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baselines.json")
+DEFAULT_THRESHOLD = 0.25
+
+
+@contextmanager
+def offline_environment(frames: Dict, positions: Optional[List[str]] = None):
+    """Patch network, model and filesystem touch points used by a scan."""
+    import core.data_fetch as data_fetch
+    import infra.database as database
+    import infra.monitor as monitor
+    import service.reference as reference
+    import service.research as research
+
+    positions = positions or []
+    patched = {
+        # like the real fetch_data: provider frame in, compact Bars out
+        (research, "fetch_data"): lambda symbol: Bars.from_frame(
+            frames[symbol] if symbol in frames else generate_ohlcv(symbol)
+        ),
+        (research, "fetch_news"): lambda symbol: [],
+        (research, "finbert_sentiment"): lambda headlines: "neutral",
+        (research, "get_open_positions"): lambda: [{"symbol": s, "qty": 1.0, "price": 0.0} for s in positions],
+        # a local provider: bars come from `frames`, so no fetch controller or prefetching
+        (data_fetch, "_provider"): data_fetch.DataProvider(),
+    }
+    with tempfile.TemporaryDirectory(prefix="fin_assist_bench_") as tmp:
+        patched[(monitor, "ANALYSIS_DIR")] = os.path.join(tmp, "analysis")
+        patched[(monitor, "GRAPH_DIR")] = os.path.join(tmp, "graphs")
+        patched[(database, "DB_PATH")] = os.path.join(tmp, "market.db")
+        patched[(reference, "REFERENCE_FILE")] = os.path.join(tmp, "reference.npz")
+        patched[(reference, "_data")] = None
+        saved = {key: getattr(*key) for key in patched}
+        level = log.level
+        try:
+            for (module, name), value in patched.items():
+                setattr(module, name, value)
+            log.setLevel(logging.WARNING)
+            database.initialize_db()
+            yield tmp
+        finally:
+            for (module, name), value in saved.items():
+                setattr(module, name, value)
+            log.setLevel(level)
+
+
+def _time(fn: Callable[[], None], ops: int, repeat: int) -> float:
+    """Median seconds per op over `repeat` rounds of `fn` (which does `ops` ops)."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) / ops)
+    return statistics.median(samples)
+
+
+def _peak_kb(fn: Callable[[], None]) -> float:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def _log_case(log_dir: str, async_mode: bool, records: int) -> Callable[[], None]:
+    """Caller-side cost of `records` scan-style records written to `log_dir`."""
+    from infra.logging import set_log_context, setup_logging
+
+    def bench_log():
+        setup_logging(log_dir=log_dir, async_mode=async_mode, console=False)
+        set_log_context(scan_id="bench", symbol="SYN0001")
+        try:
+            # WARNING is exempt from sampling/rate limiting, so every record is written
+            for i in range(records):
+                log.warning("%s: BUY intraday support (%s->%s, vol %.0f)", "SYN0001", 100.0, 100.5 + i, 25000.0)
+        finally:
+            set_log_context(scan_id=None, symbol=None)
+
+    return bench_log
+
+
+def _fetch_case(symbols: List[str], frames: Dict) -> Callable[[], None]:
+    """Prefetched fetches of `symbols` through a fresh controller against a throttling stub."""
+    from bench.fetch_stub import ThrottlingProvider
+    from core.fetch_control import FetchController, Prefetcher
+
+    def bench_fetch():
+        provider = ThrottlingProvider(capacity=6, frames=frames)
+        control = FetchController(rate=0, min_concurrency=1, max_concurrency=16, max_attempts=8,
+                                  backoff=0.002, breaker_fails=3, breaker_cooldown=60)
+        prefetch = Prefetcher(symbols, lambda s: control.fetch(s, lambda: provider.fetch(s)), control=control)
+        try:
+            for symbol in symbols:
+                prefetch.fetch(symbol)
+        finally:
+            prefetch.close()
+
+    return bench_fetch
+
+
+def _timeframe_case(symbols: List[str]) -> Callable[[], None]:
+    """Higher-timeframe refresh per symbol after one new base bar (resample + features)."""
+    from core.indicators import timeframe_features
+    from core.timeframes import TimeframeCache
+
+    frames = {sym: Bars.from_frame(generate_ohlcv(sym, days=6)) for sym in symbols}
+    tf_cache = TimeframeCache(max_entries=4 * len(symbols))
+    step = [0]
+
+    def bench_timeframes():
+        step[0] += 1
+        for sym in symbols:
+            window = frames[sym][step[0]: step[0] + 375]
+            for bars in tf_cache.frames(sym, window).values():
+                timeframe_features(bars)
+
+    return bench_timeframes
+
+
+def _quote_case(symbols: List[str], interval: str) -> Callable[[], None]:
+    """Quote misses answered by the fallback fetch of `interval` bars."""
+    import core.data_fetch as data_fetch
+    import core.quotes as quotes
+    from bench.fetch_stub import SessionProvider
+
+    def bench_quotes():
+        service = quotes.QuoteService()
+        saved = data_fetch._provider, quotes.QUOTE_FETCH_INTERVAL
+        data_fetch._provider, quotes.QUOTE_FETCH_INTERVAL = SessionProvider(), interval
+        try:
+            for symbol in symbols:
+                service._fetch(symbol, time.time())
+        finally:
+            data_fetch._provider, quotes.QUOTE_FETCH_INTERVAL = saved
+
+    return bench_quotes
+
+
+def run_suite(symbols: int = 200, repeat: int = 3, cases: Optional[List[str]] = None) -> Dict[str, Dict]:
+    from config.settings import QUOTE_FETCH_INTERVAL
+    from core.decision_engine import decide
+    from core.feature_cache import cache as feature_cache
+    from core.indicators import compute_features
+    from infra import monitor
+    from service.research import perform_scan
+
+    universe = synthetic_symbols(symbols)
+    frames = {sym: generate_ohlcv(sym) for sym in universe}
+    sample = universe[: min(len(universe), 50)]
+    positions = universe[:: max(1, len(universe) // 10)][:10]
+    bars = {sym: Bars.from_frame(frames[sym]) for sym in sample}
+    features = {sym: compute_features(bars[sym]) for sym in sample}
+    held = set(positions)
+
+    def bench_features():
+        for sym in sample:
+            compute_features(bars[sym])
+
+    def bench_decide():
+        for sym in sample:
+            decide(sym, features[sym], "neutral", open_positions=held)
+
+    def bench_snapshot():
+        for sym in sample:
+            monitor.record_snapshot(sym, features[sym], "2026-02-13T10:00:00")
+
+    graph_sample = sample[:10]
+
+    def bench_graph():
+        for sym in graph_sample:
+            monitor.save_intraday_graph(sym, bars[sym].tail(90), "bench")
+
+    def bench_scan():
+        # cold scan: every symbol goes through fetch + features
+        feature_cache.clear()
+        perform_scan(symbols=universe, top_n=5)
+
+    log_dir = tempfile.mkdtemp(prefix="fin_assist_bench_logs_")
+    log_records = 2000
+    registry = {
+        "compute_features": (bench_features, len(sample)),
+        "decide": (bench_decide, len(sample)),
+        "record_snapshot": (bench_snapshot, len(sample)),
+        "save_intraday_graph": (bench_graph, len(graph_sample)),
+        f"perform_scan[{symbols}]": (bench_scan, 1),
+        "log_record_sync": (_log_case(log_dir, False, log_records), log_records),
+        "log_record_async": (_log_case(log_dir, True, log_records), log_records),
+        f"fetch_throttled[{symbols}]": (_fetch_case(universe, frames), symbols),
+        "timeframes": (_timeframe_case(sample), len(sample)),
+        # the configured fallback against the old 1m session fetch
+        f"quote_fetch[{QUOTE_FETCH_INTERVAL}]": (_quote_case(sample, QUOTE_FETCH_INTERVAL), len(sample)),
+        "quote_fetch[1m]": (_quote_case(sample, "1m"), len(sample)),
+    }
+    results = {}
+    with offline_environment(frames, positions):
+        for name, (fn, ops) in registry.items():
+            if cases and name.split("[")[0] not in cases:
+                continue
+            fn()  # warm-up: imports, matplotlib font cache, pandas code paths
+            results[name] = {"seconds": _time(fn, ops, repeat), "ops": ops}
+            if name.startswith("perform_scan"):
+                results[name]["peak_kb"] = _peak_kb(fn)
+    from infra.logging import setup_logging
+    setup_logging()
+    shutil.rmtree(log_dir, ignore_errors=True)
+    return results
+
+
+def load_baselines(path: str = BASELINE_FILE) -> Dict[str, Dict]:
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError) as exc:
+        log.error(f"Failed to read benchmark baselines {path}: {exc}")
+        return {}
+
+
+def save_baselines(results: Dict[str, Dict], path: str = BASELINE_FILE) -> None:
+    merged = load_baselines(path)
+    merged.update(results)
+    with open(path, "w") as f:
+        json.dump(merged, f, indent=2, sort_keys=True)
+
+
+def compare(results: Dict[str, Dict], baselines: Dict[str, Dict], threshold: float = DEFAULT_THRESHOLD) -> List[Dict]:
+    rows = []
+    for name, res in results.items():
+        base = baselines.get(name, {}).get("seconds")
+        ratio = res["seconds"] / base if base else None
+        rows.append(
+            {
+                "case": name,
+                "seconds": res["seconds"],
+                "peak_kb": res.get("peak_kb"),
+                "baseline": base,
+                "ratio": ratio,
+                "regression": ratio is not None and ratio > 1 + threshold,
+            }
+        )
+    return rows
+
+
+def format_report(rows: List[Dict], threshold: float) -> str:
+    lines = [f"{'case':<26} {'ms/op':>10} {'baseline':>10} {'ratio':>7} {'peak KiB':>9}  status"]
+    for row in rows:
+        base = f"{row['baseline'] * 1000:.3f}" if row["baseline"] else "-"
+        ratio = f"{row['ratio']:.2f}x" if row["ratio"] is not None else "-"
+        if row["baseline"] is None:
+            status = "no baseline"
+        else:
+            status = "REGRESSION" if row["regression"] else "ok"
+        peak = f"{row['peak_kb']:.0f}" if row.get("peak_kb") is not None else "-"
+        lines.append(f"{row['case']:<26} {row['seconds'] * 1000:>10.3f} {base:>10} {ratio:>7} {peak:>9}  {status}")
+    flagged = sum(1 for row in rows if row["regression"])
+    lines.append(f"{flagged} regression(s) beyond {threshold:.0%} threshold.")
+    return "\n".join(lines)
+
+
+def main(
+    symbols: int = 200,
+    repeat: int = 3,
+    threshold: float = DEFAULT_THRESHOLD,
+    update_baseline: bool = False,
+    cases: Optional[List[str]] = None,
+) -> int:
+    results = run_suite(symbols=symbols, repeat=repeat, cases=cases)
+    rows = compare(results, load_baselines(), threshold)
+    print(format_report(rows, threshold))
+    if update_baseline:
+        save_baselines(results)
+        print(f"Baselines written to {BASELINE_FILE}")
+        return 0
+    return 1 if any(row["regression"] for row in rows) else 0
@@ -0,0 +1,62 @@
+"""
+Deterministic synthetic NSE-like 5m OHLCV data for benchmarks.
+
+Sessions run 09:15-15:30 IST (75 five-minute bars) on weekdays, with a
+U-shaped intraday volume profile and a per-symbol random walk seeded from
+the symbol name so every run sees identical data.
+"""
+
+import zlib
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+BARS_PER_SESSION = 75
+SESSION_OPEN = "09:15"
+TIMEZONE = "Asia/Kolkata"
+
+
+def synthetic_symbols(count: int, prefix: str = "SYN") -> List[str]:
+    width = max(4, len(str(count)))
+    return [f"{prefix}{i:0{width}d}" for i in range(count)]
+
+
+def _session_index(days: int, end: str) -> pd.DatetimeIndex:
+    sessions = pd.bdate_range(end=pd.Timestamp(end), periods=days)
+    offsets = pd.to_timedelta(np.arange(BARS_PER_SESSION) * 5, unit="min")
+    stamps = [pd.Timestamp(f"{d.date()} {SESSION_OPEN}") + offsets for d in sessions]
+    index = pd.DatetimeIndex(np.concatenate([s.values for s in stamps]))
+    return index.tz_localize(TIMEZONE)
+
+
+def generate_ohlcv(symbol: str, days: int = 5, end: str = "2026-02-13", seed: int = 0) -> pd.DataFrame:
+    """Return a yfinance-shaped OHLCV frame for `symbol`."""
+    rng = np.random.default_rng(zlib.crc32(symbol.encode()) ^ seed)
+    index = _session_index(days, end)
+    n = len(index)
+
+    base_price = float(np.exp(rng.uniform(np.log(8), np.log(3000))))
+    sigma = rng.uniform(0.0008, 0.004)
+    returns = rng.normal(0.0, sigma, n)
+    close = base_price * np.exp(np.cumsum(returns))
+    open_ = np.empty(n)
+    open_[0] = base_price
+    open_[1:] = close[:-1]
+    spread = np.abs(rng.normal(0.0, sigma, n)) * close
+    high = np.maximum(open_, close) + spread
+    low = np.minimum(open_, close) - spread
+
+    slot = np.arange(n) % BARS_PER_SESSION
+    profile = 1.0 + 1.5 * ((slot - BARS_PER_SESSION / 2) / (BARS_PER_SESSION / 2)) ** 2
+    base_volume = rng.uniform(2e4, 5e5)
+    volume = (base_volume * profile * rng.lognormal(0.0, 0.4, n)).astype(np.int64)
+
+    return pd.DataFrame(
+        {"Open": open_, "High": high, "Low": low, "Close": close, "Adj Close": close, "Volume": volume},
+        index=index,
+    )
+
+
+def generate_universe(count: int, days: int = 5, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    return {sym: generate_ohlcv(sym, days=days, seed=seed) for sym in synthetic_symbols(count)}
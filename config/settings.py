@@ -13,17 +13,112 @@ CONFIG_FILE = os.path.join(DATA_DIR, 'config.json')
 PORTFOLIO_FILE = os.path.join(DATA_DIR, 'portfolio.json')
 SYMBOLS_FILE = os.path.join(DATA_DIR, 'nse_symbols.csv')
 NEWS_CACHE_FILE = os.path.join(DATA_DIR, 'news_cache.json')
+UNIVERSE_INDEX_FILE = os.path.join(DATA_DIR, 'universe_index.csv')
 
 # Market settings
 INTERVAL = '5m'
 LOOKBACK = '5d'
 TOP_N = 5
 
+# Market data provider: 'yfinance' (live) or 'replay' (recorded sessions)
+DATA_PROVIDER = 'yfinance'
+REPLAY_DIR = os.path.join(DATA_DIR, 'replay')
+REPLAY_SPEED = 60.0
+REPLAY_WARMUP_BARS = 60
+
+# Higher timeframes resampled locally from INTERVAL bars (no extra downloads);
+# buckets are anchored at the session open
+HIGHER_TIMEFRAMES = ['15m', '1h']
+SESSION_OPEN = '09:15'
+SESSION_CLOSE = '15:30'
+# Timeframe whose trend (ema20 >= ema50) must confirm a BUY (None = off)
+MTF_TREND_FILTER = None
+
 MIN_PRICE = 5
 MIN_AVG_VOLUME = 50000
 MIN_ATR_PCT = 0.2
 MAX_ATR_PCT = 8.0
 
+# Feature cache (per symbol/interval, reused within a bar)
+FEATURE_CACHE_SIZE = 1000
+FEATURE_CACHE_SPILL = False
+FEATURE_CACHE_DIR = os.path.join(DATA_DIR, 'feature_cache')
+
+# Sharded scanning (0 workers = scan in-process)
+SCAN_WORKERS = 0
+SCAN_QUEUE_DB = os.path.join(DATA_DIR, 'scan_queue.db')
+SCAN_SHARD_SIZE = 50
+SCAN_LEASE_SECONDS = 60
+SCAN_SHARD_MAX_ATTEMPTS = 3
+
+# Decision history: outcome horizon in bars, default summary window in days
+DECISION_OUTCOME_BARS = 12
+DECISION_HISTORY_DAYS = 30
+
+# Logging: queue-backed handlers, JSON file records, per-module DEBUG sampling
+# (fraction kept) and a DEBUG/INFO cap per module per second (0 = off)
+LOG_ASYNC = True
+LOG_JSON = False
+LOG_SAMPLE_RATES = {'indicators': 0.1, 'data_fetch': 0.1, 'research': 0.1, 'decision_engine': 0.1}
+LOG_RATE_LIMIT = 200
+
+# Remote fetch throttling: token bucket (requests/s, burst), adaptive
+# concurrency bounds, retries with jittered backoff and a per-symbol breaker
+FETCH_RATE = 5.0
+FETCH_BURST = 10
+FETCH_MIN_CONCURRENCY = 2
+FETCH_MAX_CONCURRENCY = 16
+FETCH_MAX_ATTEMPTS = 4
+FETCH_BACKOFF_SECONDS = 0.5
+FETCH_LATENCY_SPIKE = 3.0
+FETCH_BREAKER_FAILS = 3
+FETCH_BREAKER_COOLDOWN = 300
+
+# On-demand profiling (--profile, /profile next): output directory, sampling
+# interval in seconds, hotspots per summary and profile runs kept
+PROFILE_DIR = os.path.join(BASE_DIR, 'logs', 'profiles')
+PROFILE_SAMPLE_INTERVAL = 0.005
+PROFILE_TOP_N = 25
+PROFILE_KEEP = 20
+
+# Latest-quote cache shared by scanner and Telegram listener
+QUOTE_TTL_SECONDS = 60
+QUOTE_CACHE_SIZE = 5000
+# Fallback fetch on a quote miss: today's daily bar, whose close is the last price
+QUOTE_FETCH_PERIOD = '1d'
+QUOTE_FETCH_INTERVAL = '1d'
+
+# In-memory news headlines kept (LRU; entries also expire after NEWS_TTL_SECONDS)
+NEWS_CACHE_SIZE = 2000
+
+# Memory guard: RSS check interval and report interval in seconds, soft RSS
+# limit in MiB that triggers cache trimming (0 = off), fraction of each cache
+# trimmed, and tracemalloc allocation sites per report (0 = tracemalloc off)
+MEMORY_CHECK_SECONDS = 30
+MEMORY_REPORT_SECONDS = 900
+MEMORY_SOFT_LIMIT_MB = 1024
+MEMORY_TRIM_FRACTION = 0.5
+MEMORY_TRACEMALLOC_TOP = 0
+
+# Universe index (end-of-day liquidity ranking)
+UNIVERSE_CORE_SIZE = 100
+UNIVERSE_QUARANTINE_FAILS = 3
+UNIVERSE_FILTER_SLACK = 0.5
+UNIVERSE_REBUILD_AFTER = '15:45'
+
+# Daily reference data (20-day volume/ATR, previous close, typical volume per
+# intraday slot), rebuilt after the close
+REFERENCE_FILE = os.path.join(DATA_DIR, 'reference.npz')
+REFERENCE_LOOKBACK = '30d'
+REFERENCE_REBUILD_AFTER = '15:50'
+# Opt-in strategy change: compare BUY volume against the slot's typical volume
+# instead of the last 20 bars (changes which symbols qualify as BUY)
+REFERENCE_VOLUME_BASELINE = False
+
+# Scheduler cadence per tier in seconds (portfolio / watchlist + core / long tail)
+SCAN_TIER_INTERVALS = {'portfolio': 300, 'watchlist': 900, 'long_tail': 3600}
+WATCHLIST = []
+
 # Intraday strategy knobs
 INTRADAY_LOW_BUFFER = 0.005
 INTRADAY_HIGH_BUFFER = 0.01
@@ -34,6 +129,28 @@ INTRADAY_SELL_RSI_THRESHOLD = 55
 MONITOR_GRAPH_POINTS = 90
 MONITOR_MAX_SELL_GRAPHS = 5
 
+# Streaming scan output: progress message every N symbols (0 disables)
+SCAN_PROGRESS_EVERY = 100
+
+# Scan deadlines: whole-scan budget in market seconds (None = no deadline; a
+# replay clock shortens it), per-stage timeouts and the pool running them
+SCAN_DEADLINE_SECONDS = 240
+SCAN_STAGE_TIMEOUTS = {'fetch': 20, 'news': 8}
+SCAN_STAGE_WORKERS = 8
+# Carry-over of deferred symbols: at most this many kept, and a symbol is
+# dropped after this many timeouts/unavailable fetches in a row
+SCAN_CARRYOVER_MAX = 500
+SCAN_CARRYOVER_MAX_ATTEMPTS = 3
+
+# Scan telemetry
+METRICS_HISTORY = 50
+METRICS_PORT = 9108
+METRICS_HOST = '127.0.0.1'
+
+# Local HTTP API over the latest scan (0 disables); scheduler mode only, like the exporter
+API_PORT = 9109
+API_HOST = '127.0.0.1'
+
 # Load config values if present
 NEWS_API_KEY = None
 TELEGRAM_BOT_TOKEN = None
@@ -0,0 +1,143 @@
+"""
+Compact array-backed OHLCV bars for the scan hot path.
+
+`Bars` holds one contiguous array per field: float32 open/high/low/close,
+int64 volume and int64 bar timestamps (UTC nanoseconds) plus the timezone
+they are shown in. Slicing (`bars[a:b]`, `tail`) returns views, so nothing is
+copied until `copy()` is asked for. A symbol's lookback window takes a bit
+over half the memory of the provider's DataFrame and, unlike the DataFrame,
+does not grow derived columns while features are computed.
+
+pandas stays at the edges: providers return DataFrames, which
+`Bars.from_frame` converts once per fetch, and `to_frame`/`index` build them
+back for callers that still want one. `to_payload`/`from_payload` carry bars
+between processes as plain JSON-safe lists.
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+_DAY_NS = 86_400 * 10**9
+
+
+class Bars:
+    __slots__ = ("ts", "open", "high", "low", "close", "volume", "tz")
+
+    def __init__(self, ts, open, high, low, close, volume, tz=None):
+        self.ts = ts
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.tz = tz
+
+    @classmethod
+    def from_frame(cls, df) -> "Bars":
+        """OHLCV rows of `df` (yfinance-shaped, NaN rows dropped) as arrays."""
+        if isinstance(df, Bars):
+            return df
+        if df is None or df.empty:
+            return cls.empty_bars()
+        if getattr(df.columns, "nlevels", 1) > 1:
+            df = df.droplevel(list(range(1, df.columns.nlevels)), axis=1)
+        # one block conversion, then pick the columns: much cheaper than df[FIELDS]
+        columns = [df.columns.get_loc(field) for field in FIELDS]
+        values = df.to_numpy(dtype=np.float64)[:, columns]
+        keep = ~np.isnan(values).any(axis=1)
+        index = df.index[keep] if not keep.all() else df.index
+        values = values[keep]
+        if hasattr(index, "as_unit"):
+            index = index.as_unit("ns")
+        return cls(
+            np.ascontiguousarray(index.asi8),
+            *(np.ascontiguousarray(values[:, i], dtype=np.float32) for i in range(4)),
+            values[:, 4].astype(np.int64),
+            getattr(index, "tz", None),
+        )
+
+    @classmethod
+    def empty_bars(cls, tz=None) -> "Bars":
+        price = np.empty(0, dtype=np.float32)
+        return cls(np.empty(0, dtype=np.int64), price, price, price, price, np.empty(0, dtype=np.int64), tz)
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    @property
+    def empty(self) -> bool:
+        return not len(self.ts)
+
+    def __getitem__(self, key: slice) -> "Bars":
+        """A view of the bars in `key` (a slice)."""
+        return Bars(self.ts[key], self.open[key], self.high[key], self.low[key], self.close[key],
+                    self.volume[key], self.tz)
+
+    def tail(self, n: int) -> "Bars":
+        return self[max(0, len(self) - n):]
+
+    def copy(self) -> "Bars":
+        """Detached copy, e.g. to keep a tail without pinning the full window."""
+        return Bars(self.ts.copy(), self.open.copy(), self.high.copy(), self.low.copy(), self.close.copy(),
+                    self.volume.copy(), self.tz)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(getattr(self, name).nbytes for name in self.__slots__[:-1])
+
+    def timestamp(self, i: int = -1) -> pd.Timestamp:
+        """Timestamp of bar `i` in the bars' timezone."""
+        stamp = pd.Timestamp(int(self.ts[i]))
+        return stamp.tz_localize("UTC").tz_convert(self.tz) if self.tz is not None else stamp
+
+    def session_start(self) -> int:
+        """Position of the first bar on the same (local) day as the last bar."""
+        if self.empty:
+            return 0
+        offset = self.timestamp(-1).utcoffset()
+        local = self.ts + (int(offset.total_seconds()) * 10**9 if offset else 0)
+        day = local // _DAY_NS
+        return int(np.searchsorted(day, day[-1]))
+
+    def search(self, stamp) -> int:
+        """Position of `stamp` (anything `pd.Timestamp` accepts), or where it would go."""
+        value = pd.Timestamp(stamp)
+        if value.tzinfo is None and self.tz is not None:
+            value = value.tz_localize(self.tz)
+        return int(np.searchsorted(self.ts, value.as_unit("ns").value))
+
+    @property
+    def index(self) -> pd.DatetimeIndex:
+        index = pd.DatetimeIndex(self.ts.view("datetime64[ns]"))
+        return index.tz_localize("UTC").tz_convert(self.tz) if self.tz is not None else index
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {"Open": self.open, "High": self.high, "Low": self.low, "Close": self.close, "Volume": self.volume},
+            index=self.index,
+        )
+
+    def to_payload(self) -> dict:
+        """JSON-safe copy (lists plus the timezone name), e.g. for a shard result."""
+        payload = {name: getattr(self, name).tolist() for name in self.__slots__[:-1]}
+        payload["tz"] = None if self.tz is None else str(self.tz)
+        return payload
+
+    @classmethod
+    def from_payload(cls, payload: dict) -> "Bars":
+        price = lambda name: np.asarray(payload[name], dtype=np.float32)
+        return cls(np.asarray(payload["ts"], dtype=np.int64), price("open"), price("high"), price("low"),
+                   price("close"), np.asarray(payload["volume"], dtype=np.int64), payload["tz"])
+
+    def __repr__(self) -> str:
+        if self.empty:
+            return "Bars(empty)"
+        return f"Bars({len(self)} bars, {self.timestamp(0)} .. {self.timestamp(-1)})"
+
+
+def as_bars(data) -> Optional[Bars]:
+    """`data` as `Bars` (DataFrames are converted); None stays None."""
+    return None if data is None else Bars.from_frame(data)
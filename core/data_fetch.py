@@ -1,24 +1,242 @@
 """
 Stock data fetching logic (yfinance, NSE).
+
+`fetch_data` delegates to the active `DataProvider`: yfinance by default, or
+a `ReplayProvider` that serves recorded sessions from `REPLAY_DIR` bar by bar
+at `REPLAY_SPEED` times real time so the whole pipeline can run offline.
+Remote providers are called through `core.fetch_control.controller`, which
+rate-limits, retries and raises `FetchUnavailable` instead of returning an
+empty frame when the provider keeps failing. The scan path (`fetch_data`)
+gets `core.bars.Bars`; other callers get the provider's DataFrame.
 """
+import os
+import time
+from typing import Dict, List, Optional
+
+from core.fetch_control import FetchUnavailable, ThrottledError, controller
+from infra import metrics
 from infra.logging import log
 from config import settings as cfg
 
+MARKET_TIMEZONE = "Asia/Kolkata"
 
-def fetch_data(symbol):
-    # Moved from market_assistant.py
-    import yfinance as yf
-    log.debug(f"Fetching data for {symbol}")
-    try:
-        df = yf.download(
-            symbol + ".NS",
-            period=cfg.LOOKBACK,
-            interval=cfg.INTERVAL,
-            progress=False
-        )
-        log.debug(f"Fetched {len(df)} rows for {symbol}")
+
+def flatten_columns(df):
+    # yfinance returns (field, ticker) MultiIndex columns for single downloads
+    if getattr(df.columns, "nlevels", 1) > 1:
+        df = df.copy()
+        df.columns = df.columns.get_level_values(0)
+    return df
+
+
+def _interval_delta(interval):
+    import pandas as pd
+    return pd.Timedelta(interval.replace("m", "min") if interval.endswith("m") else interval)
+
+
+class DataProvider:
+    """Source of OHLCV bars for a symbol."""
+
+    name = "base"
+    # Remote providers go through the fetch controller (rate limit, retries, breaker).
+    remote = False
+    # Virtual seconds that pass per wall-clock second; loops scale sleeps by it.
+    clock_speed = 1.0
+
+    def fetch(self, symbol, period=None, interval=None):
+        raise NotImplementedError
+
+    def current_bar(self) -> int:
+        """Identifier of the bar in progress; changes whenever a new bar opens."""
+        return int(time.time() // _interval_delta(cfg.INTERVAL).total_seconds())
+
+
+_THROTTLE_MARKERS = ("rate limit", "too many requests", "429")
+
+
+def _is_throttle(error) -> bool:
+    text = str(error).lower()
+    return any(marker in text for marker in _THROTTLE_MARKERS)
+
+
+class YFinanceProvider(DataProvider):
+    """
+    Yahoo Finance via yfinance. Raises `ThrottledError` on rate limiting and
+    lets transport errors propagate so the fetch controller can retry them;
+    an empty frame means Yahoo has no data for the symbol.
+    """
+
+    name = "yfinance"
+    remote = True
+
+    def fetch(self, symbol, period=None, interval=None):
+        import yfinance as yf
+        ticker = symbol + ".NS"
+        log.debug("Fetching data for %s", symbol)
+        try:
+            df = yf.download(
+                ticker,
+                period=period or cfg.LOOKBACK,
+                interval=interval or cfg.INTERVAL,
+                progress=False
+            )
+        except Exception as e:
+            metrics.incr("fetch_error")
+            if _is_throttle(e):
+                raise ThrottledError(f"{symbol}: {e}") from e
+            raise
+        # yf.download records per-ticker failures in yf.shared._ERRORS instead of raising
+        error = yf.shared._ERRORS.get(ticker)
+        if error and _is_throttle(error):
+            raise ThrottledError(f"{symbol}: {error}")
+        log.debug("Fetched %d rows for %s", len(df), symbol)
         return df
-    except Exception as e:
-        log.error(f"Failed to fetch data for {symbol}: {e}", exc_info=True)
+
+
+class ReplayProvider(DataProvider):
+    """
+    Serve recorded sessions (`{REPLAY_DIR}/{SYMBOL}.csv`) as if live.
+
+    The replay clock walks the union of recorded bar timestamps, so overnight
+    and weekend gaps are skipped. It starts `warmup_bars` bars in and advances
+    one bar every `bar / speed` wall seconds; only bars that have closed on the
+    replay clock are returned. With `speed <= 0` the clock only moves through
+    `advance()`, which keeps runs fully deterministic.
+    """
+
+    name = "replay"
+
+    def __init__(self, directory=None, speed=None, warmup_bars=None, interval=None):
         import pandas as pd
-        return pd.DataFrame()
+        self.directory = directory or cfg.REPLAY_DIR
+        self.speed = cfg.REPLAY_SPEED if speed is None else float(speed)
+        self.clock_speed = self.speed if self.speed > 0 else 1.0
+        self.interval = interval or cfg.INTERVAL
+        self._bar_seconds = _interval_delta(self.interval).total_seconds()
+        self._frames: Dict[str, "pd.DataFrame"] = {}
+        for symbol in self.symbols():
+            try:
+                self._frames[symbol] = self._read(symbol)
+            except Exception as e:
+                log.error(f"Failed to load replay data for {symbol}: {e}", exc_info=True)
+        stamps = [df.index for df in self._frames.values() if not df.empty]
+        self._timeline = stamps[0].append(stamps[1:]).unique().sort_values() if stamps else pd.DatetimeIndex([])
+        self._start_bar = cfg.REPLAY_WARMUP_BARS if warmup_bars is None else warmup_bars
+        self._wall_start = time.monotonic()
+        self._manual_bars = 0
+        log.info(
+            f"Replay provider: {len(self._frames)} symbols, {len(self._timeline)} bars "
+            f"from {self.directory} at {self.speed}x"
+        )
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(f[:-4].upper() for f in os.listdir(self.directory) if f.endswith(".csv"))
+
+    def _read(self, symbol):
+        import pandas as pd
+        df = pd.read_csv(os.path.join(self.directory, f"{symbol}.csv"), index_col=0)
+        df.index = pd.to_datetime(df.index, utc=True).tz_convert(MARKET_TIMEZONE)
+        return df.sort_index()
+
+    def position(self) -> int:
+        """Index into the timeline of the bar currently in progress."""
+        elapsed_bars = 0
+        if self.speed > 0:
+            elapsed_bars = int((time.monotonic() - self._wall_start) * self.speed / self._bar_seconds)
+        return self._start_bar + elapsed_bars + self._manual_bars
+
+    def current_bar(self) -> int:
+        return self.position()
+
+    def now(self):
+        pos = self.position()
+        if pos < len(self._timeline):
+            return self._timeline[pos]
+        return self._timeline[-1] if len(self._timeline) else None
+
+    def finished(self) -> bool:
+        return self.position() >= len(self._timeline)
+
+    def advance(self, bars: int = 1) -> None:
+        self._manual_bars += bars
+
+    def fetch(self, symbol, period=None, interval=None):
+        import pandas as pd
+        df = self._frames.get(symbol)
+        if df is None or df.empty:
+            log.debug("No replay data for %s", symbol)
+            return pd.DataFrame()
+        pos = self.position()
+        visible = df[df.index < self._timeline[pos]] if pos < len(self._timeline) else df
+        lookback = period or cfg.LOOKBACK
+        if lookback.endswith("d") and not visible.empty:
+            visible = visible[visible.index > visible.index[-1] - pd.Timedelta(days=int(lookback[:-1]))]
+        log.debug("Replayed %d rows for %s (bar %d/%d)", len(visible), symbol, pos, len(self._timeline))
+        return visible
+
+
+_PROVIDERS = {
+    "yfinance": YFinanceProvider,
+    "replay": ReplayProvider,
+}
+_provider: Optional[DataProvider] = None
+
+
+def get_provider() -> DataProvider:
+    global _provider
+    if _provider is None:
+        factory = _PROVIDERS.get(cfg.DATA_PROVIDER)
+        if factory is None:
+            log.error(f"Unknown DATA_PROVIDER {cfg.DATA_PROVIDER!r}, falling back to yfinance")
+            factory = YFinanceProvider
+        _provider = factory()
+    return _provider
+
+
+def set_provider(provider) -> DataProvider:
+    """Install a provider instance (or a registered provider name)."""
+    global _provider
+    if isinstance(provider, str):
+        provider = _PROVIDERS[provider]()
+    _provider = provider
+    return _provider
+
+
+def fetch_bars(symbol, period=None, interval=None, provider=None):
+    """
+    Bars for `symbol` from `provider` (default: the active one). Remote
+    providers go through the fetch controller and may raise `FetchUnavailable`.
+    """
+    provider = provider or get_provider()
+    if provider.remote:
+        return controller.fetch(symbol, lambda: provider.fetch(symbol, period, interval))
+    return provider.fetch(symbol, period, interval)
+
+
+def fetch_data(symbol):
+    """Lookback window of `symbol` as compact `Bars` (the scan hot path)."""
+    from core.bars import Bars
+    return Bars.from_frame(fetch_bars(symbol))
+
+
+def record_session(symbols, directory=None, provider=None) -> int:
+    """Save the current lookback window of each symbol for later replay."""
+    directory = directory or cfg.REPLAY_DIR
+    provider = provider or YFinanceProvider()
+    os.makedirs(directory, exist_ok=True)
+    saved = 0
+    for symbol in symbols:
+        try:
+            df = fetch_bars(symbol, provider=provider)
+        except FetchUnavailable as exc:
+            log.error(f"Not recording {symbol}: {exc}")
+            continue
+        if df is None or df.empty:
+            continue
+        df = flatten_columns(df)
+        df.to_csv(os.path.join(directory, f"{symbol}.csv"))
+        saved += 1
+    log.info(f"Recorded {saved}/{len(symbols)} sessions to {directory}")
+    return saved
@@ -10,6 +10,8 @@ def decide(symbol, f, sentiment, open_positions=None):
         INTRADAY_LOW_BUFFER,
         INTRADAY_VOLUME_MULTIPLIER,
         INTRADAY_SELL_RSI_THRESHOLD,
+        MTF_TREND_FILTER,
+        REFERENCE_VOLUME_BASELINE,
     )
 
     if open_positions is None:
@@ -18,7 +20,9 @@ def decide(symbol, f, sentiment, open_positions=None):
     price = f.get("price", 0.0)
     session_low = max(f.get("session_low", price), 0.0)
     session_high = max(f.get("session_high", price), 0.0)
-    avg_volume = max(f.get("avg_volume", 0.0), 1.0)
+    # the slot's typical volume (daily reference data) when known, else the last 20 bars
+    baseline = f.get("typical_volume") if REFERENCE_VOLUME_BASELINE else None
+    avg_volume = max(baseline or f.get("avg_volume", 0.0), 1.0)
     volume = f.get("volume", 0.0)
     vwap = f.get("vwap", price)
     rsi = f.get("rsi", 50.0)
@@ -31,14 +35,18 @@ def decide(symbol, f, sentiment, open_positions=None):
     if symbol in open_positions:
         sell_target = session_high and price >= session_high * (1 - INTRADAY_HIGH_BUFFER)
         if sell_target and rsi >= INTRADAY_SELL_RSI_THRESHOLD:
-            log.info(f"{symbol}: SELL (profit target near intraday high)")
+            log.info("%s: SELL (profit target near intraday high)", symbol)
             return "SELL"
-        log.info(f"{symbol}: HOLD (in portfolio, no sell trigger)")
+        log.debug("%s: HOLD (in portfolio, no sell trigger)", symbol)
         return "HOLD"
 
     if buy_close_to_low and buy_volume_ok and buy_below_vwap and buy_momentum:
-        log.info(f"{symbol}: BUY intraday support ({session_low}->{price}, vol {volume:.0f})")
+        trend = (f.get("timeframes") or {}).get(MTF_TREND_FILTER) if MTF_TREND_FILTER else None
+        if trend and trend["ema20"] < trend["ema50"]:
+            log.debug("%s: IGNORE (intraday buy trigger against %s downtrend)", symbol, MTF_TREND_FILTER)
+            return "IGNORE"
+        log.info("%s: BUY intraday support (%s->%s, vol %.0f)", symbol, session_low, price, volume)
         return "BUY"
 
-    log.debug(f"{symbol}: IGNORE (no intraday buy trigger)")
+    log.debug("%s: IGNORE (no intraday buy trigger)", symbol)
     return "IGNORE"
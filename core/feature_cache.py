@@ -0,0 +1,163 @@
+"""
+Feature result cache keyed by symbol, interval and last bar timestamp.
+
+Within one bar (per the active provider's `current_bar`) a symbol is served
+from memory without refetching. Once a new bar has opened the symbol is
+fetched again, but if its last bar timestamp is unchanged the cached feature
+dict is reused instead of recomputed. Entries are LRU-bounded and can
+optionally spill to disk on eviction, which also lets other processes (e.g.
+the Telegram listener) read prices computed by the scanner.
+"""
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+from config import settings as cfg
+from core.data_fetch import get_provider
+from infra import memory, metrics
+from infra.logging import log
+
+
+def _last_bar_ts(bars) -> Optional[str]:
+    if bars is None or bars.empty:
+        return None
+    return str(bars.timestamp(-1))
+
+
+class FeatureCache:
+    def __init__(self, max_entries: int = None, spill_dir: Optional[str] = None):
+        self.max_entries = cfg.FEATURE_CACHE_SIZE if max_entries is None else max_entries
+        self.spill_dir = spill_dir
+        self._entries: "OrderedDict" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"bars_hit": 0, "bars_miss": 0, "features_hit": 0, "features_miss": 0, "evictions": 0}
+
+    def _count(self, name: str) -> None:
+        self.stats[name] += 1
+        metrics.incr(name)
+
+    def _spill_path(self, key) -> str:
+        return os.path.join(self.spill_dir, f"{key[0]}_{key[1]}.pkl")
+
+    def _get(self, key) -> Optional[Dict]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if not self.spill_dir:
+            return None
+        try:
+            with open(self._spill_path(key), "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.PickleError, EOFError):
+            return None
+        if "bars" not in entry:
+            return None  # spilled before bars were stored as `Bars`
+        self._put(key, entry)
+        return entry
+
+    def _put(self, key, entry: Dict) -> None:
+        evicted = []
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False))
+                self.stats["evictions"] += 1
+        for old_key, old_entry in evicted:
+            self._spill(old_key, old_entry)
+
+    def _spill(self, key, entry: Dict) -> None:
+        if not self.spill_dir:
+            return
+        try:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            tmp = self._spill_path(key) + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, self._spill_path(key))
+        except (OSError, pickle.PickleError) as exc:
+            log.error(f"Failed to spill feature cache entry {key}: {exc}")
+
+    def lookup(self, symbol: str, fetch: Callable, compute: Callable) -> Dict:
+        """
+        Return the cache entry for `symbol`: `bars` (`core.bars.Bars`),
+        `features`, `bar_ts`, `bar` and `snapshotted` (whether this bar's
+        snapshot row was written).
+        """
+        key = (symbol, cfg.INTERVAL)
+        bar = get_provider().current_bar()
+        entry = self._get(key)
+        if entry is not None and entry["bar"] == bar:
+            self._count("bars_hit")
+            self._count("features_hit")
+            return entry
+        self._count("bars_miss")
+        with metrics.stage("fetch"):
+            bars = fetch(symbol)
+        bar_ts = _last_bar_ts(bars)
+        if entry is not None and bar_ts is not None and entry["bar_ts"] == bar_ts:
+            self._count("features_hit")
+            entry = dict(entry, bars=bars, bar=bar)
+        else:
+            self._count("features_miss")
+            with metrics.stage("features"):
+                features = compute(bars)
+            entry = {"bars": bars, "features": features, "bar_ts": bar_ts, "bar": bar, "snapshotted": False}
+        if bar_ts is not None:
+            # failed fetches are retried on the next lookup rather than cached
+            self._put(key, entry)
+        return entry
+
+    def needs_fetch(self, symbol: str) -> bool:
+        """Whether `lookup` would fetch `symbol` (no bars cached for the current bar)."""
+        with self._lock:
+            entry = self._entries.get((symbol, cfg.INTERVAL))
+        return entry is None or entry["bar"] != get_provider().current_bar()
+
+    def mark_snapshotted(self, symbol: str) -> None:
+        entry = self._get((symbol, cfg.INTERVAL))
+        if entry is not None:
+            entry["snapshotted"] = True
+
+    def latest_price(self, symbol: str, max_bars: int = 0) -> Optional[float]:
+        """Cached close for `symbol` if it is at most `max_bars` bars old."""
+        entry = self._get((symbol, cfg.INTERVAL))
+        if entry is None or not entry.get("features"):
+            return None
+        if get_provider().current_bar() - entry["bar"] > max_bars:
+            return None
+        return entry["features"]["price"]
+
+    def trim(self, fraction: float) -> int:
+        """Drop the least recently used `fraction` of in-memory entries (spilled copies stay)."""
+        evicted = []
+        with self._lock:
+            for _ in range(int(len(self._entries) * fraction)):
+                evicted.append(self._entries.popitem(last=False))
+            self.stats["evictions"] += len(evicted)
+        for key, entry in evicted:
+            self._spill(key, entry)
+        return len(evicted)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def hit_rates(self) -> Dict[str, float]:
+        out = {}
+        for kind in ("bars", "features"):
+            hits, misses = self.stats[f"{kind}_hit"], self.stats[f"{kind}_miss"]
+            out[kind] = hits / (hits + misses) if hits + misses else 0.0
+        return out
+
+
+cache = FeatureCache(spill_dir=cfg.FEATURE_CACHE_DIR if cfg.FEATURE_CACHE_SPILL else None)
+memory.register("features", cache)
@@ -0,0 +1,282 @@
+"""
+Throttling controller for remote market-data fetches.
+
+Every remote fetch goes through `FetchController.fetch`, which combines:
+
+- a token bucket (`FETCH_RATE` requests/s, `FETCH_BURST` burst) that caps the
+  request rate across all threads;
+- AIMD concurrency: the number of fetches in flight grows by about one per
+  window of successes and halves on a throttle error (HTTP 429) or shrinks
+  when latency spikes above `FETCH_LATENCY_SPIKE` x its moving average;
+- retries with full-jitter exponential backoff (`FETCH_MAX_ATTEMPTS`);
+- a per-symbol circuit breaker: after `FETCH_BREAKER_FAILS` consecutive
+  failures the symbol is not requested for `FETCH_BREAKER_COOLDOWN` seconds,
+  then a single trial request decides whether it closes again.
+
+When retries are exhausted or the breaker is open, `FetchUnavailable` is
+raised instead of returning an empty frame, so callers can defer the symbol
+rather than mistake a throttled fetch for missing data.
+
+`Prefetcher` keeps up to the current concurrency limit of a scan's upcoming
+fetches in flight, so the adaptive limit actually turns into parallelism.
+"""
+
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+from config import settings as cfg
+from infra import metrics
+from infra.logging import log, set_log_context
+
+
+class ThrottledError(Exception):
+    """The provider rejected the request for rate reasons (HTTP 429 or equivalent)."""
+
+
+class FetchUnavailable(Exception):
+    """A fetch gave up: retries exhausted or the symbol's circuit breaker is open."""
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self._tokens = self.burst
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:  # unlimited
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+                self._stamp = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class AimdLimiter:
+    """
+    Concurrency limit with additive increase / multiplicative decrease.
+
+    One congestion episode makes one decrease: after cutting the limit,
+    further 429s or latency spikes are ignored for one round trip (the
+    smoothed request latency), since they come from requests that were
+    already in flight at the old limit.
+    """
+
+    def __init__(self, initial: float, minimum: float, maximum: float, spike: float):
+        self.limit = float(initial)
+        self.minimum = float(minimum)
+        self.maximum = float(maximum)
+        self.spike = spike
+        self.in_flight = 0
+        self._latency: Optional[float] = None
+        self._decreased_at: Optional[float] = None
+        self._cond = threading.Condition()
+
+    def acquire(self) -> int:
+        """Wait for a slot; returns the number in flight including this one."""
+        with self._cond:
+            while self.in_flight >= int(self.limit):
+                self._cond.wait()
+            self.in_flight += 1
+            return self.in_flight
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify()
+
+    def _set(self, limit: float) -> None:
+        self.limit = min(self.maximum, max(self.minimum, limit))
+        self._cond.notify_all()
+
+    def _decrease(self, factor: float) -> None:
+        now = time.monotonic()
+        # no latency sample yet: treat a second as the round trip
+        window = self._latency if self._latency is not None else 1.0
+        if self._decreased_at is not None and now - self._decreased_at < window:
+            return
+        self._decreased_at = now
+        self._set(self.limit * factor)
+
+    def on_success(self, latency: float, in_flight: int) -> None:
+        """`in_flight` as returned by `acquire` for this request."""
+        with self._cond:
+            spiked = self._latency is not None and latency > self._latency * self.spike
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            if spiked:
+                self._decrease(0.75)
+            elif in_flight >= int(self.limit):
+                # +1 per `limit` successes, i.e. roughly one step per round of
+                # requests; only while the limit is what holds callers back
+                self._set(self.limit + 1.0 / self.limit)
+
+    def on_throttle(self) -> None:
+        with self._cond:
+            self._decrease(0.5)
+
+
+class CircuitBreaker:
+    def __init__(self, fails: int, cooldown: float):
+        self.fails = fails
+        self.cooldown = cooldown
+        self._state: Dict[str, list] = {}  # symbol -> [consecutive failures, open until]
+        self._lock = threading.Lock()
+
+    def allow(self, symbol: str) -> bool:
+        with self._lock:
+            state = self._state.get(symbol)
+            if state is None or state[0] < self.fails:
+                return True
+            if time.monotonic() < state[1]:
+                return False
+            # half-open: let one trial through and hold the rest until it reports
+            state[1] = time.monotonic() + self.cooldown
+            return True
+
+    def record(self, symbol: str, ok: bool) -> None:
+        with self._lock:
+            if ok:
+                self._state.pop(symbol, None)
+                return
+            state = self._state.setdefault(symbol, [0, 0.0])
+            state[0] += 1
+            if state[0] >= self.fails:
+                state[1] = time.monotonic() + self.cooldown
+
+    def open_symbols(self):
+        now = time.monotonic()
+        with self._lock:
+            return sorted(s for s, (n, until) in self._state.items() if n >= self.fails and now < until)
+
+
+class FetchController:
+    def __init__(
+        self,
+        rate: float = None,
+        burst: float = None,
+        min_concurrency: int = None,
+        max_concurrency: int = None,
+        max_attempts: int = None,
+        backoff: float = None,
+        breaker_fails: int = None,
+        breaker_cooldown: float = None,
+        latency_spike: float = None,
+    ):
+        pick = lambda value, name: getattr(cfg, name) if value is None else value
+        self.max_concurrency = pick(max_concurrency, "FETCH_MAX_CONCURRENCY")
+        self.bucket = TokenBucket(pick(rate, "FETCH_RATE"), pick(burst, "FETCH_BURST"))
+        min_concurrency = pick(min_concurrency, "FETCH_MIN_CONCURRENCY")
+        self.limiter = AimdLimiter(min_concurrency, min_concurrency, self.max_concurrency,
+                                   pick(latency_spike, "FETCH_LATENCY_SPIKE"))
+        self.max_attempts = max(1, pick(max_attempts, "FETCH_MAX_ATTEMPTS"))
+        self.backoff = pick(backoff, "FETCH_BACKOFF_SECONDS")
+        self.breaker = CircuitBreaker(pick(breaker_fails, "FETCH_BREAKER_FAILS"),
+                                      pick(breaker_cooldown, "FETCH_BREAKER_COOLDOWN"))
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0, "retries": 0, "gave_up": 0, "breaker_open": 0}
+
+    def _count(self, name: str) -> None:
+        self.stats[name] += 1
+        metrics.incr(f"fetch_{name}")
+
+    def fetch(self, symbol: str, fn: Callable):
+        """Run `fn()` (one provider request for `symbol`) under rate, concurrency and retry control."""
+        if not self.breaker.allow(symbol):
+            self._count("breaker_open")
+            raise FetchUnavailable(f"{symbol}: circuit open")
+        last_exc: Optional[Exception] = None
+        for attempt in range(self.max_attempts):
+            if attempt:
+                self._count("retries")
+                # full jitter: uniform over [0, base * 2^attempt]
+                time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+            self.bucket.acquire()
+            in_flight = self.limiter.acquire()
+            start = time.monotonic()
+            self._count("requests")
+            try:
+                result = fn()
+            except ThrottledError as exc:
+                self.limiter.on_throttle()
+                self._count("throttled")
+                last_exc = exc
+                continue
+            except Exception as exc:
+                self._count("errors")
+                last_exc = exc
+                continue
+            finally:
+                self.limiter.release()
+            self.limiter.on_success(time.monotonic() - start, in_flight)
+            self.breaker.record(symbol, True)
+            return result
+        self.breaker.record(symbol, False)
+        self._count("gave_up")
+        log.warning(f"{symbol}: fetch gave up after {self.max_attempts} attempts: {last_exc}")
+        raise FetchUnavailable(f"{symbol}: {last_exc}") from last_exc
+
+    def snapshot(self) -> Dict:
+        return dict(self.stats, concurrency=self.limiter.limit, open_breakers=self.breaker.open_symbols())
+
+
+controller = FetchController()
+
+
+class Prefetcher:
+    """
+    Fetch `symbols` ahead of a sequential consumer.
+
+    `fetch(symbol)` returns the prefetched result (waiting for it if still in
+    flight) or fetches directly, and tops the window back up to the
+    controller's concurrency limit. `want(symbol)` filters out symbols that
+    will not need a fetch (e.g. bars cached for the current bar). Prefetches
+    log under the caller's context (e.g. its scan ID) and their own symbol.
+    """
+
+    def __init__(self, symbols: Iterable[str], fetch: Callable, want: Optional[Callable] = None,
+                 control: Optional[FetchController] = None):
+        self._queue = deque(symbols)
+        self._fetch = fetch
+        self._want = want or (lambda symbol: True)
+        self._controller = control or controller
+        self._futures: Dict[str, object] = {}
+        self._taken = set()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(self._controller.max_concurrency)),
+                                        thread_name_prefix="prefetch")
+
+    def _fill(self) -> None:
+        window = max(1, int(self._controller.limiter.limit))
+        while self._queue and len(self._futures) < window:
+            symbol = self._queue.popleft()
+            if symbol in self._taken or symbol in self._futures or not self._want(symbol):
+                continue
+            self._futures[symbol] = self._pool.submit(contextvars.copy_context().run, self._prefetch, symbol)
+
+    def _prefetch(self, symbol: str):
+        set_log_context(symbol=symbol)
+        return self._fetch(symbol)
+
+    def fetch(self, symbol: str):
+        self._taken.add(symbol)
+        future = self._futures.pop(symbol, None)
+        self._fill()
+        if future is None:
+            return self._fetch(symbol)
+        return future.result()
+
+    def close(self) -> None:
+        # symbols cut by a deadline are not fetched for nothing
+        self._queue.clear()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -2,80 +2,74 @@
 Indicator calculations: EMA, RSI, ATR.
 """
 
-def compute_features(df):
-    from infra.logging import log
-    import pandas as pd
+
+def _last_ema(close, span):
+    """Last value of pandas' `ewm(span=span, adjust=True).mean()` over `close`."""
     import numpy as np
 
-    def _as_float(val):
-        if isinstance(val, pd.Series):
-            val = val.iloc[0]
-        return float(val)
+    weights = (1 - 2 / (span + 1)) ** np.arange(len(close) - 1, -1, -1)
+    return float(weights @ close / weights.sum())
+
+
+def compute_features(df, higher=None, reference=None):
+    """
+    Features of the last bar of `df` (`core.bars.Bars`; a DataFrame is
+    converted first). `higher` maps timeframe -> resampled bars
+    (`core.timeframes`); their `timeframe_features` go under
+    `features["timeframes"]`. `reference` is the symbol's daily reference
+    data (`service.reference.Reference`), which adds multi-day baselines.
+    """
+    from infra.logging import log
+    import numpy as np
+    from core.bars import as_bars
 
-    if df is None or df.empty:
+    bars = as_bars(df)
+    if bars is None or bars.empty:
         log.warning("Empty dataframe passed to compute_features")
         return None
-    df = df.dropna()
-    if len(df) < 30:
+    if len(bars) < 30:
         log.warning("Insufficient data (<30 rows) for feature computation")
         return None
 
-    df["ema20"] = df["Close"].ewm(span=20).mean()
-    df["ema50"] = df["Close"].ewm(span=50).mean()
-    tr = np.maximum(
-        df["High"] - df["Low"],
-        np.maximum(
-            abs(df["High"] - df["Close"].shift()),
-            abs(df["Low"] - df["Close"].shift())
-        )
-    )
-    df["atr"] = tr.rolling(14).mean()
-    delta = df["Close"].diff()
-    gain = delta.clip(lower=0).rolling(14).mean()
-    loss = -delta.clip(upper=0).rolling(14).mean()
-    rs = gain / loss.replace(0, np.nan)
-    df["rsi"] = 100 - (100 / (1 + rs))
-
-    typical_price = (df["High"] + df["Low"] + df["Close"]) / 3
-    df["typical_price"] = typical_price
-    tpv = typical_price * df["Volume"]
-    df["cum_tpv"] = tpv.cumsum()
-    df["cum_vol"] = df["Volume"].cumsum().replace(0, 1)
-    df["vwap"] = df["cum_tpv"] / df["cum_vol"]
-
-    last = df.iloc[-1]
-    price = _as_float(last["Close"])
-    atr = _as_float(last["atr"])
-    ema20 = _as_float(last["ema20"])
-    ema50 = _as_float(last["ema50"])
-    rsi = _as_float(last["rsi"])
-    avg_volume = _as_float(df["Volume"].tail(20).mean())
-    last_volume = _as_float(last["Volume"])
+    # only the last bar's values are needed, so no indicator series is built
+    close = bars.close.astype(np.float64)
+    high = bars.high.astype(np.float64)
+    low = bars.low.astype(np.float64)
+    volume = bars.volume.astype(np.float64)
+
+    prev_close = close[-15:-1]
+    tr = np.maximum(high[-14:] - low[-14:],
+                    np.maximum(abs(high[-14:] - prev_close), abs(low[-14:] - prev_close)))
+    delta = np.diff(close[-15:])
+    gain = delta.clip(min=0).mean()
+    loss = -delta.clip(max=0).mean()
+
+    price = float(close[-1])
+    atr = float(tr.mean())
+    ema20 = _last_ema(close, 20)
+    ema50 = _last_ema(close, 50)
+    rsi = float(100 - 100 / (1 + gain / loss)) if loss else float("nan")
+    avg_volume = float(volume[-20:].mean())
+    last_volume = float(volume[-1])
     atr_pct = (atr / price * 100) if price else 0.0
     vol_spike = (last_volume / avg_volume) if avg_volume else 0.0
-    vwap = _as_float(last["vwap"])
-
-    try:
-        current_date = last.name.date()
-        today_data = df[df.index.date == current_date]
-        if today_data.empty:
-            today_data = df
-    except Exception:
-        today_data = df
-
-    session_high = _as_float(today_data["High"].max())
-    session_low = _as_float(today_data["Low"].min())
+    cum_vol = float(volume.sum()) or 1.0
+    vwap = float(((high + low + close) / 3) @ volume) / cum_vol
+
+    today = bars.session_start()
+    session_high = float(high[today:].max())
+    session_low = float(low[today:].min())
     session_range = session_high - session_low
     pct_from_low = ((price - session_low) / session_low * 100) if session_low else 0.0
     pct_from_high = ((session_high - price) / session_high * 100) if session_high else 0.0
 
     log.debug(
-        f"Indicators: price={price}, ema20={ema20}, ema50={ema50}, rsi={rsi}, "
-        f"atr_pct={atr_pct}, avg_volume={avg_volume}, vol_spike={vol_spike}, "
-        f"session_low={session_low}, session_high={session_high}, vwap={vwap}"
+        "Indicators: price=%s, ema20=%s, ema50=%s, rsi=%s, atr_pct=%s, avg_volume=%s, "
+        "vol_spike=%s, session_low=%s, session_high=%s, vwap=%s",
+        price, ema20, ema50, rsi, atr_pct, avg_volume, vol_spike, session_low, session_high, vwap,
     )
 
-    return {
+    features = {
         "price": price,
         "ema20": ema20,
         "ema50": ema50,
@@ -91,3 +85,55 @@ def compute_features(df):
         "pct_from_low": pct_from_low,
         "pct_from_high": pct_from_high,
     }
+    if reference is not None:
+        last_ts = bars.timestamp(-1)
+        typical_volume = reference.typical_volume(last_ts)
+        features.update(
+            avg_volume_20d=reference.avg_volume,
+            daily_atr_pct=reference.atr_pct,
+            typical_volume=typical_volume,
+            rel_volume=(last_volume / typical_volume) if typical_volume else None,
+        )
+        # only a previous session's close makes a gap
+        if reference.as_of < str(last_ts.date()) and reference.prev_close:
+            features["prev_close"] = reference.prev_close
+            features["gap_pct"] = (float(bars.open[today]) / reference.prev_close - 1) * 100
+    if higher:
+        features["timeframes"] = {tf: timeframe_features(tf_bars) for tf, tf_bars in higher.items()}
+    return features
+
+
+def timeframe_features(bars, min_rows=30):
+    """
+    Price, EMA20/50, RSI, ATR% and volume spike of the last bar, computed
+    like `compute_features` but with numpy only (no session stats). `bars`
+    is a DataFrame or a mapping of OHLCV arrays; None when it has fewer
+    than `min_rows` bars.
+    """
+    import numpy as np
+
+    if bars is None or len(bars["Close"]) < min_rows:
+        return None
+    close = np.asarray(bars["Close"], dtype=float)
+    high = np.asarray(bars["High"], dtype=float)
+    low = np.asarray(bars["Low"], dtype=float)
+    volume = np.asarray(bars["Volume"], dtype=float)
+
+    delta = np.diff(close[-15:])
+    gain = delta.clip(min=0).mean()
+    loss = -delta.clip(max=0).mean()
+    rsi = 100 - 100 / (1 + gain / loss) if loss else float("nan")
+    prev_close = close[-15:-1]
+    tr = np.maximum(high[-14:] - low[-14:],
+                    np.maximum(abs(high[-14:] - prev_close), abs(low[-14:] - prev_close)))
+    price = float(close[-1])
+    avg_volume = float(volume[-20:].mean())
+    return {
+        "price": price,
+        "ema20": _last_ema(close, 20),
+        "ema50": _last_ema(close, 50),
+        "rsi": float(rsi),
+        "atr_pct": float(tr.mean() / price * 100) if price else 0.0,
+        "vol_spike": float(volume[-1] / avg_volume) if avg_volume else 0.0,
+        "bars": len(close),
+    }
@@ -6,38 +6,43 @@ import time
 import os
 from datetime import datetime, timedelta
 import requests
+from infra import metrics
 from infra.logging import log
+from infra.memory import BoundedCache
 
-# In-memory cache: { symbol: { 'ts': epoch, 'headlines': [...] } }
+# In-memory cache: { symbol: { 'ts': epoch, 'headlines': [...] } }, LRU-bounded
 from config import settings as cfg
 
-_news_cache = {}
 _NEWS_TTL_SECONDS = int(os.environ.get("NEWS_TTL_SECONDS", 45 * 60))
 _NEWS_PAGE_SIZE = 5
+_news_cache = BoundedCache("news", cfg.NEWS_CACHE_SIZE, ttl=_NEWS_TTL_SECONDS)
 
 # load persistent cache if present
 try:
     if hasattr(cfg, 'NEWS_CACHE_FILE') and os.path.exists(cfg.NEWS_CACHE_FILE):
         with open(cfg.NEWS_CACHE_FILE, 'r') as _f:
             import json
-            _news_cache = json.load(_f)
+            _loaded = json.load(_f)
             # normalize ts to float epoch if stored as ISO
-            for k, v in list(_news_cache.items()):
+            for k, v in list(_loaded.items()):
                 ts = v.get('ts') or v.get('timestamp')
                 if isinstance(ts, str):
                     try:
                         # try parse ISO
                         from datetime import datetime as _dt
-                        _news_cache[k]['ts'] = _dt.strptime(ts, "%Y-%m-%dT%H:%M:%SZ").timestamp()
+                        _loaded[k]['ts'] = _dt.strptime(ts, "%Y-%m-%dT%H:%M:%SZ").timestamp()
                     except Exception:
                         try:
-                            _news_cache[k]['ts'] = float(ts)
+                            _loaded[k]['ts'] = float(ts)
                         except Exception:
-                            _news_cache[k]['ts'] = 0
+                            _loaded[k]['ts'] = 0
                 else:
-                    _news_cache[k]['ts'] = ts or 0
+                    _loaded[k]['ts'] = ts or 0
+            # oldest first, so the LRU order matches fetch order
+            for k, v in sorted(_loaded.items(), key=lambda kv: kv[1]['ts']):
+                _news_cache.set(k, v, stamp=v['ts'])
 except Exception:
-    _news_cache = {}
+    _news_cache.clear()
 
 def fetch_news(symbol):
     from config import settings as cfg
@@ -47,14 +52,15 @@ def fetch_news(symbol):
         return []
 
     now = time.time()
+    # expired entries are dropped by the cache itself
     entry = _news_cache.get(symbol)
     if entry:
-        age = now - entry.get("ts", 0)
-        if age < _NEWS_TTL_SECONDS:
-            headlines = entry.get("headlines", [])
-            log.info(f"Reusing cached news for {symbol} ({len(headlines)} articles)")
-            return headlines
+        headlines = entry.get("headlines", [])
+        metrics.incr("news_cache_hit")
+        log.debug("Reusing cached news for %s (%d articles)", symbol, len(headlines))
+        return headlines
 
+    metrics.incr("news_cache_miss")
     url = "https://newsapi.org/v2/everything"
     params = {
         "q": symbol,
@@ -75,18 +81,19 @@ def fetch_news(symbol):
                 headlines.append(t)
             if len(headlines) >= _NEWS_PAGE_SIZE:
                 break
-        _news_cache[symbol] = {"ts": now, "headlines": headlines}
+        _news_cache.set(symbol, {"ts": now, "headlines": headlines}, stamp=now)
         # persist cache
         try:
             import json
             if hasattr(cfg, 'NEWS_CACHE_FILE'):
                 with open(cfg.NEWS_CACHE_FILE, 'w') as _f:
-                    json.dump(_news_cache, _f, indent=2)
+                    json.dump(dict(_news_cache.items()), _f, indent=2)
         except Exception:
             log.error("Failed to persist news cache", exc_info=True)
-        log.info(f"Fetched fresh news for {symbol} ({len(headlines)} articles)")
+        log.info("Fetched fresh news for %s (%d articles)", symbol, len(headlines))
         return headlines
     except Exception as e:
+        metrics.incr("news_fetch_error")
         log.error(f"Failed to fetch news for {symbol}: {e}", exc_info=True)
         return []
 
@@ -119,8 +126,9 @@ def finbert_sentiment(headlines):
             logits = _MODEL(**inputs).logits
         probs = torch.softmax(logits, dim=1).mean(dim=0)
         sentiment = _LABELS[int(torch.argmax(probs))]
-        log.debug(f"FinBERT sentiment: {sentiment} for headlines: {headlines}")
+        log.debug("FinBERT sentiment: %s for %d headlines", sentiment, len(headlines))
         return sentiment
     except Exception as e:
+        metrics.incr("sentiment_error")
         log.error(f"FinBERT sentiment analysis failed: {e}", exc_info=True)
         return "neutral"
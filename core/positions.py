@@ -0,0 +1,134 @@
+"""
+In-memory position book written through to SQLite.
+
+Reads (every scan, the planner, `/positions`, `/pnl`) are served from memory.
+The book reloads the `positions` table only when SQLite's `data_version`
+says another connection has committed since the last check, so the daemon,
+scheduler and Telegram listener still see each other's trades. Writes are
+single-statement UPSERTs (`infra.database.add_to_position`), so concurrent
+`/bought`/`/sold` from different processes never lose an update.
+
+Holdings are also kept as parallel numpy arrays, so mark-to-market over a
+batch of quotes is one vectorized pass.
+"""
+
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from infra import database
+from infra.logging import log
+
+
+class PositionBook:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_key = None
+        self._version = None
+        self._positions: Dict[str, Dict] = {}
+        self._arrays = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # reopen after a fork or when DB_PATH is repointed (bench, tests)
+        key = (database.DB_PATH, os.getpid())
+        if self._conn is None or self._conn_key != key:
+            self._conn = sqlite3.connect(database.DB_PATH, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn_key = key
+            self._version = None
+        return self._conn
+
+    def _sync(self) -> None:
+        conn = self._connection()
+        version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self._version:
+            return
+        rows = conn.execute("SELECT symbol, qty, price, timestamp FROM positions WHERE qty > 0").fetchall()
+        self._positions = {row["symbol"].upper(): dict(row, symbol=row["symbol"].upper()) for row in rows}
+        self._arrays = None
+        self._version = version
+        log.debug(f"Position book reloaded: {len(self._positions)} open positions")
+
+    def positions(self) -> List[Dict]:
+        with self._lock:
+            try:
+                self._sync()
+            except sqlite3.Error as exc:
+                log.error(f"Failed to load positions: {exc}")
+            return [dict(p) for p in self._positions.values()]
+
+    def symbols(self) -> List[str]:
+        return [p["symbol"] for p in self.positions()]
+
+    def apply(self, symbol: str, qty_delta: float, price: float, timestamp: Optional[str] = None) -> Optional[Dict]:
+        """Add (or with a negative `qty_delta`, remove) shares; returns the resulting position."""
+        timestamp = timestamp or datetime.utcnow().isoformat()
+        symbol = symbol.upper()
+        row = database.add_to_position(symbol, qty_delta, price, timestamp)
+        with self._lock:
+            if row:
+                self._positions[symbol] = row
+            else:
+                self._positions.pop(symbol, None)
+            self._arrays = None
+        return row
+
+    def _holdings(self):
+        if self._arrays is None:
+            held = list(self._positions.values())
+            self._arrays = (
+                [p["symbol"] for p in held],
+                np.array([p["qty"] for p in held], dtype=float),
+                np.array([p["price"] for p in held], dtype=float),
+            )
+        return self._arrays
+
+    def mark_to_market(self, prices: Dict[str, Optional[float]]) -> Dict:
+        """
+        Value every holding at `prices` (symbol -> last price, None/missing
+        when unknown). Returns per-position rows plus totals over the priced
+        positions.
+        """
+        with self._lock:
+            try:
+                self._sync()
+            except sqlite3.Error as exc:
+                log.error(f"Failed to load positions: {exc}")
+            symbols, qty, cost = self._holdings()
+        last = np.array([np.nan if prices.get(s) is None else prices[s] for s in symbols], dtype=float)
+        cost_value = qty * cost
+        market_value = qty * last
+        pnl = market_value - cost_value
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pnl_pct = np.where(cost_value > 0, pnl / cost_value * 100, np.nan)
+        priced = ~np.isnan(last)
+        rows = [
+            {
+                "symbol": sym,
+                "qty": float(qty[i]),
+                "avg_price": float(cost[i]),
+                "last": float(last[i]) if priced[i] else None,
+                "value": float(market_value[i]) if priced[i] else None,
+                "pnl": float(pnl[i]) if priced[i] else None,
+                "pnl_pct": float(pnl_pct[i]) if priced[i] and not np.isnan(pnl_pct[i]) else None,
+            }
+            for i, sym in enumerate(symbols)
+        ]
+        total_cost = float(cost_value[priced].sum())
+        total_pnl = float(pnl[priced].sum())
+        return {
+            "positions": rows,
+            "cost": total_cost,
+            "value": float(market_value[priced].sum()),
+            "pnl": total_pnl,
+            "pnl_pct": total_pnl / total_cost * 100 if total_cost > 0 else None,
+            "unpriced": [sym for i, sym in enumerate(symbols) if not priced[i]],
+        }
+
+
+book = PositionBook()
@@ -0,0 +1,143 @@
+"""
+Latest-quote service shared by the scanner and the Telegram listener.
+
+Lookups go through an in-process TTL cache, then the scanner's feature cache
+for the current bar, then the `quotes` table in the local SQLite store (which
+the scanner refreshes after every scan, so other processes see it too), and
+only then fall back to fetching today's daily bar (one row, where the
+intraday lookback would be a few hundred), whose close is the last price.
+"""
+
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+from config.settings import QUOTE_CACHE_SIZE, QUOTE_FETCH_INTERVAL, QUOTE_FETCH_PERIOD, QUOTE_TTL_SECONDS
+from core.data_fetch import fetch_bars, flatten_columns
+from core.feature_cache import cache as feature_cache
+from infra import database, metrics
+from infra.memory import BoundedCache
+from infra.logging import log
+
+
+class QuoteService:
+    def __init__(self, ttl: float = QUOTE_TTL_SECONDS):
+        self.ttl = ttl
+        # symbol -> (price, bar_ts, updated_at); freshness is checked per lookup
+        self._quotes = BoundedCache("quotes", QUOTE_CACHE_SIZE)
+        self._lock = threading.Lock()
+        self.stats = {"memory": 0, "features": 0, "db": 0, "fetch": 0, "missing": 0}
+
+    def _fresh(self, updated_at: float, now: float) -> bool:
+        return now - updated_at <= self.ttl
+
+    def _remember(self, symbol: str, price: float, bar_ts: Optional[str], now: float) -> None:
+        with self._lock:
+            self._quotes[symbol] = (price, bar_ts, now)
+
+    def _hit(self, source: str) -> None:
+        self.stats[source] += 1
+        metrics.incr("quote_hit" if source != "fetch" else "quote_miss")
+
+    def get(self, symbol: str) -> Optional[float]:
+        symbol = symbol.upper()
+        now = time.time()
+        cached = self._quotes.get(symbol)
+        if cached and self._fresh(cached[2], now):
+            self._hit("memory")
+            return cached[0]
+        price = feature_cache.latest_price(symbol)
+        if price is not None:
+            self._remember(symbol, price, None, now)
+            self._hit("features")
+            return price
+        try:
+            row = database.get_quote(symbol)
+        except sqlite3.Error as exc:
+            log.error(f"Quote lookup failed for {symbol}: {exc}")
+            row = None
+        if row and self._fresh(row["updated_at"], now):
+            self._remember(symbol, row["price"], row["bar_ts"], row["updated_at"])
+            self._hit("db")
+            return row["price"]
+        return self._fetch(symbol, now)
+
+    def get_many(self, symbols: Iterable[str], fetch_missing: bool = False,
+                 max_age: Optional[float] = None) -> Dict[str, Optional[float]]:
+        """
+        Batch lookup: memory and the feature cache first, then one query for
+        the rest. Symbols still unknown are fetched only with `fetch_missing`;
+        `max_age` (seconds) overrides the TTL, e.g. to accept last close.
+        """
+        now = time.time()
+        max_age = self.ttl if max_age is None else max_age
+        out: Dict[str, Optional[float]] = {}
+        pending = []
+        for symbol in (s.upper() for s in symbols):
+            cached = self._quotes.get(symbol)
+            if cached and now - cached[2] <= max_age:
+                self._hit("memory")
+                out[symbol] = cached[0]
+                continue
+            price = feature_cache.latest_price(symbol)
+            if price is not None:
+                self._remember(symbol, price, None, now)
+                self._hit("features")
+                out[symbol] = price
+                continue
+            pending.append(symbol)
+        try:
+            rows = database.get_quotes(pending)
+        except sqlite3.Error as exc:
+            log.error(f"Quote lookup failed for {len(pending)} symbols: {exc}")
+            rows = {}
+        for symbol in pending:
+            row = rows.get(symbol)
+            if row and now - row["updated_at"] <= max_age:
+                self._remember(symbol, row["price"], row["bar_ts"], row["updated_at"])
+                self._hit("db")
+                out[symbol] = row["price"]
+            elif fetch_missing:
+                out[symbol] = self._fetch(symbol, now)
+            else:
+                self.stats["missing"] += 1
+                out[symbol] = None
+        return out
+
+    def _fetch(self, symbol: str, now: float) -> Optional[float]:
+        try:
+            df = fetch_bars(symbol, period=QUOTE_FETCH_PERIOD, interval=QUOTE_FETCH_INTERVAL)
+        except Exception as exc:
+            log.error(f"Quote fetch failed for {symbol}: {exc}", exc_info=True)
+            df = None
+        if df is None or df.empty:
+            self.stats["missing"] += 1
+            log.warning(f"No market data available to quote {symbol}")
+            return None
+        df = flatten_columns(df)
+        price = float(df["Close"].iloc[-1])
+        bar_ts = str(df.index[-1])
+        self._hit("fetch")
+        self.publish([(symbol, price, bar_ts)], now)
+        log.info(f"Fetched quote for {symbol}: {price}")
+        return price
+
+    def publish(self, quotes: Iterable[Tuple[str, float, Optional[str]]], now: Optional[float] = None) -> None:
+        """Store `(symbol, price, bar_ts)` quotes locally and in the shared table."""
+        now = time.time() if now is None else now
+        rows = [(sym.upper(), float(price), bar_ts, now) for sym, price, bar_ts in quotes]
+        with self._lock:
+            for sym, price, bar_ts, ts in rows:
+                self._quotes[sym] = (price, bar_ts, ts)
+        try:
+            database.upsert_quotes(rows)
+        except sqlite3.Error as exc:
+            log.error(f"Failed to publish {len(rows)} quotes: {exc}")
+
+
+quotes = QuoteService()
+
+
+def get_quote(symbol: str) -> Optional[float]:
+    return quotes.get(symbol)
@@ -0,0 +1,170 @@
+"""
+Higher-timeframe bars derived locally from the base `INTERVAL` fetch.
+
+Only the base interval is downloaded. Each timeframe in `HIGHER_TIMEFRAMES`
+(e.g. 15m, 1h) is aggregated from it with numpy. Buckets are anchored to the
+session open (`SESSION_OPEN`), so hourly bars run 09:15-10:15 and so on, and
+a bucket never spans two sessions.
+
+`TimeframeCache` keeps the aggregated bars per symbol and timeframe as numpy
+arrays. When a newer base frame arrives that extends the cached one, only the
+last (possibly partial) bucket and any new ones are aggregated again, so a
+refresh costs a few base bars of work rather than a download or a full
+resample. DataFrames are built only on request (`frame`).
+"""
+
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import settings as cfg
+from core.bars import Bars
+from infra.logging import log
+from infra.memory import BoundedCache
+
+FIELDS = ("Open", "High", "Low", "Close", "Volume")
+_warned = set()
+
+
+def parse_minutes(interval: str) -> Optional[int]:
+    """'15m' -> 15, '1h' -> 60; None for anything that is not a minute/hour interval."""
+    try:
+        if interval.endswith("m"):
+            return int(interval[:-1])
+        if interval.endswith("h"):
+            return int(interval[:-1]) * 60
+    except ValueError:
+        pass
+    return None
+
+
+def timeframes(base: Optional[str] = None, higher: Optional[List[str]] = None) -> List[str]:
+    """The configured higher timeframes that are whole multiples of the base interval."""
+    base = base or cfg.INTERVAL
+    higher = cfg.HIGHER_TIMEFRAMES if higher is None else higher
+    base_minutes = parse_minutes(base)
+    out = []
+    for tf in higher:
+        minutes = parse_minutes(tf)
+        if base_minutes and minutes and minutes > base_minutes and minutes % base_minutes == 0:
+            out.append(tf)
+        elif tf not in _warned:
+            _warned.add(tf)
+            log.warning(f"Ignoring timeframe {tf}: not a multiple of the {base} base interval")
+    return out
+
+
+def _base_arrays(bars: Bars) -> Dict[str, np.ndarray]:
+    """Base bars by field name, plus `utc` nanoseconds and the wall-clock `offset`."""
+    offset = bars.timestamp(0).utcoffset() if bars.tz is not None else None
+    return {
+        "Open": bars.open, "High": bars.high, "Low": bars.low, "Close": bars.close, "Volume": bars.volume,
+        "utc": bars.ts,
+        "offset": int(offset.total_seconds()) * 10**9 if offset else 0,
+        "tz": bars.tz,
+    }
+
+
+def _aggregate(base: Dict, minutes: int, lo: int = 0, hi: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """Buckets for base rows `lo:hi`; `start` holds each bucket's UTC start in nanoseconds."""
+    width = minutes * 60 * 10**9
+    hours, mins = (int(part) for part in cfg.SESSION_OPEN.split(":"))
+    anchor = ((hours * 60 + mins) % minutes) * 60 * 10**9
+    # buckets on wall-clock time, so they line up with the session
+    bucket = (base["utc"][lo:hi] + base["offset"] - anchor) // width
+    if not len(bucket):
+        return {field: base[field][:0] for field in FIELDS} | {"start": bucket}
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(bucket)] - 1
+    return {
+        "start": bucket[starts] * width + anchor - base["offset"],
+        "Open": base["Open"][lo:hi][starts],
+        "High": np.maximum.reduceat(base["High"][lo:hi], starts),
+        "Low": np.minimum.reduceat(base["Low"][lo:hi], starts),
+        "Close": base["Close"][lo:hi][ends],
+        "Volume": np.add.reduceat(base["Volume"][lo:hi], starts),
+    }
+
+
+def _to_frame(bars: Dict[str, np.ndarray], tz) -> pd.DataFrame:
+    # each bar is stamped with its bucket start, in the base frame's timezone
+    index = pd.DatetimeIndex(bars["start"].astype("datetime64[ns]"))
+    if tz is not None:
+        index = index.tz_localize("UTC").tz_convert(tz)
+    return pd.DataFrame({field: bars[field] for field in FIELDS}, index=index)
+
+
+def resample_ohlcv(df: pd.DataFrame, minutes: int) -> pd.DataFrame:
+    """Aggregate OHLCV bars into `minutes`-wide buckets anchored at the session open."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=list(FIELDS))
+    base = _base_arrays(Bars.from_frame(df))
+    return _to_frame(_aggregate(base, minutes), base["tz"])
+
+
+class TimeframeCache:
+    """Resampled bars per (symbol, timeframe), extended incrementally."""
+
+    def __init__(self, max_entries: int = None):
+        size = cfg.FEATURE_CACHE_SIZE * max(1, len(cfg.HIGHER_TIMEFRAMES)) if max_entries is None else max_entries
+        self._entries = BoundedCache("timeframes", size)
+        self.stats = {"full": 0, "incremental": 0, "unchanged": 0}
+
+    def _bars(self, symbol: str, tf: str, base: Dict) -> Dict[str, np.ndarray]:
+        minutes = parse_minutes(tf)
+        key = (symbol, tf)
+        utc = base["utc"]
+        entry = self._entries.get(key)
+        if entry is not None and entry["first"] == utc[0] and entry["last"] == utc[-1]:
+            self.stats["unchanged"] += 1
+            return entry["bars"]
+        old = entry["bars"] if entry is not None else None
+        if old is not None and len(old["start"]) and utc[0] <= entry["last"] <= utc[-1] \
+                and utc[np.searchsorted(utc, entry["last"])] == entry["last"]:
+            # the new frame extends the cached one: the last cached bucket may
+            # have been partial, so rebuild it and anything newer
+            keep = len(old["start"]) - 1
+            tail = _aggregate(base, minutes, int(np.searchsorted(utc, old["start"][-1])))
+            bars = {field: np.concatenate([old[field][:keep], tail[field]]) for field in old}
+            if entry["first"] != utc[0]:
+                # the window slid forward: drop buckets it no longer covers and
+                # rebuild the first one, which may have lost bars
+                drop = int(np.searchsorted(bars["start"], utc[0], side="right"))
+                nxt = int(np.searchsorted(utc, bars["start"][drop])) if drop < len(bars["start"]) else len(utc)
+                head = _aggregate(base, minutes, 0, nxt)
+                bars = {field: np.concatenate([head[field], bars[field][drop:]]) for field in bars}
+            self.stats["incremental"] += 1
+        else:
+            bars = _aggregate(base, minutes)
+            self.stats["full"] += 1
+        self._entries.set(key, {"bars": bars, "tz": base["tz"], "first": utc[0], "last": utc[-1]})
+        return bars
+
+    def bars(self, symbol: str, tf: str, bars) -> Dict[str, np.ndarray]:
+        """`tf` bars of `symbol` as arrays (`start` in UTC nanoseconds, then OHLCV)."""
+        return self._bars(symbol, tf, _base_arrays(Bars.from_frame(bars)))
+
+    def frame(self, symbol: str, tf: str) -> Optional[pd.DataFrame]:
+        """The cached `tf` bars of `symbol` as a DataFrame, if any."""
+        entry = self._entries.get((symbol, tf))
+        return None if entry is None else _to_frame(entry["bars"], entry["tz"])
+
+    def frames(self, symbol: str, bars) -> Dict[str, Dict[str, np.ndarray]]:
+        """Bars (`core.bars.Bars` or a DataFrame) for every configured higher timeframe."""
+        if bars is None:
+            return {}
+        bars = Bars.from_frame(bars)
+        if bars.empty:
+            return {}
+        base = _base_arrays(bars)
+        return {tf: self._bars(symbol, tf, base) for tf in timeframes()}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+cache = TimeframeCache()
@@ -0,0 +1,235 @@
+"""
+Local read-only HTTP API over the scanner's in-memory state.
+
+Endpoints (GET/HEAD, JSON unless noted):
+
+- `/scan`: the latest scan result published in this process
+- `/features`, `/features/{SYMBOL}`: features from the latest scan
+- `/positions`: open positions from the position book
+- `/charts/{file}.png`: chart images from `GRAPH_DIR` (image/png)
+
+Responses carry an ETag and honour `If-None-Match` with 304, so dashboards
+can poll cheaply. Bodies are serialized once per scan and served from
+memory; nothing here fetches market data. The server is a small asyncio
+loop on a daemon thread, started by the scheduler (the process that runs
+the periodic scans) next to the metrics exporter.
+"""
+
+import asyncio
+import hashlib
+import json
+import math
+import os
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from config.settings import API_HOST, API_PORT
+from infra.logging import log
+
+_MAX_HEADER_BYTES = 64 * 1024
+_IDLE_SECONDS = 15
+_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+def _finite(value):
+    # NaN/inf (e.g. RSI over a flat history) are not valid JSON; send null instead
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+def _json_default(obj):
+    # numpy scalars from feature dicts
+    return _finite(obj.item()) if hasattr(obj, "item") else str(obj)
+
+
+def _encode(payload) -> Tuple[bytes, str]:
+    body = json.dumps(_finite(payload), default=_json_default, allow_nan=False).encode()
+    return body, '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+class ApiState:
+    """Latest scan output, serialized lazily once per publish."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scan: Optional[Dict] = None
+        self._features: Dict[str, Dict] = {}
+        self._encoded: Dict[str, Tuple[bytes, str]] = {}
+
+    def publish_scan(self, scan_result: Dict, features: Optional[Dict[str, Dict]] = None) -> None:
+        """Called after each scan; `features` maps symbol -> feature dict (None keeps the last set)."""
+        with self._lock:
+            self._scan = scan_result
+            if features is not None:
+                self._features = features
+            self._encoded = {}
+
+    def _cached(self, key: str, build) -> Tuple[bytes, str]:
+        with self._lock:
+            hit = self._encoded.get(key)
+            if hit is None:
+                hit = self._encoded[key] = _encode(build())
+            return hit
+
+    def scan(self) -> Optional[Tuple[bytes, str]]:
+        if self._scan is None:
+            return None
+        return self._cached("scan", lambda: self._scan)
+
+    def features(self, symbol: Optional[str] = None) -> Optional[Tuple[bytes, str]]:
+        if symbol is None:
+            return self._cached("features", lambda: self._features)
+        if symbol not in self._features:
+            return None
+        return self._cached(f"features/{symbol}", lambda: self._features[symbol])
+
+
+state = ApiState()
+
+
+def publish_scan(scan_result: Dict, features: Optional[Dict[str, Dict]] = None) -> None:
+    state.publish_scan(scan_result, features)
+
+
+def _positions() -> Tuple[bytes, str]:
+    from core.positions import book
+    return _encode(book.positions())
+
+
+def _chart(name: str) -> Optional[Tuple[bytes, str]]:
+    from infra import monitor
+
+    graph_dir = os.path.realpath(monitor.GRAPH_DIR)
+    path = os.path.realpath(os.path.join(graph_dir, name))
+    if os.path.dirname(path) != graph_dir or not path.endswith(".png"):
+        return None
+    try:
+        st = os.stat(path)
+        with open(path, "rb") as f:
+            body = f.read()
+    except OSError:
+        return None
+    return body, f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def _route(path: str):
+    """Returns (status, body, etag, content type)."""
+    parts = [unquote(p) for p in urlsplit(path).path.split("/") if p]
+    found = None
+    ctype = "application/json"
+    if parts == ["scan"]:
+        found = state.scan()
+    elif parts == ["features"]:
+        found = state.features()
+    elif len(parts) == 2 and parts[0] == "features":
+        found = state.features(parts[1].upper())
+    elif parts == ["positions"]:
+        found = _positions()
+    elif len(parts) == 2 and parts[0] == "charts":
+        found = _chart(parts[1])
+        ctype = "image/png"
+    if found is None:
+        return 404, b'{"error": "not found"}', None, "application/json"
+    return 200, found[0], found[1], ctype
+
+
+async def _read_request(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, Dict[str, str]]]:
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=_IDLE_SECONDS)
+    except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+        return None
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, _ = lines[0].split(" ", 2)
+    except ValueError:
+        return "", "", {}
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            key, value = line.split(":", 1)
+            headers[key.strip().lower()] = value.strip()
+    return method.upper(), target, headers
+
+
+def _etag_matches(etag: str, header: str) -> bool:
+    """`If-None-Match` check: `*` or any listed tag, weak or strong, equal to `etag`."""
+    for tag in header.split(","):
+        tag = tag.strip()
+        if tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == "*" or tag == etag.removeprefix("W/"):
+            return True
+    return False
+
+
+async def _handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            request = await _read_request(reader)
+            if request is None:
+                break
+            method, target, headers = request
+            if not method:
+                status, body, etag, ctype = 400, b"", None, "text/plain"
+            elif method not in ("GET", "HEAD"):
+                status, body, etag, ctype = 405, b"", None, "text/plain"
+            else:
+                # file reads and the position book may block briefly; keep the loop free
+                status, body, etag, ctype = await loop.run_in_executor(None, _route, target)
+            if status == 200 and etag and _etag_matches(etag, headers.get("if-none-match", "")):
+                status, body = 304, b""
+            keep_alive = headers.get("connection", "").lower() != "close"
+            out = [f"HTTP/1.1 {status} {_REASONS[status]}", f"Content-Type: {ctype}",
+                   f"Content-Length: {len(body)}", "Cache-Control: no-cache",
+                   f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+            if etag:
+                out.append(f"ETag: {etag}")
+            writer.write(("\r\n".join(out) + "\r\n\r\n").encode("latin-1"))
+            if method != "HEAD":
+                writer.write(body)
+            await writer.drain()
+            log.debug("api: %s %s -> %s", method, target, status)
+            if not keep_alive:
+                break
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+def start_api_server(port: Optional[int] = None, host: str = API_HOST) -> Optional[threading.Thread]:
+    port = API_PORT if port is None else port
+    if not port:
+        return None
+    ready = threading.Event()
+    failed = []
+
+    def _serve():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            server = loop.run_until_complete(
+                asyncio.start_server(_handle, host, port, limit=_MAX_HEADER_BYTES)
+            )
+        except OSError as exc:
+            failed.append(exc)
+            ready.set()
+            return
+        ready.set()
+        loop.run_until_complete(server.serve_forever())
+
+    thread = threading.Thread(target=_serve, name="http-api", daemon=True)
+    thread.start()
+    ready.wait(timeout=5)
+    if failed:
+        log.error(f"Failed to start HTTP API on {host}:{port}: {failed[0]}")
+        return None
+    log.info(f"HTTP API listening on http://{host}:{port}/scan")
+    return thread
@@ -2,9 +2,10 @@
 Database logic for fin_assist (SQLite or placeholder).
 """
 
+import json
 import sqlite3
 import os
-from datetime import datetime
+import re
 from infra.logging import log
 
 DB_PATH = os.path.join(os.path.dirname(__file__), '../data/market.db')
@@ -32,6 +33,53 @@ def initialize_db():
         metadata TEXT,
         timestamp TEXT
     )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS quotes (
+        symbol TEXT PRIMARY KEY,
+        price REAL,
+        bar_ts TEXT,
+        updated_at REAL
+    )''')
+    c.execute('''CREATE TABLE IF NOT EXISTS decisions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        symbol TEXT NOT NULL,
+        action TEXT NOT NULL,
+        scope TEXT,
+        ts TEXT NOT NULL,
+        day TEXT NOT NULL,
+        bar_ts TEXT,
+        price REAL,
+        rsi REAL,
+        atr_pct REAL,
+        vol_spike REAL,
+        score REAL,
+        sentiment TEXT,
+        resolved INTEGER NOT NULL DEFAULT 0,
+        outcome_price REAL,
+        outcome_pct REAL
+    )''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_decisions_symbol_ts ON decisions (symbol, ts)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_decisions_ts ON decisions (ts)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_decisions_pending ON decisions (symbol) WHERE resolved = 0')
+    # symbol '*' rows aggregate all symbols
+    c.execute('''CREATE TABLE IF NOT EXISTS decision_daily (
+        symbol TEXT NOT NULL,
+        action TEXT NOT NULL,
+        day TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        price_sum REAL NOT NULL DEFAULT 0,
+        outcomes INTEGER NOT NULL DEFAULT 0,
+        outcome_pct_sum REAL NOT NULL DEFAULT 0,
+        wins INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (symbol, action, day)
+    ) WITHOUT ROWID''')
+    # latest scan summaries (infra.metrics), shared between processes
+    c.execute('''CREATE TABLE IF NOT EXISTS scan_metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        started REAL,
+        scope TEXT,
+        summary TEXT
+    )''')
+    _backfill_decisions(c)
     conn.commit()
     conn.close()
     log.info("Database initialized.")
@@ -46,23 +94,30 @@ def record_position(symbol, qty, price, timestamp):
     conn.close()
     log.info(f"Position recorded: {symbol_key} qty={qty} price={price} @ {timestamp}")
 
-def update_position(symbol, qty_delta, price, timestamp):
+_ADD_TO_POSITION = (
+    'INSERT INTO positions (symbol, qty, price, timestamp) VALUES (?, ?, ?, ?) '
+    'ON CONFLICT(symbol) DO UPDATE SET '
+    'qty = positions.qty + excluded.qty, '
+    # buys average the cost; sells keep it so open P&L stays against the entry
+    'price = CASE WHEN positions.qty <= 0 THEN excluded.price '
+    'WHEN excluded.qty <= 0 THEN positions.price '
+    'ELSE (positions.qty * positions.price + excluded.qty * excluded.price) / (positions.qty + excluded.qty) END, '
+    'timestamp = excluded.timestamp '
+    'RETURNING symbol, qty, price, timestamp'
+)
+
+def add_to_position(symbol, qty_delta, price, timestamp):
+    """Atomically apply `qty_delta` to a position; returns the resulting row (None once closed)."""
     conn = _get_conn()
-    c = conn.cursor()
     symbol_key = symbol.upper()
-    c.execute('SELECT qty FROM positions WHERE symbol=?', (symbol_key,))
-    row = c.fetchone()
-    new_qty = qty_delta
-    if row:
-        new_qty += row['qty']
-    if new_qty == 0:
-        c.execute('DELETE FROM positions WHERE symbol=?', (symbol_key,))
-    else:
-        c.execute('REPLACE INTO positions (symbol, qty, price, timestamp) VALUES (?, ?, ?, ?)',
-                  (symbol_key, new_qty, price, timestamp))
-    conn.commit()
+    with conn:
+        row = conn.execute(_ADD_TO_POSITION, (symbol_key, qty_delta, price, timestamp)).fetchone()
+        if row['qty'] <= 0:
+            conn.execute('DELETE FROM positions WHERE symbol=? AND qty <= 0', (symbol_key,))
+            row = None
     conn.close()
     log.info(f"Position updated: {symbol_key} qty_delta={qty_delta} price={price} @ {timestamp}")
+    return dict(row) if row else None
 
 def get_open_positions():
     conn = _get_conn()
@@ -76,15 +131,181 @@ def get_open_positions():
             entry['symbol'] = sym.upper()
         positions.append(entry)
     conn.close()
-    log.info(f"Fetched open positions: {positions}")
+    log.debug("Fetched %d open positions", len(positions))
     return positions
 
-def record_trade_decision(symbol, action, price, metadata):
+_DECISION_COLUMNS = ('symbol', 'action', 'scope', 'ts', 'day', 'bar_ts', 'price',
+                     'rsi', 'atr_pct', 'vol_spike', 'score', 'sentiment', 'resolved')
+
+_ROLLUP_COUNT = (
+    'INSERT INTO decision_daily (symbol, action, day, count, price_sum) VALUES (?, ?, ?, 1, ?) '
+    'ON CONFLICT(symbol, action, day) DO UPDATE SET '
+    'count = count + 1, price_sum = price_sum + excluded.price_sum'
+)
+
+_ROLLUP_OUTCOME = (
+    'INSERT INTO decision_daily (symbol, action, day, outcomes, outcome_pct_sum, wins) VALUES (?, ?, ?, 1, ?, ?) '
+    'ON CONFLICT(symbol, action, day) DO UPDATE SET outcomes = outcomes + 1, '
+    'outcome_pct_sum = outcome_pct_sum + excluded.outcome_pct_sum, wins = wins + excluded.wins'
+)
+
+def _insert_decisions(c, rows):
+    marks = ', '.join('?' * len(_DECISION_COLUMNS))
+    c.executemany(f'INSERT INTO decisions ({", ".join(_DECISION_COLUMNS)}) VALUES ({marks})',
+                  [tuple(row.get(col) for col in _DECISION_COLUMNS) for row in rows])
+    for row in rows:
+        for sym in (row['symbol'], '*'):
+            c.execute(_ROLLUP_COUNT, (sym, row['action'], row['day'], row['price'] or 0.0))
+
+def record_decisions(rows):
+    """rows: dicts with the `decisions` columns; daily rollups are updated in the same transaction."""
+    rows = [dict(row, day=row.get('day') or row['ts'][:10], resolved=0 if row.get('bar_ts') else 1)
+            for row in rows]
+    if not rows:
+        return
+    conn = _get_conn()
+    with conn:
+        _insert_decisions(conn.cursor(), rows)
+    conn.close()
+    log.info(f"Decisions recorded: {len(rows)}")
+
+_CONFIDENCE_FIELD = re.compile(r'(rsi|atr_pct|sentiment)=([^,]+)')
+
+def _backfill_decisions(c):
+    """One-off copy of the legacy `trades` rows (free-text confidence) into `decisions`."""
+    if c.execute('SELECT 1 FROM decisions LIMIT 1').fetchone():
+        return
+    rows = []
+    for trade in c.execute('SELECT symbol, action, price, metadata, timestamp FROM trades').fetchall():
+        fields = dict(_CONFIDENCE_FIELD.findall(trade['metadata'] or ''))
+
+        def _num(name):
+            try:
+                return float(fields[name])
+            except (KeyError, ValueError):
+                return None
+
+        rows.append({
+            'symbol': trade['symbol'].upper(), 'action': trade['action'], 'ts': trade['timestamp'],
+            'day': trade['timestamp'][:10], 'price': trade['price'], 'rsi': _num('rsi'),
+            'atr_pct': _num('atr_pct'), 'sentiment': fields.get('sentiment', '').strip() or None,
+            'resolved': 1,
+        })
+    if rows:
+        _insert_decisions(c, rows)
+        log.info(f"Backfilled {len(rows)} legacy trade decisions")
+
+def pending_decisions(symbols=None):
+    """Unresolved decisions as {symbol: [row, ...]}, via the partial index."""
     conn = _get_conn()
     c = conn.cursor()
-    ts = datetime.utcnow().isoformat()
-    c.execute('INSERT INTO trades (symbol, action, price, metadata, timestamp) VALUES (?, ?, ?, ?, ?)',
-              (symbol, action, price, str(metadata), ts))
+    query = 'SELECT id, symbol, action, day, bar_ts FROM decisions WHERE resolved = 0'
+    params = []
+    if symbols is not None:
+        symbols = [s.upper() for s in symbols]
+        query += f' AND symbol IN ({",".join("?" * len(symbols))})'
+        params = symbols
+    out = {}
+    for row in c.execute(query, params).fetchall():
+        out.setdefault(row['symbol'], []).append(dict(row))
+    conn.close()
+    return out
+
+def resolve_decisions(resolved):
+    """
+    resolved: iterable of (row, outcome_price, outcome_pct) for rows from
+    `pending_decisions`; outcome_pct None closes the row without an outcome.
+    """
+    resolved = list(resolved)
+    if not resolved:
+        return
+    conn = _get_conn()
+    with conn:
+        c = conn.cursor()
+        for row, outcome_price, outcome_pct in resolved:
+            updated = c.execute(
+                'UPDATE decisions SET resolved = 1, outcome_price = ?, outcome_pct = ? WHERE id = ? AND resolved = 0',
+                (outcome_price, outcome_pct, row['id']),
+            ).rowcount
+            if not updated or outcome_pct is None:
+                continue
+            for sym in (row['symbol'], '*'):
+                c.execute(_ROLLUP_OUTCOME, (sym, row['action'], row['day'], outcome_pct, int(outcome_pct > 0)))
+    conn.close()
+    log.debug(f"Decision outcomes resolved: {len(resolved)}")
+
+def decision_rollup(symbol, since_day):
+    """Per-action totals from `decision_daily` for `symbol` ('*' for all) since `since_day`."""
+    conn = _get_conn()
+    c = conn.cursor()
+    c.execute(
+        'SELECT action, SUM(count) AS count, SUM(price_sum) AS price_sum, SUM(outcomes) AS outcomes, '
+        'SUM(outcome_pct_sum) AS outcome_pct_sum, SUM(wins) AS wins FROM decision_daily '
+        'WHERE symbol = ? AND day >= ? GROUP BY action',
+        (symbol.upper(), since_day),
+    )
+    rows = {row['action']: dict(row) for row in c.fetchall()}
+    conn.close()
+    return rows
+
+def recent_decisions(symbol, limit=5):
+    conn = _get_conn()
+    c = conn.cursor()
+    c.execute('SELECT symbol, action, ts, price, rsi, atr_pct, sentiment, outcome_pct FROM decisions '
+              'WHERE symbol = ? ORDER BY ts DESC LIMIT ?', (symbol.upper(), limit))
+    rows = [dict(row) for row in c.fetchall()]
+    conn.close()
+    return rows
+
+def record_scan_metrics(summary, keep):
+    """Store one scan summary and drop all but the newest `keep`."""
+    conn = _get_conn()
+    with conn:
+        cur = conn.execute('INSERT INTO scan_metrics (started, scope, summary) VALUES (?, ?, ?)',
+                           (summary['started'], summary['scope'], json.dumps(summary)))
+        conn.execute('DELETE FROM scan_metrics WHERE id <= ?', (cur.lastrowid - keep,))
+    conn.close()
+
+def recent_scan_metrics(n):
+    """The newest `n` scan summaries, oldest first."""
+    conn = _get_conn()
+    rows = conn.execute('SELECT summary FROM scan_metrics ORDER BY id DESC LIMIT ?', (n,)).fetchall()
+    conn.close()
+    return [json.loads(row['summary']) for row in reversed(rows)]
+
+def upsert_quotes(rows):
+    """rows: iterable of (symbol, price, bar_ts, updated_at) tuples."""
+    rows = list(rows)
+    if not rows:
+        return
+    conn = _get_conn()
+    c = conn.cursor()
+    c.executemany(
+        'INSERT INTO quotes (symbol, price, bar_ts, updated_at) VALUES (?, ?, ?, ?) '
+        'ON CONFLICT(symbol) DO UPDATE SET price=excluded.price, bar_ts=excluded.bar_ts, '
+        'updated_at=excluded.updated_at WHERE excluded.updated_at >= quotes.updated_at',
+        rows,
+    )
     conn.commit()
     conn.close()
-    log.info(f"Trade decision recorded: {symbol} {action} price={price} meta={metadata}")
+    log.debug(f"Quotes upserted: {len(rows)}")
+
+def get_quotes(symbols):
+    symbols = [s.upper() for s in symbols]
+    if not symbols:
+        return {}
+    conn = _get_conn()
+    c = conn.cursor()
+    marks = ','.join('?' * len(symbols))
+    c.execute(f'SELECT symbol, price, bar_ts, updated_at FROM quotes WHERE symbol IN ({marks})', symbols)
+    rows = {row['symbol']: dict(row) for row in c.fetchall()}
+    conn.close()
+    return rows
+
+def get_quote(symbol):
+    conn = _get_conn()
+    c = conn.cursor()
+    c.execute('SELECT symbol, price, bar_ts, updated_at FROM quotes WHERE symbol=?', (symbol.upper(),))
+    row = c.fetchone()
+    conn.close()
+    return dict(row) if row else None
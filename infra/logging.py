@@ -1,40 +1,207 @@
 """
 Logging setup for fin_assist.
+
+`setup_logging` installs a rotating file handler and a stderr handler. With
+`LOG_ASYNC` both sit behind a queue: the caller only enqueues the record and
+a listener thread formats and writes it, so a slow disk never stalls a scan.
+`%`-style arguments stay unformatted until the listener needs them.
+
+Records carry the current scan and symbol IDs (`set_log_context`). The
+fields live in a context variable, so work handed to a pool through
+`contextvars.copy_context().run` logs under the caller's IDs. With
+`LOG_JSON` the file gets one JSON object per line including those fields.
+`LOG_SAMPLE_RATES` keeps only a fraction of DEBUG records from high-volume
+modules and `LOG_RATE_LIMIT` caps DEBUG/INFO records per module per second.
 """
+import atexit
+import contextvars
+import json
 import os
 import logging
-from logging.handlers import RotatingFileHandler
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
 
 LOG_DIR = os.path.join(os.path.dirname(__file__), '..', 'logs')
 LOG_FILE = os.path.join(LOG_DIR, 'market_assistant.log')
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(module)s] %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_context: contextvars.ContextVar = contextvars.ContextVar("log_context", default={})
+_listener: Optional[QueueListener] = None
+_installed = None
+
+
+def set_log_context(**fields) -> None:
+    """Set (or with None, clear) fields such as `scan_id`/`symbol` for this context's records."""
+    current = dict(_context.get())
+    for key, value in fields.items():
+        if value is None:
+            current.pop(key, None)
+        else:
+            current[key] = value
+    _context.set(current)
+
+
+class _ContextFilter(logging.Filter):
+    # runs on the calling thread, before the record is queued
+    def filter(self, record):
+        for key, value in _context.get().items():
+            setattr(record, key, value)
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Drops DEBUG/INFO records per module by sample rate and per-second cap."""
+
+    def __init__(self, rates: Dict[str, float], rate_limit: int = 0):
+        super().__init__()
+        self.rates = rates
+        self.rate_limit = rate_limit
+        self._seen: Dict[str, int] = {}
+        self._windows: Dict[str, list] = {}
+        self.dropped: Dict[str, int] = {}
+
+    def _drop(self, module):
+        self.dropped[module] = self.dropped.get(module, 0) + 1
+        return False
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        module = record.module
+        rate = self.rates.get(module)
+        if rate is not None and record.levelno <= logging.DEBUG:
+            # deterministic 1-in-N keeps the sampled records evenly spread
+            seen = self._seen.get(module, 0)
+            self._seen[module] = seen + 1
+            if rate <= 0 or seen % max(1, round(1 / rate)):
+                return self._drop(module)
+        if self.rate_limit:
+            second = int(record.created)
+            window = self._windows.get(module)
+            if window is None or window[0] != second:
+                window = self._windows[module] = [second, 0]
+            window[1] += 1
+            if window[1] > self.rate_limit:
+                return self._drop(module)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        out = {
+            "ts": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "module": record.module,
+            "msg": record.getMessage(),
+        }
+        for key in ("scan_id", "symbol"):
+            value = getattr(record, key, None)
+            if value is not None:
+                out[key] = value
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, default=str)
 
 
-def setup_logging():
-    if not os.path.exists(LOG_DIR):
-        os.makedirs(LOG_DIR, exist_ok=True)
+class _LazyQueueHandler(QueueHandler):
+    # The stock handler formats the message on the caller's thread; the
+    # listener runs in this process, so the record can be queued as is.
+    def prepare(self, record):
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        return record
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging(log_dir: Optional[str] = None, json_format: Optional[bool] = None,
+                  async_mode: Optional[bool] = None, console: bool = True):
+    """(Re)configure the `fin_assist` logger; repeated calls with the same settings are no-ops."""
+    from config import settings as cfg
+
+    log_dir = log_dir or LOG_DIR
+    json_format = cfg.LOG_JSON if json_format is None else json_format
+    async_mode = cfg.LOG_ASYNC if async_mode is None else async_mode
+    global log, _installed, _listener
     logger = logging.getLogger('fin_assist')
+    key = (os.path.abspath(log_dir), json_format, async_mode, console)
+    if _installed == key:
+        return logger
+    _stop_listener()
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+        handler.close()
+    for flt in logger.filters[:]:
+        logger.removeFilter(flt)
+
+    os.makedirs(log_dir, exist_ok=True)
     logger.setLevel(logging.DEBUG)
-    formatter = logging.Formatter(fmt="%(asctime)s %(levelname)s [%(module)s] %(message)s",
-                                  datefmt="%Y-%m-%d %H:%M:%S")
+    text = logging.Formatter(fmt=TEXT_FORMAT, datefmt=DATE_FORMAT)
     # file handler
-    fh = RotatingFileHandler(LOG_FILE, maxBytes=5 * 1024 * 1024, backupCount=5)
+    fh = RotatingFileHandler(os.path.join(log_dir, os.path.basename(LOG_FILE)),
+                             maxBytes=5 * 1024 * 1024, backupCount=5)
     fh.setLevel(logging.DEBUG)
-    fh.setFormatter(formatter)
-    # stream handler
-    sh = logging.StreamHandler()
-    sh.setLevel(logging.INFO)
-    sh.setFormatter(formatter)
-
-    if not logger.handlers:
-        logger.addHandler(fh)
-        logger.addHandler(sh)
+    fh.setFormatter(JsonFormatter() if json_format else text)
+    handlers = [fh]
+    if console:
+        # stream handler
+        sh = logging.StreamHandler()
+        sh.setLevel(logging.INFO)
+        sh.setFormatter(text)
+        handlers.append(sh)
+
+    logger.addFilter(SamplingFilter(cfg.LOG_SAMPLE_RATES, cfg.LOG_RATE_LIMIT))
+    logger.addFilter(_ContextFilter())
+    if async_mode:
+        records = queue.SimpleQueue()
+        logger.addHandler(_LazyQueueHandler(records))
+        _listener = QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
     logger.propagate = False
+    _installed = key
     # expose module-level
-    global log
     log = logger
     return logger
 
 
+def sampling_stats() -> Dict[str, int]:
+    """Records dropped by sampling/rate limiting so far, per module."""
+    for flt in logging.getLogger('fin_assist').filters:
+        if isinstance(flt, SamplingFilter):
+            return dict(flt.dropped)
+    return {}
+
+
+def _after_fork_in_child():
+    # The listener thread does not survive fork, and multiprocessing children
+    # exit via os._exit (no atexit drain), so forked children log synchronously.
+    global _listener, _installed
+    if _listener is None:
+        return
+    logger = logging.getLogger('fin_assist')
+    for handler in logger.handlers[:]:
+        if isinstance(handler, _LazyQueueHandler):
+            logger.removeHandler(handler)
+    for handler in _listener.handlers:
+        logger.addHandler(handler)
+    _listener = None
+    _installed = _installed[:2] + (False,) + _installed[3:]
+
+
+# drain the queue before the interpreter exits
+atexit.register(_stop_listener)
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
 # ensure a default logger is available on import
 try:
     log
@@ -0,0 +1,254 @@
+"""
+Memory guard for the long-running processes.
+
+In-process caches are `BoundedCache`s (LRU with an entry limit and optional
+TTL) or objects exposing `__len__` and `trim(fraction)`, and all of them are
+listed in a registry. `start_memory_guard` runs a daemon thread that checks
+RSS every `MEMORY_CHECK_SECONDS`. Above `MEMORY_SOFT_LIMIT_MB` it trims
+every registered cache by `MEMORY_TRIM_FRACTION`, closes stray pyplot
+figures and runs a GC pass. Every `MEMORY_REPORT_SECONDS` it logs a report
+of RSS and per-cache sizes. With `MEMORY_TRACEMALLOC_TOP` set, the report
+also lists the allocation sites that grew most since the previous report.
+"""
+
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterator, List, Optional, Tuple
+
+from config import settings as cfg
+from infra import metrics
+from infra.logging import log
+
+_MISSING = object()
+_registry: Dict[str, object] = {}
+
+
+def register(name: str, cache) -> None:
+    """Add a cache (`__len__` + `trim(fraction)`) to the memory report and trimming."""
+    _registry[name] = cache
+
+
+def registered() -> Dict[str, object]:
+    return dict(_registry)
+
+
+class BoundedCache:
+    """Thread-safe LRU mapping with an entry limit and optional per-entry TTL (seconds)."""
+
+    def __init__(self, name: str, max_entries: int, ttl: Optional[float] = None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"evictions": 0, "expired": 0, "trimmed": 0}
+        register(name, self)
+
+    def _expired(self, stamp: float, now: float) -> bool:
+        return self.ttl is not None and now - stamp > self.ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._entries.get(key, _MISSING)
+            if item is _MISSING:
+                return default
+            if self._expired(item[0], time.time()):
+                del self._entries[key]
+                self.stats["expired"] += 1
+                return default
+            self._entries.move_to_end(key)
+            return item[1]
+
+    def set(self, key, value, stamp: Optional[float] = None) -> None:
+        """Store `value`; `stamp` (epoch seconds) backdates it for the TTL."""
+        with self._lock:
+            self._entries[key] = (time.time() if stamp is None else stamp, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    __setitem__ = set
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._entries.pop(key, None)
+        return default if item is None else item[1]
+
+    def items(self) -> List[Tuple[Hashable, object]]:
+        """Live (unexpired) entries, least recently used first."""
+        now = time.time()
+        with self._lock:
+            return [(k, v) for k, (stamp, v) in self._entries.items() if not self._expired(stamp, now)]
+
+    def __iter__(self) -> Iterator:
+        return iter([k for k, _ in self.items()])
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def expire(self) -> int:
+        """Drop expired entries now rather than on their next lookup."""
+        if self.ttl is None:
+            return 0
+        now = time.time()
+        with self._lock:
+            stale = [k for k, (stamp, _) in self._entries.items() if self._expired(stamp, now)]
+            for key in stale:
+                del self._entries[key]
+            self.stats["expired"] += len(stale)
+        return len(stale)
+
+    def trim(self, fraction: float) -> int:
+        """Evict expired entries, then the least recently used `fraction` of the rest."""
+        dropped = self.expire()
+        with self._lock:
+            count = int(len(self._entries) * fraction)
+            for _ in range(count):
+                self._entries.popitem(last=False)
+            self.stats["trimmed"] += count
+        return dropped + count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+def rss_mb() -> Optional[float]:
+    """Current resident set size in MiB (Linux), else the peak from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+    except (ImportError, OSError):
+        return None
+
+
+def trim_caches(fraction: float = None) -> Dict[str, int]:
+    """Trim every registered cache by `fraction`; returns entries dropped per cache."""
+    fraction = cfg.MEMORY_TRIM_FRACTION if fraction is None else fraction
+    dropped = {}
+    for name, cache in registered().items():
+        try:
+            dropped[name] = cache.trim(fraction)
+        except Exception as exc:
+            log.error(f"Failed to trim cache {name}: {exc}", exc_info=True)
+    if "matplotlib.pyplot" in sys.modules:
+        sys.modules["matplotlib.pyplot"].close("all")
+    gc.collect()
+    return dropped
+
+
+class MemoryGuard:
+    def __init__(self, soft_limit_mb: float = None, check_seconds: float = None,
+                 report_seconds: float = None, tracemalloc_top: int = None):
+        self.soft_limit_mb = cfg.MEMORY_SOFT_LIMIT_MB if soft_limit_mb is None else soft_limit_mb
+        self.check_seconds = cfg.MEMORY_CHECK_SECONDS if check_seconds is None else check_seconds
+        self.report_seconds = cfg.MEMORY_REPORT_SECONDS if report_seconds is None else report_seconds
+        self.tracemalloc_top = cfg.MEMORY_TRACEMALLOC_TOP if tracemalloc_top is None else tracemalloc_top
+        self._snapshot = None
+        self.trims = 0
+        if self.tracemalloc_top and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def report(self) -> Dict:
+        out = {"rss_mb": rss_mb(), "soft_limit_mb": self.soft_limit_mb, "trims": self.trims, "caches": {}}
+        for name, cache in registered().items():
+            entry = {"entries": len(cache)}
+            for attr in ("max_entries", "ttl"):
+                if getattr(cache, attr, None) is not None:
+                    entry[attr] = getattr(cache, attr)
+            entry.update(getattr(cache, "stats", {}))
+            out["caches"][name] = entry
+        if tracemalloc.is_tracing() and self.tracemalloc_top:
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [tracemalloc.Filter(False, tracemalloc.__file__)]
+            )
+            if self._snapshot is None:
+                stats = snapshot.statistics("lineno")
+                out["top_sites"] = [(str(s.traceback), s.size, s.size) for s in stats[: self.tracemalloc_top]]
+            else:
+                stats = snapshot.compare_to(self._snapshot, "lineno")
+                out["top_sites"] = [(str(s.traceback), s.size, s.size_diff) for s in stats[: self.tracemalloc_top]]
+            self._snapshot = snapshot
+        return out
+
+    def check(self) -> Optional[Dict[str, int]]:
+        """Trim caches if RSS is over the soft limit; returns what was dropped."""
+        rss = rss_mb()
+        if not self.soft_limit_mb or rss is None or rss <= self.soft_limit_mb:
+            return None
+        dropped = trim_caches()
+        self.trims += 1
+        metrics.incr("memory_trim")
+        after = rss_mb()
+        log.warning(
+            f"RSS {rss:.0f} MiB over soft limit {self.soft_limit_mb} MiB; trimmed caches "
+            f"({', '.join(f'{k}={v}' for k, v in dropped.items())}), now {after:.0f} MiB"
+        )
+        return dropped
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        stop = stop or threading.Event()
+        last_report = 0.0
+        while not stop.wait(self.check_seconds):
+            try:
+                self.check()
+                if self.report_seconds and time.monotonic() - last_report >= self.report_seconds:
+                    log.info(format_report(self.report()))
+                    last_report = time.monotonic()
+            except Exception as exc:
+                log.error(f"Memory guard error: {exc}", exc_info=True)
+
+
+guard: Optional[MemoryGuard] = None
+
+
+def format_report(report: Dict) -> str:
+    rss = f"{report['rss_mb']:.0f} MiB" if report["rss_mb"] is not None else "n/a"
+    limit = f"{report['soft_limit_mb']} MiB" if report["soft_limit_mb"] else "off"
+    lines = [f"Memory: RSS {rss} (soft limit {limit}, {report['trims']} trim(s))"]
+    for name, cache in sorted(report["caches"].items()):
+        bound = f"/{cache['max_entries']}" if "max_entries" in cache else ""
+        extra = ", ".join(f"{k} {v}" for k, v in cache.items() if k not in ("entries", "max_entries") and v)
+        lines.append(f"- {name}: {cache['entries']}{bound} entries" + (f" ({extra})" if extra else ""))
+    if report.get("top_sites"):
+        lines.append("Top allocation sites (size, change since last report):")
+        for site, size, diff in report["top_sites"]:
+            lines.append(f"- {site}: {size / 1024:.0f} KiB ({diff / 1024:+.0f} KiB)")
+    return "\n".join(lines)
+
+
+def format_memory_text() -> str:
+    return format_report((guard or MemoryGuard(tracemalloc_top=0)).report())
+
+
+def start_memory_guard() -> Optional[threading.Thread]:
+    global guard
+    if not cfg.MEMORY_CHECK_SECONDS:
+        return None
+    guard = MemoryGuard()
+    thread = threading.Thread(target=guard.run, name="memory-guard", daemon=True)
+    thread.start()
+    log.info(f"Memory guard started (soft limit {guard.soft_limit_mb} MiB)")
+    return thread
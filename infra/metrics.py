@@ -0,0 +1,334 @@
+"""
+Scan telemetry: per-stage timings, cache hit rates and error counters.
+
+Each scan gets a `ScanMetrics` collector; finished scans are kept in a
+rolling in-process registry that backs the Prometheus-style exporter. Their
+summaries are also written to the `scan_metrics` table, so `/stats` in the
+Telegram listener sees the scheduler's scans too. Sharded scans merge their
+workers' summaries into the coordinator's collector (`ScanMetrics.merge`).
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+from config.settings import METRICS_HISTORY, METRICS_HOST, METRICS_PORT
+from infra.logging import log
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, float("inf"))
+_SLOWEST_KEEP = 5
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.sum += value
+        self.count += 1
+        if value > self.max:
+            self.max = value
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def merge(self, other: "Histogram") -> None:
+        for i, c in enumerate(other.counts):
+            self.counts[i] += c
+        self.sum += other.sum
+        self.count += other.count
+        self.max = max(self.max, other.max)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Histogram":
+        """Inverse of `to_dict`, e.g. for a summary sent by another process."""
+        hist = cls()
+        hist.counts = [data["buckets"].get("+Inf" if b == float("inf") else str(b), 0) for b in BUCKETS]
+        hist.sum = data["sum"]
+        hist.count = data["count"]
+        hist.max = data["max"]
+        return hist
+
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 6),
+            "avg": round(self.sum / self.count, 6) if self.count else 0.0,
+            "max": round(self.max, 6),
+            "buckets": {("+Inf" if b == float("inf") else str(b)): c for b, c in zip(BUCKETS, self.counts)},
+        }
+
+
+class ScanMetrics:
+    """Collector for a single scan."""
+
+    def __init__(self, scope: str):
+        self.scope = scope
+        self.started = time.time()
+        self.duration = 0.0
+        self.stages: Dict[str, Histogram] = {}
+        self.latencies: Dict[str, Histogram] = {}
+        self.symbols = Histogram()
+        self.counters: Dict[str, int] = {}
+        self.slowest: List = []
+
+    def observe_stage(self, name: str, seconds: float) -> None:
+        hist = self.stages.get(name)
+        if hist is None:
+            hist = self.stages[name] = Histogram()
+        hist.observe(seconds)
+
+    def observe_latency(self, name: str, seconds: float) -> None:
+        """Scan-relative latencies such as time to first alert."""
+        hist = self.latencies.get(name)
+        if hist is None:
+            hist = self.latencies[name] = Histogram()
+        hist.observe(seconds)
+
+    def observe_symbol(self, symbol: str, seconds: float) -> None:
+        self.symbols.observe(seconds)
+        self.slowest.append((seconds, symbol))
+        self.slowest.sort(reverse=True)
+        del self.slowest[_SLOWEST_KEEP:]
+
+    def incr(self, name: str, amount: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + amount
+
+    def merge(self, summary: Dict) -> None:
+        """Fold in another collector's `to_dict()` (a shard worker's) except its duration."""
+        for attr, key in ((self.stages, "stages"), (self.latencies, "latencies")):
+            for name, data in summary.get(key, {}).items():
+                attr.setdefault(name, Histogram()).merge(Histogram.from_dict(data))
+        if "symbols" in summary:
+            self.symbols.merge(Histogram.from_dict(summary["symbols"]))
+        for name, amount in summary.get("counters", {}).items():
+            self.incr(name, amount)
+        self.slowest.extend((entry["seconds"], entry["symbol"]) for entry in summary.get("slowest_symbols", []))
+        self.slowest.sort(reverse=True)
+        del self.slowest[_SLOWEST_KEEP:]
+
+    def cache_hit_rates(self) -> Dict[str, float]:
+        rates = {}
+        for key, hits in self.counters.items():
+            if not key.endswith("_hit"):
+                continue
+            cache = key[: -len("_hit")]
+            total = hits + self.counters.get(f"{cache}_miss", 0)
+            rates[cache] = round(hits / total, 4) if total else 0.0
+        for key, misses in self.counters.items():
+            if key.endswith("_miss") and key[: -len("_miss")] not in rates:
+                rates[key[: -len("_miss")]] = 0.0
+        return rates
+
+    def to_dict(self) -> Dict:
+        return {
+            "scope": self.scope,
+            "started": self.started,
+            "duration": round(self.duration, 6),
+            "stages": {name: hist.to_dict() for name, hist in self.stages.items()},
+            "latencies": {name: hist.to_dict() for name, hist in self.latencies.items()},
+            "symbols": self.symbols.to_dict(),
+            "counters": dict(self.counters),
+            "cache_hit_rates": self.cache_hit_rates(),
+            "slowest_symbols": [{"symbol": s, "seconds": round(t, 6)} for t, s in self.slowest],
+        }
+
+
+class MetricsRegistry:
+    """Rolling history of finished scans plus cumulative totals for export."""
+
+    def __init__(self, history: int = METRICS_HISTORY):
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history)
+        self._stage_totals: Dict[str, Histogram] = {}
+        self._latency_totals: Dict[str, Histogram] = {}
+        self._symbol_totals = Histogram()
+        self._counter_totals: Dict[str, int] = {}
+        self._scans_total = 0
+        self._last_duration = 0.0
+        self.active: Optional[ScanMetrics] = None
+
+    def begin_scan(self, scope: str) -> ScanMetrics:
+        scan = ScanMetrics(scope)
+        self.active = scan
+        return scan
+
+    def end_scan(self, scan: ScanMetrics, persist: bool = True) -> Dict:
+        scan.duration = time.time() - scan.started
+        summary = scan.to_dict()
+        if persist:
+            from infra import database
+            try:
+                database.record_scan_metrics(summary, METRICS_HISTORY)
+            except sqlite3.Error as exc:
+                log.warning(f"Failed to store scan metrics: {exc}")
+        with self._lock:
+            self._history.append(summary)
+            for name, hist in scan.stages.items():
+                self._stage_totals.setdefault(name, Histogram()).merge(hist)
+            for name, hist in scan.latencies.items():
+                self._latency_totals.setdefault(name, Histogram()).merge(hist)
+            self._symbol_totals.merge(scan.symbols)
+            for key, value in scan.counters.items():
+                self._counter_totals[key] = self._counter_totals.get(key, 0) + value
+            self._scans_total += 1
+            self._last_duration = scan.duration
+        if self.active is scan:
+            self.active = None
+        return summary
+
+    def recent(self, n: Optional[int] = None) -> List[Dict]:
+        with self._lock:
+            items = list(self._history)
+        return items[-n:] if n else items
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            lines.append("# HELP fin_assist_scans_total Completed market scans.")
+            lines.append("# TYPE fin_assist_scans_total counter")
+            lines.append(f"fin_assist_scans_total {self._scans_total}")
+            lines.append("# HELP fin_assist_last_scan_duration_seconds Wall time of the last scan.")
+            lines.append("# TYPE fin_assist_last_scan_duration_seconds gauge")
+            lines.append(f"fin_assist_last_scan_duration_seconds {self._last_duration:.6f}")
+            lines.append("# HELP fin_assist_stage_seconds Time spent per scan stage.")
+            lines.append("# TYPE fin_assist_stage_seconds histogram")
+            for name in sorted(self._stage_totals):
+                lines.extend(_histogram_lines("fin_assist_stage_seconds", self._stage_totals[name], f'stage="{name}"'))
+            lines.append("# HELP fin_assist_latency_seconds Scan-relative latencies (e.g. first alert).")
+            lines.append("# TYPE fin_assist_latency_seconds histogram")
+            for name in sorted(self._latency_totals):
+                lines.extend(_histogram_lines("fin_assist_latency_seconds", self._latency_totals[name], f'name="{name}"'))
+            lines.append("# HELP fin_assist_symbol_seconds Time spent per analysed symbol.")
+            lines.append("# TYPE fin_assist_symbol_seconds histogram")
+            lines.extend(_histogram_lines("fin_assist_symbol_seconds", self._symbol_totals, ""))
+            lines.append("# HELP fin_assist_events_total Cache hits/misses and error counters.")
+            lines.append("# TYPE fin_assist_events_total counter")
+            for key in sorted(self._counter_totals):
+                lines.append(f'fin_assist_events_total{{event="{key}"}} {self._counter_totals[key]}')
+        return "\n".join(lines) + "\n"
+
+
+def _histogram_lines(metric: str, hist: Histogram, labels: str) -> List[str]:
+    sep = "," if labels else ""
+    out = []
+    cumulative = 0
+    for bound, count in zip(BUCKETS, hist.counts):
+        cumulative += count
+        le = "+Inf" if bound == float("inf") else str(bound)
+        out.append(f'{metric}_bucket{{{labels}{sep}le="{le}"}} {cumulative}')
+    suffix = f"{{{labels}}}" if labels else ""
+    out.append(f"{metric}_sum{suffix} {hist.sum:.6f}")
+    out.append(f"{metric}_count{suffix} {hist.count}")
+    return out
+
+
+registry = MetricsRegistry()
+
+
+def begin_scan(scope: str) -> ScanMetrics:
+    return registry.begin_scan(scope)
+
+
+def end_scan(scan: ScanMetrics, persist: bool = True) -> Dict:
+    """Finish `scan`; with `persist` its summary is also shared with other processes via SQLite."""
+    return registry.end_scan(scan, persist)
+
+
+def incr(name: str, amount: int = 1) -> None:
+    scan = registry.active
+    if scan is not None:
+        scan.incr(name, amount)
+
+
+@contextmanager
+def stage(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        scan = registry.active
+        if scan is not None:
+            scan.observe_stage(name, time.perf_counter() - start)
+
+
+def format_stats_text(n: int = 5) -> str:
+    from infra import database
+    try:
+        # scans of every process (the scheduler's included), not just this one
+        scans, source = database.recent_scan_metrics(n), "all processes"
+    except sqlite3.Error as exc:
+        log.warning(f"Failed to read scan metrics: {exc}")
+        scans, source = registry.recent(n), "this process only"
+    if not scans:
+        return "No scans recorded yet."
+    lines = [f"Last {len(scans)} scan(s) ({source}):"]
+    counters: Dict[str, int] = {}
+    for scan in scans:
+        started = time.strftime("%H:%M:%S", time.localtime(scan["started"]))
+        stages = sorted(scan["stages"].items(), key=lambda kv: kv[1]["sum"], reverse=True)
+        top = ", ".join(f"{name} {hist['sum']:.2f}s" for name, hist in stages[:3]) or "no stages"
+        first_alert = scan.get("latencies", {}).get("first_alert")
+        alert = f", first alert {first_alert['max']:.2f}s" if first_alert else ""
+        lines.append(
+            f"- {started} {scan['scope']}: {scan['duration']:.2f}s, "
+            f"{scan['symbols']['count']} symbols ({top}){alert}"
+        )
+        for key, value in scan["counters"].items():
+            counters[key] = counters.get(key, 0) + value
+    caches = sorted({k.rsplit("_", 1)[0] for k in counters if k.endswith(("_hit", "_miss"))})
+    for cache in caches:
+        hits = counters.get(f"{cache}_hit", 0)
+        total = hits + counters.get(f"{cache}_miss", 0)
+        lines.append(f"{cache} hit rate: {hits / total:.0%} ({hits}/{total})" if total else f"{cache}: no lookups")
+    errors = {k: v for k, v in counters.items() if "error" in k}
+    if errors:
+        lines.append("Errors: " + ", ".join(f"{k}={v}" for k, v in sorted(errors.items())))
+    else:
+        lines.append("Errors: none")
+    return "\n".join(lines)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body = json.dumps(registry.recent(), indent=2).encode()
+            ctype = "application/json"
+        elif self.path.startswith("/metrics"):
+            body = registry.render_prometheus().encode()
+            ctype = "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        log.debug(f"metrics exporter: {fmt % args}")
+
+
+def start_metrics_server(port: Optional[int] = None, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    port = METRICS_PORT if port is None else port
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as exc:
+        log.error(f"Failed to start metrics exporter on {host}:{port}: {exc}")
+        return None
+    thread = threading.Thread(target=server.serve_forever, name="metrics-exporter", daemon=True)
+    thread.start()
+    log.info(f"Metrics exporter listening on http://{host}:{port}/metrics")
+    return server
@@ -7,8 +7,8 @@ import os
 from datetime import datetime
 from typing import Dict, Optional
 
-import matplotlib.pyplot as plt
 from matplotlib.dates import DateFormatter
+from matplotlib.figure import Figure
 
 from config.settings import BASE_DIR, DATA_DIR, MONITOR_GRAPH_POINTS
 from infra.logging import log
@@ -51,33 +51,33 @@ def record_snapshot(symbol: str, stats: Dict, timestamp: Optional[str] = None) -
         log.error(f"Failed to record snapshot for {symbol}: {exc}", exc_info=True)
 
 
-def _prepare_dataframe(df):
-    if df is None or df.empty:
-        return None
-    df = df.copy()
-    if "typical_price" not in df.columns:
-        df["typical_price"] = (df["High"] + df["Low"] + df["Close"]) / 3
-    if "vwap" not in df.columns:
-        tpv = df["typical_price"] * df["Volume"]
-        df["cum_tpv"] = tpv.cumsum()
-        df["cum_vol"] = df["Volume"].cumsum()
-        df["vwap"] = df["cum_tpv"] / df["cum_vol"].replace(0, 1)
-    return df
+def _vwap(bars):
+    import numpy as np
+
+    typical_price = (bars.high.astype(np.float64) + bars.low + bars.close) / 3
+    cum_vol = np.cumsum(bars.volume)
+    return np.cumsum(typical_price * bars.volume) / np.where(cum_vol == 0, 1, cum_vol)
+
 
+def save_intraday_graph(symbol: str, bars, ts_label: Optional[str] = None) -> Optional[str]:
+    """Close/VWAP/range chart of `bars` (`core.bars.Bars`, or a DataFrame) as a PNG."""
+    from core.bars import as_bars
 
-def save_intraday_graph(symbol: str, df, ts_label: Optional[str] = None) -> Optional[str]:
-    df_plot = _prepare_dataframe(df)
-    if df_plot is None or df_plot.empty:
+    bars = as_bars(bars)
+    if bars is None or bars.empty:
         return None
     _ensure_dir(GRAPH_DIR)
     if ts_label is None:
         ts_label = datetime.utcnow().strftime("%Y%m%d%H%M%S")
     path = os.path.join(GRAPH_DIR, f"{symbol}_{ts_label}.png")
     try:
-        fig, ax = plt.subplots(figsize=(8, 3))
-        ax.plot(df_plot.index, df_plot["Close"], label="Close", color="tab:blue")
-        ax.plot(df_plot.index, df_plot["vwap"], label="VWAP", color="tab:orange", linestyle="--")
-        ax.fill_between(df_plot.index, df_plot["Low"], df_plot["High"], color="tab:gray", alpha=0.1)
+        # a bare Figure is not tracked by pyplot, so nothing outlives this call
+        fig = Figure(figsize=(8, 3))
+        ax = fig.subplots()
+        index = bars.index
+        ax.plot(index, bars.close, label="Close", color="tab:blue")
+        ax.plot(index, _vwap(bars), label="VWAP", color="tab:orange", linestyle="--")
+        ax.fill_between(index, bars.low, bars.high, color="tab:gray", alpha=0.1)
         ax.set_title(f"{symbol} intraday snapshot")
         ax.set_ylabel("Price")
         ax.grid(True, linestyle=":", linewidth=0.5)
@@ -85,7 +85,6 @@ def save_intraday_graph(symbol: str, df, ts_label: Optional[str] = None) -> Opti
         ax.legend(loc="upper left")
         fig.tight_layout()
         fig.savefig(path, dpi=100)
-        plt.close(fig)
         return path
     except Exception as exc:
         log.error(f"Failed to generate graph for {symbol}: {exc}", exc_info=True)
@@ -0,0 +1,272 @@
+"""
+On-demand profiling of scans and Telegram commands.
+
+Code paths worth profiling are wrapped in `profiled(target, label)`. While
+nothing is armed that is a flag check and a `stat()` of the arm file, so it
+costs nothing measurable. Profiling is armed either for the whole run
+(`--profile sample|cprofile` -> `enable`) or for the next run of a target
+(`/profile next` -> `arm`). `arm` drops a file in `PROFILE_DIR`, so the
+scheduler can be armed from the Telegram listener; the first process to
+claim the file profiles its next scan.
+
+Two profilers are available:
+
+- `sample` (default): a thread samples the stacks of the profiled thread
+  and the scan worker pools every `PROFILE_SAMPLE_INTERVAL` seconds. Output
+  is `<run>.folded` (collapsed stacks for flamegraph.pl or speedscope).
+- `cprofile`: deterministic, with higher overhead. Output is `<run>.prof`
+  (pstats, e.g. for snakeviz). It only sees the profiled thread: fetch and
+  news calls in the `scan-stage` and `prefetch` pools show up as time spent
+  waiting on futures. Use `sample` to see inside them.
+
+Both write `<run>-top.txt` listing the `PROFILE_TOP_N` hottest functions.
+Only the newest `PROFILE_KEEP` runs are kept.
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from config import settings as cfg
+from infra.logging import log
+
+MODES = ("sample", "cprofile")
+TARGETS = ("scan", "command")
+# stdlib modules a parked pool thread sits in; stacks made only of these are idle
+_IDLE_FILES = ("threading.py", "queue.py", os.path.join("concurrent", "futures", "thread.py"))
+
+_always: Dict[str, str] = {}
+_active = threading.Lock()
+
+
+def enable(mode: str = "sample", targets=TARGETS) -> None:
+    """Profile every run of `targets` in this process (the `--profile` flag)."""
+    for target in targets:
+        _always[target] = mode
+
+
+def _arm_path(target: str) -> str:
+    return os.path.join(cfg.PROFILE_DIR, f"armed-{target}.json")
+
+
+def arm(target: str = "scan", mode: str = "sample") -> str:
+    """Profile the next run of `target` in whichever process reaches it first."""
+    os.makedirs(cfg.PROFILE_DIR, exist_ok=True)
+    path = _arm_path(target)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"mode": mode, "armed_at": time.time()}, f)
+    os.replace(tmp, path)
+    return path
+
+
+def disarm() -> None:
+    _always.clear()
+    for target in TARGETS:
+        try:
+            os.remove(_arm_path(target))
+        except FileNotFoundError:
+            pass
+
+
+def armed() -> Dict[str, str]:
+    """Target -> mode for everything currently armed (file or process-wide)."""
+    out = dict(_always)
+    for target in TARGETS:
+        try:
+            with open(_arm_path(target)) as f:
+                out.setdefault(target, json.load(f).get("mode", "sample"))
+        except (OSError, ValueError):
+            pass
+    return out
+
+
+def _claim(target: str) -> Optional[str]:
+    mode = _always.get(target)
+    if mode:
+        return mode
+    path = _arm_path(target)
+    if not os.path.exists(path):
+        return None
+    # rename is atomic: of several processes polling the file, one wins
+    claimed = f"{path}.{os.getpid()}.claimed"
+    try:
+        os.replace(path, claimed)
+    except OSError:
+        return None
+    try:
+        with open(claimed) as f:
+            return json.load(f).get("mode", "sample")
+    except (OSError, ValueError):
+        return "sample"
+    finally:
+        try:
+            os.remove(claimed)
+        except OSError:
+            pass
+
+
+def _frame_label(code) -> str:
+    module = os.path.basename(code.co_filename)
+    if module.endswith(".py"):
+        module = module[:-3]
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class StackSampler:
+    """Samples the stacks of one thread plus named worker threads into collapsed form."""
+
+    def __init__(self, thread_id: int, interval: float, prefixes=("scan-stage", "prefetch")):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.prefixes = prefixes
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _watched(self) -> Dict[int, str]:
+        watched = {self.thread_id: "main"}
+        for thread in threading.enumerate():
+            if thread.ident and thread.name.startswith(self.prefixes):
+                watched[thread.ident] = thread.name.split("_")[0]
+        return watched
+
+    def _run(self) -> None:
+        watched, refreshed = self._watched(), time.monotonic()
+        while not self._stop.wait(self.interval):
+            if time.monotonic() - refreshed > 0.5:
+                watched, refreshed = self._watched(), time.monotonic()
+            frames = sys._current_frames()
+            self.samples += 1
+            for ident, root in watched.items():
+                frame = frames.get(ident)
+                stack = []
+                busy = ident == self.thread_id
+                while frame is not None:
+                    code = frame.f_code
+                    busy = busy or not code.co_filename.endswith(_IDLE_FILES)
+                    stack.append(_frame_label(code))
+                    frame = frame.f_back
+                if stack and busy:
+                    stack.append(root)
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def hotspots(self, top_n: int) -> List[str]:
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for frame in set(frames[1:]):
+                total[frame] += count
+        samples = sum(self.stacks.values()) or 1
+        lines = [f"{self.samples} sampling rounds every {self.interval * 1000:.1f}ms, "
+                 f"{samples} stack samples", "", "self %   total %  function"]
+        for frame, count in own.most_common(top_n):
+            lines.append(f"{count / samples:6.1%}  {total[frame] / samples:7.1%}  {frame}")
+        lines += ["", "total %  function (inclusive)"]
+        for frame, count in total.most_common(top_n):
+            lines.append(f"{count / samples:7.1%}  {frame}")
+        return lines
+
+
+def _prune() -> None:
+    runs: Dict[str, float] = {}
+    for name in os.listdir(cfg.PROFILE_DIR):
+        if name.endswith((".folded", ".prof", "-top.txt")):
+            run = name.rsplit("-top.txt", 1)[0].rsplit(".", 1)[0]
+            path = os.path.join(cfg.PROFILE_DIR, name)
+            runs[run] = max(runs.get(run, 0.0), os.path.getmtime(path))
+    for run in sorted(runs, key=runs.get, reverse=True)[cfg.PROFILE_KEEP:]:
+        for suffix in (".folded", ".prof", "-top.txt"):
+            try:
+                os.remove(os.path.join(cfg.PROFILE_DIR, run + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def recent_profiles(n: int = 5) -> List[str]:
+    if not os.path.isdir(cfg.PROFILE_DIR):
+        return []
+    tops = [name for name in os.listdir(cfg.PROFILE_DIR) if name.endswith("-top.txt")]
+    tops.sort(key=lambda name: os.path.getmtime(os.path.join(cfg.PROFILE_DIR, name)), reverse=True)
+    return [os.path.join(cfg.PROFILE_DIR, name) for name in tops[:n]]
+
+
+def _write(run: str, mode: str, profiler, seconds: float) -> str:
+    os.makedirs(cfg.PROFILE_DIR, exist_ok=True)
+    base = os.path.join(cfg.PROFILE_DIR, run)
+    header = [f"{run}: {mode} profile, {seconds:.2f}s wall", ""]
+    if mode == "cprofile":
+        header[1:1] = ["calling thread only; stage and prefetch pool threads are not profiled (use sample mode)"]
+        profiler.dump_stats(base + ".prof")
+        out = io.StringIO()
+        stats = pstats.Stats(profiler, stream=out).strip_dirs()
+        stats.sort_stats("cumulative").print_stats(cfg.PROFILE_TOP_N)
+        stats.sort_stats("tottime").print_stats(cfg.PROFILE_TOP_N)
+        body = out.getvalue().splitlines()
+    else:
+        with open(base + ".folded", "w") as f:
+            for stack, count in profiler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        body = profiler.hotspots(cfg.PROFILE_TOP_N)
+    with open(base + "-top.txt", "w") as f:
+        f.write("\n".join(header + body) + "\n")
+    _prune()
+    return base + "-top.txt"
+
+
+@contextmanager
+def profiled(target: str, label: str = ""):
+    """Profile the body if `target` is armed; otherwise just run it."""
+    if not _always and not os.path.exists(_arm_path(target)):
+        yield
+        return
+    # one profile at a time: a scan inside a profiled command is covered by it
+    if not _active.acquire(blocking=False):
+        yield
+        return
+    try:
+        mode = _claim(target)
+        if mode is None:
+            yield
+            return
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        run = "-".join(part for part in (stamp, target, label.strip("/").replace("/", "_"), mode) if part)
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = StackSampler(threading.get_ident(), cfg.PROFILE_SAMPLE_INTERVAL)
+            profiler.start()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if mode == "cprofile":
+                profiler.disable()
+            else:
+                profiler.stop()
+            try:
+                path = _write(run, mode, profiler, seconds)
+                log.info(f"Profile of {target} {label} written to {path}")
+            except OSError as exc:
+                log.error(f"Failed to write profile {run}: {exc}")
+    finally:
+        _active.release()
@@ -4,11 +4,15 @@ Telegram send and receive logic.
 
 import requests
 from infra.logging import log
-from config.settings import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TOP_N
-from infra.database import record_position, update_position, get_open_positions
+from config.settings import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID, TOP_N, DECISION_HISTORY_DAYS
 from datetime import datetime
-from core.data_fetch import fetch_data
-from service.research import perform_scan, persist_scan_results, format_summary_text
+from core.positions import book
+from core.quotes import get_quote, quotes
+from service.research import AlertStreamer, perform_scan, persist_scan_results, format_summary_text
+from infra import profiling
+from infra.memory import format_memory_text
+from infra.metrics import format_stats_text
+from service.decisions import format_decisions_text, format_history_text
 
 def notify(symbol, action, confidence, price, timestamp):
     # Moved from market_assistant.py
@@ -30,6 +34,64 @@ def send_message(text):
     except Exception as e:
         log.error(f"Failed to send Telegram message: {e}", exc_info=True)
 
+def _latest_price(symbol):
+    """Latest quote for `symbol`, or None if there is none."""
+    return get_quote(symbol)
+
+
+def format_pnl_text():
+    # last known quotes only (any age): no per-position network round trips
+    held = book.symbols()
+    if not held:
+        return "No open positions."
+    mtm = book.mark_to_market(quotes.get_many(held, max_age=float("inf")))
+    lines = ["Open P&L:"]
+    for row in mtm["positions"]:
+        if row["last"] is None:
+            lines.append(f"{row['symbol']}: qty={row['qty']:g} avg={row['avg_price']:.2f} last=n/a")
+            continue
+        pct = f" ({row['pnl_pct']:+.2f}%)" if row["pnl_pct"] is not None else ""
+        lines.append(
+            f"{row['symbol']}: qty={row['qty']:g} avg={row['avg_price']:.2f} "
+            f"last={row['last']:.2f} P&L={row['pnl']:+.2f}{pct}"
+        )
+    total_pct = f" ({mtm['pnl_pct']:+.2f}%)" if mtm["pnl_pct"] is not None else ""
+    lines.append(f"Total: value={mtm['value']:.2f} P&L={mtm['pnl']:+.2f}{total_pct}")
+    if mtm["unpriced"]:
+        lines.append(f"No quote yet for: {', '.join(mtm['unpriced'])}")
+    return "\n".join(lines)
+
+
+def format_profile_text(args):
+    # /profile [next [scan|command] [sample|cprofile] | off]
+    if args and args[0].lower() == "next":
+        opts = [a.lower() for a in args[1:]]
+        target = next((a for a in opts if a in profiling.TARGETS), "scan")
+        mode = next((a for a in opts if a in profiling.MODES), "sample")
+        profiling.arm(target, mode)
+        return f"Next {target} will be profiled ({mode})."
+    if args and args[0].lower() == "off":
+        profiling.disarm()
+        return "Profiling disarmed."
+    armed = profiling.armed()
+    lines = ["Armed: " + (", ".join(f"{t} ({m})" for t, m in armed.items()) if armed else "nothing")]
+    recent = profiling.recent_profiles()
+    if recent:
+        lines.append("Recent profiles:")
+        lines.extend(f"- {path}" for path in recent)
+    return "\n".join(lines)
+
+
+def _parse_days(arg):
+    if arg is None:
+        return DECISION_HISTORY_DAYS
+    try:
+        return max(1, int(arg))
+    except ValueError:
+        log.warning(f"Invalid day count {arg}, using {DECISION_HISTORY_DAYS}")
+        return DECISION_HISTORY_DAYS
+
+
 def parse_command(text):
     parts = text.strip().split()
     if not parts:
@@ -41,19 +103,12 @@ def parse_command(text):
         price = float(parts[3]) if len(parts) > 3 else 0.0
         # If price not provided or zero, attempt to fetch latest close price
         if price == 0.0:
-            try:
-                df = fetch_data(symbol)
-                if df is not None and not df.empty:
-                    # use last Close value
-                    price = float(df['Close'].iloc[-1])
-                    log.info(f"Fetched market price for {symbol}: {price}")
-                else:
-                    log.warning(f"No market data available to derive price for {symbol}")
-            except Exception as e:
-                log.error(f"Error fetching price for {symbol}: {e}", exc_info=True)
-                price = 0.0
+            price = _latest_price(symbol)
+        if price is None:
+            # a 0.0 price would be averaged into the cost basis
+            return f"No price available for {symbol}; use /bought {symbol} {parts[2]} PRICE"
         timestamp = datetime.utcnow().isoformat()
-        record_position(symbol, qty, price, timestamp)
+        book.apply(symbol, qty, price, timestamp)
         return f"Recorded BUY: {symbol} qty={qty} price={price}"
     elif cmd == '/sold' and len(parts) >= 3:
         symbol = parts[1].upper()
@@ -61,23 +116,23 @@ def parse_command(text):
         price = float(parts[3]) if len(parts) > 3 else 0.0
         # If price not provided or zero, attempt to fetch latest close price
         if price == 0.0:
-            try:
-                df = fetch_data(symbol)
-                if df is not None and not df.empty:
-                    price = float(df['Close'].iloc[-1])
-                    log.info(f"Fetched market price for {symbol}: {price}")
-                else:
-                    log.warning(f"No market data available to derive price for {symbol}")
-            except Exception as e:
-                log.error(f"Error fetching price for {symbol}: {e}", exc_info=True)
-                price = 0.0
+            price = _latest_price(symbol)
         timestamp = datetime.utcnow().isoformat()
-        update_position(symbol, -qty, price, timestamp)
-        return f"Recorded SELL: {symbol} qty={qty} price={price}"
+        # a sale keeps the entry price, so an unknown sale price changes nothing stored
+        book.apply(symbol, -qty, price or 0.0, timestamp)
+        return f"Recorded SELL: {symbol} qty={qty} price={price if price is not None else 'n/a'}"
+    elif cmd == '/quote' and len(parts) >= 2:
+        lines = []
+        for symbol in [p.upper() for p in parts[1:]]:
+            price = get_quote(symbol)
+            lines.append(f"{symbol}: {price}" if price is not None else f"{symbol}: no data")
+        return "\n".join(lines)
     elif cmd == '/positions':
-        positions = get_open_positions()
+        positions = book.positions()
         msg = "Open Positions:\n" + "\n".join([f"{p['symbol']}: qty={p['qty']} price={p['price']}" for p in positions])
         return msg
+    elif cmd == '/pnl':
+        return format_pnl_text()
     elif cmd == '/research':
         scope_arg = parts[1].lower() if len(parts) > 1 else "w"
         if scope_arg.startswith("p"):
@@ -91,7 +146,30 @@ def parse_command(text):
             except ValueError:
                 log.warning(f"Invalid /research limit {parts[2]}, falling back to TOP_N")
         top_n = limit if limit and limit > 0 else TOP_N
-        scan_result = perform_scan(scope=scope, top_n=top_n)
+        scan_result = perform_scan(scope=scope, top_n=top_n, on_result=AlertStreamer(send_message))
         persist_scan_results(scan_result)
         return format_summary_text(scan_result)
+    elif cmd == '/history' and len(parts) >= 2:
+        return format_history_text(parts[1], _parse_days(parts[2] if len(parts) > 2 else None))
+    elif cmd == '/decisions':
+        return format_decisions_text(_parse_days(parts[1] if len(parts) > 1 else None))
+    elif cmd == '/stats':
+        count = 5
+        if len(parts) > 1:
+            try:
+                count = max(1, int(parts[1]))
+            except ValueError:
+                log.warning(f"Invalid /stats count {parts[1]}, using {count}")
+        return format_stats_text(count)
+    elif cmd == '/profile':
+        return format_profile_text(parts[1:])
+    elif cmd == '/memory':
+        return format_memory_text()
     return "Unknown command."
+
+
+def handle_command(text):
+    """`parse_command`, profiled as the `command` target when armed; used by every listener loop."""
+    parts = text.split()
+    with profiling.profiled("command", parts[0].lower() if parts else ""):
+        return parse_command(text)
@@ -13,6 +13,9 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 from infra.logging import setup_logging
 from service.database import init_db
 from service.runner import run_once
+from infra.metrics import start_metrics_server
+from infra.api import start_api_server
+from infra.memory import start_memory_guard
 
 def _run_once():
     setup_logging()
@@ -23,6 +26,7 @@ def _run_once():
 def _run_daemon():
     setup_logging()
     init_db()
+    start_memory_guard()
     from service.daemon import run_forever
     run_forever()
 
@@ -30,6 +34,10 @@ def _run_daemon():
 def _run_scheduler():
     setup_logging()
     init_db()
+    # only the scanning process serves metrics and /scan, so the ports never clash
+    start_metrics_server()
+    start_api_server()
+    start_memory_guard()
     from service.scheduler import market_scheduler_loop
     market_scheduler_loop()
 
@@ -37,15 +45,88 @@ def _run_scheduler():
 def _run_telegram():
     setup_logging()
     init_db()
+    start_memory_guard()
     from service.telegram_bot import telegram_listener_loop
     telegram_listener_loop()
 
 
+def _run_bench(args):
+    setup_logging()
+    from bench.suite import main as bench_main
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()] if args.cases else None
+    sys.exit(bench_main(symbols=args.symbols, repeat=args.repeat, threshold=args.threshold,
+                        update_baseline=args.update_baseline, cases=cases))
+
+
+def _run_record():
+    setup_logging()
+    from core.data_fetch import record_session
+    from service.research import _load_symbol_universe
+    record_session(_load_symbol_universe())
+
+
+def _run_universe():
+    setup_logging()
+    from service.universe import build_universe_index
+    build_universe_index()
+
+
+def _run_reference():
+    setup_logging()
+    from service.reference import build_reference_data
+    build_reference_data()
+
+
+def _run_worker(args):
+    setup_logging()
+    init_db()
+    from config.settings import SCAN_QUEUE_DB
+    from service.distributed import run_worker
+    run_worker(queue_path=args.queue or SCAN_QUEUE_DB)
+
+
+def _configure_provider(args):
+    if args.provider is None:
+        return
+    from core.data_fetch import ReplayProvider, set_provider
+    if args.provider == "replay":
+        set_provider(ReplayProvider(directory=args.replay_dir, speed=args.replay_speed))
+    else:
+        set_provider(args.provider)
+
+
+def _configure_workers(args):
+    if args.workers is None:
+        return
+    from config import settings
+    settings.SCAN_WORKERS = args.workers
+
+
 def main():
     p = argparse.ArgumentParser(prog="market_assistant")
-    p.add_argument("mode", nargs="?", choices=["once", "daemon", "scheduler", "telegram"], default="once",
-                   help="Mode to run: 'once' runs analysis once; 'daemon' runs full daemon; 'scheduler' runs scheduler; 'telegram' runs telegram listener")
+    p.add_argument("mode", nargs="?", choices=["once", "daemon", "scheduler", "telegram", "bench", "record", "universe", "reference", "worker"], default="once",
+                   help="Mode to run: 'once' runs analysis once; 'daemon' runs full daemon; 'scheduler' runs scheduler; 'telegram' runs telegram listener; 'bench' runs the offline benchmark suite; 'record' saves the current sessions for replay; 'universe' rebuilds the liquidity-ranked universe index; 'reference' rebuilds the daily reference data; 'worker' serves scan shards from the queue")
+    p.add_argument("--provider", choices=["yfinance", "replay"], default=None,
+                   help="Market data provider (defaults to DATA_PROVIDER in config/settings.py)")
+    p.add_argument("--replay-dir", default=None, help="replay: directory of recorded {SYMBOL}.csv sessions")
+    p.add_argument("--replay-speed", type=float, default=None,
+                   help="replay: bar clock speed as a multiple of real time (<= 0 freezes the clock)")
+    p.add_argument("--workers", type=int, default=None,
+                   help="once/scheduler: shard each scan across N worker processes (defaults to SCAN_WORKERS)")
+    p.add_argument("--queue", default=None, help="worker: shard queue database (defaults to SCAN_QUEUE_DB)")
+    p.add_argument("--symbols", type=int, default=200, help="bench: synthetic universe size for the perform_scan case")
+    p.add_argument("--repeat", type=int, default=3, help="bench: timing rounds per case (median is reported)")
+    p.add_argument("--threshold", type=float, default=0.25, help="bench: allowed slowdown vs baseline before flagging")
+    p.add_argument("--update-baseline", action="store_true", help="bench: store this run as the new baseline")
+    p.add_argument("--cases", default=None, help="bench: comma-separated subset of cases to run")
+    p.add_argument("--profile", choices=["sample", "cprofile"], default=None,
+                   help="Profile every scan and Telegram command of this run into logs/profiles/")
     args = p.parse_args()
+    _configure_provider(args)
+    _configure_workers(args)
+    if args.profile:
+        from infra import profiling
+        profiling.enable(args.profile)
 
     if args.mode == "once":
         _run_once()
@@ -55,6 +136,16 @@ def main():
         _run_scheduler()
     elif args.mode == "telegram":
         _run_telegram()
+    elif args.mode == "bench":
+        _run_bench(args)
+    elif args.mode == "record":
+        _run_record()
+    elif args.mode == "universe":
+        _run_universe()
+    elif args.mode == "reference":
+        _run_reference()
+    elif args.mode == "worker":
+        _run_worker(args)
 
 
 if __name__ == "__main__":
@@ -4,7 +4,7 @@ Long running loop placeholder for service.
 
 import time
 from infra.logging import log
-from infra.telegram import send_message, parse_command
+from infra.telegram import send_message, handle_command
 import requests
 from config.settings import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 
@@ -30,7 +30,7 @@ def run_forever():
                     last_update_id = update["update_id"]
                     msg = update.get("message", {}).get("text", "")
                     if msg:
-                        reply = parse_command(msg)
+                        reply = handle_command(msg)
                         if reply:
                             send_message(reply)
             else:
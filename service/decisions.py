@@ -0,0 +1,153 @@
+"""
+Decision history: outcome tracking and rollup queries.
+
+Every BUY/SELL a scan emits is stored in `decisions` with its numeric
+features and the bar it was made on. Once `DECISION_OUTCOME_BARS` more bars
+exist for that symbol, a later scan fills in the outcome (the return after N
+bars, sign-adjusted so a SELL followed by a drop counts as a win) and bumps
+the `decision_daily` rollup. Summaries read only the rollup rows for the
+requested window, so their cost does not grow with the history.
+"""
+
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from config.settings import DECISION_HISTORY_DAYS, DECISION_OUTCOME_BARS
+from infra import database, metrics
+from infra.logging import log
+
+
+def decision_rows(scan_result: Dict) -> List[Dict]:
+    """`decisions` rows for the BUY/SELL candidates of a scan result."""
+    ts = scan_result.get("timestamp_iso") or datetime.utcnow().isoformat()
+    rows = []
+    for action, key in (("SELL", "sell_candidates"), ("BUY", "buy_candidates")):
+        for entry in scan_result.get(key, []):
+            rows.append(
+                {
+                    "symbol": entry["symbol"],
+                    "action": action,
+                    "scope": scan_result.get("scope"),
+                    "ts": ts,
+                    "bar_ts": entry.get("bar_ts"),
+                    "price": entry["price"],
+                    "rsi": entry.get("rsi"),
+                    "atr_pct": entry.get("atr_pct"),
+                    "vol_spike": entry.get("vol_spike"),
+                    "score": entry.get("score"),
+                    "sentiment": entry.get("sentiment"),
+                }
+            )
+    return rows
+
+
+class OutcomeTracker:
+    """
+    Resolves pending decisions from the bars a scan has already fetched.
+
+    `load()` reads the pending set once per scan, `observe()` is called with
+    each symbol's frame, and `flush()` writes the outcomes in one transaction.
+    """
+
+    def __init__(self, bars: int = DECISION_OUTCOME_BARS):
+        self.bars = bars
+        self.pending: Dict[str, List[Dict]] = {}
+        self.resolved: List = []
+
+    def load(self, symbols: Optional[List[str]] = None) -> None:
+        try:
+            self.pending = database.pending_decisions(symbols)
+        except Exception as exc:
+            log.error(f"Failed to load pending decisions: {exc}")
+            self.pending = {}
+
+    def observe(self, symbol: str, bars) -> None:
+        rows = self.pending.get(symbol)
+        if not rows or bars is None or bars.empty:
+            return
+        close = bars.close
+        still_pending = []
+        for row in rows:
+            try:
+                pos = bars.search(row["bar_ts"])
+            except (TypeError, ValueError) as exc:
+                log.warning(f"{symbol}: unusable decision bar {row['bar_ts']}: {exc}")
+                self.resolved.append((row, None, None))
+                continue
+            if pos < len(bars) and str(bars.timestamp(pos)) != row["bar_ts"]:
+                # the decision bar has left the lookback window (or never was in it)
+                self.resolved.append((row, None, None))
+                continue
+            if pos + self.bars >= len(bars):
+                still_pending.append(row)
+                continue
+            entry, outcome = float(close[pos]), float(close[pos + self.bars])
+            change = (outcome / entry - 1) * 100 if entry else 0.0
+            self.resolved.append((row, outcome, change if row["action"] == "BUY" else -change))
+        self.pending[symbol] = still_pending
+
+    def flush(self) -> int:
+        resolved, self.resolved = self.resolved, []
+        try:
+            database.resolve_decisions(resolved)
+        except Exception as exc:
+            log.error(f"Failed to store {len(resolved)} decision outcomes: {exc}", exc_info=True)
+            return 0
+        metrics.incr("decisions_resolved", len(resolved))
+        return len(resolved)
+
+
+def summary(symbol: str = "*", days: int = DECISION_HISTORY_DAYS) -> Dict[str, Dict]:
+    """Per-action count, average entry, outcome count, average outcome % and win rate."""
+    since = (datetime.utcnow() - timedelta(days=days)).strftime("%Y-%m-%d")
+    out = {}
+    for action, row in database.decision_rollup(symbol, since).items():
+        outcomes = row["outcomes"] or 0
+        out[action] = {
+            "count": row["count"],
+            "avg_entry": row["price_sum"] / row["count"] if row["count"] else None,
+            "outcomes": outcomes,
+            "avg_outcome_pct": row["outcome_pct_sum"] / outcomes if outcomes else None,
+            "win_rate": row["wins"] / outcomes if outcomes else None,
+        }
+    return out
+
+
+def _format_summary_lines(stats: Dict[str, Dict], with_entry: bool) -> List[str]:
+    lines = []
+    for action in ("BUY", "SELL"):
+        s = stats.get(action)
+        if not s or not s["count"]:
+            lines.append(f"{action}: none")
+            continue
+        line = f"{action}: {s['count']} signal(s)"
+        if with_entry and s["avg_entry"] is not None:
+            line += f", avg entry {s['avg_entry']:.2f}"
+        if s["outcomes"]:
+            line += (
+                f"; after {DECISION_OUTCOME_BARS} bars: {s['avg_outcome_pct']:+.2f}% avg, "
+                f"{s['win_rate']:.0%} wins ({s['outcomes']} resolved)"
+            )
+        else:
+            line += "; no outcomes yet"
+        lines.append(line)
+    return lines
+
+
+def format_history_text(symbol: str, days: int = DECISION_HISTORY_DAYS) -> str:
+    symbol = symbol.upper()
+    lines = [f"{symbol} decisions, last {days} days:"]
+    lines.extend(_format_summary_lines(summary(symbol, days), with_entry=True))
+    recent = database.recent_decisions(symbol)
+    if recent:
+        lines.append("Recent:")
+        for row in recent:
+            outcome = f" -> {row['outcome_pct']:+.2f}%" if row["outcome_pct"] is not None else ""
+            lines.append(f"- {row['ts'][:16]} {row['action']} @ {row['price']}{outcome}")
+    return "\n".join(lines)
+
+
+def format_decisions_text(days: int = DECISION_HISTORY_DAYS) -> str:
+    lines = [f"All decisions, last {days} days:"]
+    lines.extend(_format_summary_lines(summary("*", days), with_entry=False))
+    return "\n".join(lines)
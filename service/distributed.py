@@ -0,0 +1,464 @@
+"""
+Sharded multi-process universe scanning with a local SQLite broker.
+
+The coordinator (`run_distributed_scan`) splits the symbol list into shards
+and queues them in `SCAN_QUEUE_DB`. Workers (`run_worker`) lease one shard at
+a time, run the fetch/feature/decision stage for its symbols and write back a
+partial result: the shard's own top-N BUY candidates plus its SELL/HOLD
+lists, with the chart bars of the candidates so the coordinator can draw
+their graphs without fetching again. The coordinator merges partials into the
+global top-N as shards finish, replays their per-symbol events to `on_result`
+(e.g. to alert held-position SELLs early), and returns a result shaped like
+`perform_scan`.
+
+A scan deadline is stored with the job: workers stop at it and report the
+symbols they did not reach, and the coordinator expires shards still queued.
+Those symbols, and symbols whose fetch timed out, go into the same carry-over
+as an in-process scan.
+
+Leases are renewed after every symbol; a shard whose lease expires (worker
+killed or host gone) is handed to the next worker that asks, and the
+coordinator immediately re-queues shards held by local workers that died.
+Workers on other hosts can join with `market_assistant.py worker --queue PATH`
+as long as they can open the same queue file.
+"""
+
+import json
+import multiprocessing
+import os
+import socket
+import sqlite3
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+from config.settings import (
+    MONITOR_GRAPH_POINTS,
+    MONITOR_MAX_SELL_GRAPHS,
+    SCAN_LEASE_SECONDS,
+    SCAN_QUEUE_DB,
+    SCAN_SHARD_MAX_ATTEMPTS,
+    SCAN_SHARD_SIZE,
+    TOP_N,
+)
+from core.bars import Bars
+from core.quotes import quotes
+from infra import api, metrics
+from infra.logging import log, set_log_context, setup_logging
+from infra.monitor import save_intraday_graph
+from service import universe
+from service import research
+from service.decisions import OutcomeTracker
+from service.research import (
+    StageTimeout,
+    TopCandidates,
+    _carried,
+    _decision_features,
+    _format_confidence,
+    _load_symbol_universe,
+    _prioritise,
+    _update_carryover,
+)
+
+_POLL_SECONDS = 0.5
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+
+def init_queue(path: str = SCAN_QUEUE_DB) -> None:
+    conn = _connect(path)
+    conn.execute('''CREATE TABLE IF NOT EXISTS scan_jobs (
+        id TEXT PRIMARY KEY,
+        scope TEXT,
+        top_n INTEGER,
+        positions TEXT,
+        created_at REAL,
+        status TEXT,
+        deadline REAL
+    )''')
+    # queue files created before jobs had deadlines
+    if "deadline" not in {row["name"] for row in conn.execute("PRAGMA table_info(scan_jobs)")}:
+        conn.execute("ALTER TABLE scan_jobs ADD COLUMN deadline REAL")
+    conn.execute('''CREATE TABLE IF NOT EXISTS scan_shards (
+        job_id TEXT,
+        shard_id INTEGER,
+        symbols TEXT,
+        status TEXT,
+        worker TEXT,
+        lease_until REAL,
+        attempts INTEGER DEFAULT 0,
+        result TEXT,
+        PRIMARY KEY (job_id, shard_id)
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_scan_shards_status ON scan_shards (status, job_id)')
+    conn.close()
+
+
+def _claim(conn: sqlite3.Connection, worker: str, job_id: Optional[str]) -> Optional[sqlite3.Row]:
+    """Lease the next pending (or lease-expired) shard, atomically."""
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        query = (
+            "SELECT s.job_id, s.shard_id, s.symbols, s.attempts, j.scope, j.top_n, j.positions, j.deadline "
+            "FROM scan_shards s JOIN scan_jobs j ON j.id = s.job_id "
+            "WHERE j.status = 'running' AND s.attempts < ? "
+            "AND (s.status = 'pending' OR (s.status = 'leased' AND s.lease_until < ?))"
+        )
+        params: List = [SCAN_SHARD_MAX_ATTEMPTS, now]
+        if job_id:
+            query += " AND s.job_id = ?"
+            params.append(job_id)
+        row = conn.execute(query + " ORDER BY j.created_at, s.shard_id LIMIT 1", params).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        conn.execute(
+            "UPDATE scan_shards SET status='leased', worker=?, lease_until=?, attempts=attempts+1 "
+            "WHERE job_id=? AND shard_id=?",
+            (worker, now + SCAN_LEASE_SECONDS, row["job_id"], row["shard_id"]),
+        )
+        conn.execute("COMMIT")
+        return row
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _scan_shard(conn: sqlite3.Connection, shard: sqlite3.Row, worker: str, scan_metrics) -> Dict:
+    entries = json.loads(shard["symbols"])
+    active_positions = set(json.loads(shard["positions"]))
+    allow_buy = shard["scope"] != "portfolio"
+    now_iso = datetime.utcnow().isoformat()
+    # the job's deadline is wall-clock time; stages measure against perf_counter
+    deadline_at = None
+    if shard["deadline"] is not None:
+        deadline_at = time.perf_counter() + shard["deadline"] - time.time()
+    top = TopCandidates(shard["top_n"] if allow_buy else 0)
+    partial = {"processed": 0, "sells": [], "holds": [], "failed": [], "ok": [], "quotes": [],
+               "events": [], "analysed": [], "deferred": [], "unreached": [], "features": {}}
+    outcomes = OutcomeTracker()
+    outcomes.load([symbol for _, symbol in entries])
+    research.reference.refresh()
+    set_log_context(scan_id=f"{shard['job_id'][:12]}/{shard['shard_id']}")
+    for i, (seq, symbol) in enumerate(entries):
+        if deadline_at is not None and time.perf_counter() >= deadline_at:
+            partial["unreached"] = [s for _, s in entries[i:]]
+            break
+        partial["processed"] += 1
+        partial["analysed"].append(symbol)
+        symbol_start = time.perf_counter()
+        set_log_context(symbol=symbol)
+        event = [seq, symbol, "ERROR", None, None]
+        try:
+            action, f, sentiment, bars = research._analyse_symbol(symbol, active_positions, now_iso, deadline_at)
+            (partial["failed"] if bars is None or bars.empty else partial["ok"]).append(symbol)
+            outcomes.observe(symbol, bars)
+            event[2] = action
+            if f:
+                bar_ts = str(bars.timestamp(-1))
+                partial["quotes"].append([symbol, f["price"], bar_ts])
+                partial["features"][symbol] = {"action": action, "bar_ts": bar_ts,
+                                               "sentiment": sentiment, "features": f}
+            if action != "SKIP":
+                event[3:] = [round(f["price"], 2), _format_confidence(f["rsi"], f["atr_pct"], sentiment)]
+            if action == "BUY" and allow_buy:
+                score = f.get("vol_spike", 0.0) + (f.get("rsi", 0.0) / 100)
+                record = (symbol, round(f["price"], 2), f["rsi"], f["atr_pct"], sentiment,
+                          f.get("vol_spike"), str(bars.timestamp(-1)))
+                top.offer(score, seq, record, lambda: bars.tail(MONITOR_GRAPH_POINTS).to_payload())
+            elif action == "SELL":
+                # only a shard's first SELLs can be among the scan's first
+                trace = None
+                if len(partial["sells"]) < MONITOR_MAX_SELL_GRAPHS:
+                    trace = bars.tail(MONITOR_GRAPH_POINTS).to_payload()
+                partial["sells"].append([seq, symbol, event[3], event[4], _decision_features(f, sentiment, bars), trace])
+            elif action == "HOLD":
+                partial["holds"].append([seq, symbol])
+        except (StageTimeout, research.FetchUnavailable) as exc:
+            event[2] = "TIMEOUT" if isinstance(exc, StageTimeout) else "UNAVAILABLE"
+            partial["analysed"].pop()
+            partial["deferred"].append(symbol)
+            log.warning(f"{symbol}: {exc}; deferred to the next scan")
+        except Exception as exc:
+            metrics.incr("scan_error")
+            log.error(f"{symbol}: scan error {exc}", exc_info=True)
+        scan_metrics.observe_symbol(symbol, time.perf_counter() - symbol_start)
+        partial["events"].append(event)
+        conn.execute(
+            "UPDATE scan_shards SET lease_until=? WHERE job_id=? AND shard_id=? AND worker=?",
+            (time.time() + SCAN_LEASE_SECONDS, shard["job_id"], shard["shard_id"], worker),
+        )
+    set_log_context(scan_id=None, symbol=None)
+    outcomes.flush()
+    partial["buys"] = [[score, -neg_seq, trace] + list(record) for score, neg_seq, record, trace in top.heap]
+    partial["buy_signals"] = top.seen
+    return partial
+
+
+def run_worker(queue_path: str = SCAN_QUEUE_DB, job_id: Optional[str] = None, worker: Optional[str] = None,
+               exit_when_idle: bool = False) -> None:
+    """Lease and scan shards until stopped (or until `job_id` is drained)."""
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    if multiprocessing.parent_process() is not None:
+        # child processes exit via os._exit, which would drop queued log records
+        setup_logging(async_mode=False)
+    init_queue(queue_path)
+    conn = _connect(queue_path)
+    log.info(f"Scan worker {worker} polling {queue_path}")
+    while True:
+        shard = _claim(conn, worker, job_id)
+        if shard is None:
+            if exit_when_idle:
+                break
+            time.sleep(_POLL_SECONDS)
+            continue
+        scan_metrics = metrics.begin_scan(f"shard {shard['shard_id']}")
+        partial = _scan_shard(conn, shard, worker, scan_metrics)
+        # the coordinator records the scan; this is only its share
+        partial["metrics"] = metrics.end_scan(scan_metrics, persist=False)
+        updated = conn.execute(
+            "UPDATE scan_shards SET status='done', result=? WHERE job_id=? AND shard_id=? AND worker=?",
+            (json.dumps(partial), shard["job_id"], shard["shard_id"], worker),
+        ).rowcount
+        if not updated:
+            log.warning(f"{worker}: shard {shard['shard_id']} was re-leased elsewhere; result dropped")
+    conn.close()
+
+
+def _requeue(conn: sqlite3.Connection, job_id: str, worker: Optional[str] = None) -> int:
+    """Return expired (or a dead worker's) leases to the queue; fail exhausted shards."""
+    conn.execute(
+        "UPDATE scan_shards SET status='failed' WHERE job_id=? AND status='leased' AND attempts>=? "
+        "AND (lease_until<? OR worker=?)",
+        (job_id, SCAN_SHARD_MAX_ATTEMPTS, time.time(), worker),
+    )
+    return conn.execute(
+        "UPDATE scan_shards SET status='pending', worker=NULL WHERE job_id=? AND status='leased' "
+        "AND (lease_until<? OR worker=?)",
+        (job_id, time.time(), worker),
+    ).rowcount
+
+
+def _spawn(queue_path: str, job_id: str, index: int):
+    name = f"{socket.gethostname()}:{job_id[:8]}:w{index}"
+    proc = multiprocessing.Process(
+        target=run_worker, args=(queue_path, job_id, name, True), name=name, daemon=True
+    )
+    proc.start()
+    return proc
+
+
+def run_distributed_scan(
+    scope: str = "whole",
+    symbols: Optional[List[str]] = None,
+    top_n: int = TOP_N,
+    workers: int = 2,
+    shard_size: int = SCAN_SHARD_SIZE,
+    queue_path: str = SCAN_QUEUE_DB,
+    on_result: Optional[Callable[[Dict], None]] = None,
+    deadline: Optional[float] = None,
+    carryover: Optional[bool] = None,
+) -> Dict:
+    """
+    Shard the scan across `workers` local processes and merge the partials.
+
+    `on_result`, `deadline` and `carryover` work as in `perform_scan`, except
+    that events arrive a shard at a time.
+    """
+    timestamp = datetime.utcnow()
+    active_positions = {p["symbol"] for p in research.get_open_positions()}
+    allow_buy = scope != "portfolio"
+    if symbols is not None:
+        target_symbols = [s.upper().strip() for s in symbols if s]
+    elif scope == "portfolio":
+        target_symbols = sorted(active_positions)
+    else:
+        target_symbols = _load_symbol_universe()
+    if carryover is None:
+        carryover = symbols is None
+    carry, retry = _carried(scope, active_positions) if carryover else ([], [])
+    target_symbols = _prioritise(target_symbols, active_positions, carry, retry)
+    indexed = list(enumerate(target_symbols))
+    shards = [indexed[i:i + shard_size] for i in range(0, len(indexed), max(1, shard_size))]
+    scan_start = time.perf_counter()
+    deadline_at = time.time() + deadline if deadline else None
+
+    init_queue(queue_path)
+    conn = _connect(queue_path)
+    job_id = uuid.uuid4().hex
+    conn.execute("BEGIN IMMEDIATE")
+    conn.execute(
+        "INSERT INTO scan_jobs (id, scope, top_n, positions, created_at, status, deadline) "
+        "VALUES (?, ?, ?, ?, ?, 'running', ?)",
+        (job_id, scope, top_n, json.dumps(sorted(active_positions)), time.time(), deadline_at),
+    )
+    conn.executemany(
+        "INSERT INTO scan_shards (job_id, shard_id, symbols, status) VALUES (?, ?, ?, 'pending')",
+        [(job_id, i, json.dumps(shard)) for i, shard in enumerate(shards)],
+    )
+    conn.execute("COMMIT")
+    log.info(f"Distributed scan {job_id[:8]}: {len(target_symbols)} symbols in {len(shards)} shards, {workers} workers")
+
+    scan_metrics = metrics.begin_scan(scope)
+    now_iso = timestamp.isoformat()
+    top = TopCandidates(top_n if allow_buy else 0)
+    sells, holds, failed, ok, quote_rows = [], [], [], [], []
+    analysed, deferred, unreached = [], [], []
+    symbol_features: Dict[str, Dict] = {}
+    merged: Set[int] = set()
+    processed = sell_graphs = 0
+    first_alert: Optional[float] = None
+
+    def _merge(shard_id: int, partial: Dict) -> None:
+        nonlocal processed, sell_graphs, first_alert
+        merged.add(shard_id)
+        processed += partial["processed"]
+        for score, seq, trace, *record in partial["buys"]:
+            top.offer(score, seq, tuple(record), lambda: trace)
+        top.seen += partial["buy_signals"] - len(partial["buys"])
+        holds.extend(partial["holds"])
+        failed.extend(partial["failed"])
+        ok.extend(partial["ok"])
+        quote_rows.extend(tuple(q) for q in partial["quotes"])
+        analysed.extend(partial["analysed"])
+        deferred.extend(partial["deferred"])
+        unreached.extend(partial["unreached"])
+        symbol_features.update(partial["features"])
+        scan_metrics.merge(partial["metrics"])
+        graphs = {}
+        for seq, symbol, price, confidence, features, trace in partial["sells"]:
+            graph = None
+            if trace is not None and sell_graphs < MONITOR_MAX_SELL_GRAPHS:
+                # graphs go to the first SELLs to come in, so streamed alerts carry them
+                with metrics.stage("graph"):
+                    graph = save_intraday_graph(symbol, Bars.from_payload(trace), now_iso)
+                sell_graphs += 1
+            graphs[symbol] = graph
+            sells.append((seq, {"symbol": symbol, "price": price, "confidence": confidence, "graph": graph,
+                                **features}))
+        if on_result is None:
+            return
+        for seq, symbol, action, price, confidence in partial["events"]:
+            event = {"symbol": symbol, "action": action, "held": symbol in active_positions, "price": price,
+                     "confidence": confidence, "graph": graphs.get(symbol), "index": seq + 1,
+                     "total": len(target_symbols), "elapsed": time.perf_counter() - scan_start}
+            try:
+                on_result(event)
+            except Exception as exc:
+                log.error(f"{symbol}: scan callback error {exc}", exc_info=True)
+            if first_alert is None and action == "SELL" and event["held"]:
+                first_alert = time.perf_counter() - scan_start
+                scan_metrics.observe_latency("first_alert", first_alert)
+
+    def _collect() -> None:
+        done = conn.execute(
+            "SELECT shard_id FROM scan_shards WHERE job_id=? AND status='done'", (job_id,)
+        ).fetchall()
+        for (shard_id,) in done:
+            if shard_id not in merged:
+                row = conn.execute(
+                    "SELECT result FROM scan_shards WHERE job_id=? AND shard_id=?", (job_id, shard_id)
+                ).fetchone()
+                _merge(shard_id, json.loads(row["result"]))
+
+    procs = {i: _spawn(queue_path, job_id, i) for i in range(max(1, workers))}
+    requeued = 0
+    while True:
+        _collect()
+        if deadline_at is not None and time.time() >= deadline_at:
+            # nobody has started these; leased shards stop at the deadline themselves
+            conn.execute("UPDATE scan_shards SET status='expired' WHERE job_id=? AND status='pending'", (job_id,))
+        counts = dict(conn.execute(
+            "SELECT status, COUNT(*) FROM scan_shards WHERE job_id=? GROUP BY status", (job_id,)
+        ).fetchall())
+        if not counts.get("pending") and not counts.get("leased"):
+            break
+        for i, proc in list(procs.items()):
+            if proc.is_alive():
+                continue
+            if proc.exitcode not in (0, None):
+                lost = _requeue(conn, job_id, proc.name)
+                requeued += lost
+                log.warning(f"Worker {proc.name} exited with {proc.exitcode}; re-queued {lost} shard(s)")
+            if counts.get("pending") or proc.exitcode:
+                procs[i] = _spawn(queue_path, job_id, i)
+        requeued += _requeue(conn, job_id)
+        time.sleep(_POLL_SECONDS)
+    _collect()
+    conn.execute("UPDATE scan_jobs SET status='done' WHERE id=?", (job_id,))
+    for proc in procs.values():
+        proc.join(timeout=5)
+
+    failed_shards = 0
+    for row in conn.execute("SELECT status, symbols FROM scan_shards WHERE job_id=? AND status != 'done'",
+                            (job_id,)).fetchall():
+        symbols_left = [symbol for _, symbol in json.loads(row["symbols"])]
+        if row["status"] == "expired":
+            unreached.extend(symbols_left)
+        else:
+            # given up after its retries: its symbols count as timed out, like a failed fetch
+            failed_shards += 1
+            deferred.extend(symbols_left)
+    conn.close()
+    universe.note_fetch_results(failed, ok)
+    quotes.publish(quote_rows)
+
+    selected_buys = []
+    for score, _, (symbol, price, rsi, atr_pct, sentiment, vol_spike, bar_ts), trace in top.ranked():
+        with metrics.stage("graph"):
+            graph_path = save_intraday_graph(symbol, Bars.from_payload(trace), now_iso)
+        selected_buys.append(
+            {
+                "symbol": symbol,
+                "price": price,
+                "confidence": _format_confidence(rsi, atr_pct, sentiment),
+                "score": score,
+                "graph": graph_path,
+                "rsi": rsi,
+                "atr_pct": atr_pct,
+                "vol_spike": vol_spike,
+                "sentiment": sentiment,
+                "bar_ts": bar_ts,
+            }
+        )
+    if failed_shards:
+        log.error(f"Distributed scan {job_id[:8]}: {failed_shards} shard(s) failed after retries")
+    metrics.incr("shards_requeued", requeued)
+    metrics.incr("shards_failed", failed_shards)
+    skipped = deferred + unreached
+    if carryover:
+        _update_carryover(unreached, deferred, analysed)
+    if skipped:
+        metrics.incr("symbols_deferred", len(skipped))
+    if unreached:
+        metrics.incr("deadline_miss")
+        log.warning(f"Scan deadline of {deadline:.0f}s hit after {processed}/{len(target_symbols)} "
+                    f"symbols; {len(skipped)} deferred to the next scan")
+
+    result = {
+        "scope": scope,
+        "symbols_scanned": processed,
+        "buy_candidates": selected_buys,
+        "sell_candidates": [sell for _, sell in sorted(sells, key=lambda sell: sell[0])],
+        "hold_candidates": [symbol for _, symbol in sorted(holds)],
+        "filtered_buy_count": max(0, top.seen - len(selected_buys)),
+        "active_positions": sorted(active_positions),
+        "time_to_first_alert": first_alert,
+        "skipped_symbols": skipped,
+        "analysed_symbols": analysed,
+        "deadline_missed": bool(unreached),
+        "shards": {"total": len(shards), "requeued": requeued, "failed": failed_shards, "workers": workers},
+        "timestamp": timestamp.strftime("%Y-%m-%d %H:%M"),
+        "timestamp_iso": timestamp.isoformat(),
+        "metrics": metrics.end_scan(scan_metrics),
+    }
+    # local HTTP API clients read this instead of triggering scans
+    api.publish_scan(result, symbol_features)
+    return result
@@ -0,0 +1,96 @@
+"""
+Tier-aware scan planner for the scheduler.
+
+Symbols are grouped into tiers with their own scan interval:
+
+- `portfolio`: open positions, scanned every tick (one 5m bar).
+- `watchlist`: `WATCHLIST` plus the `core` tier of the universe index.
+- `long_tail`: the rest of the universe index.
+
+Each tier's symbols are spread round-robin over the ticks of its interval so
+every tick fetches a similar number of symbols. A symbol that missed its slot
+(a slow scan skipped ticks, or tier membership shifted) is pulled into the
+current tick, so while ticks keep running a tier's staleness stays within its
+interval.
+
+Until the universe index exists (the scheduler builds it after the first
+close), the symbols file has no tiers, so all of it is planned with the
+portfolio every tick, like the scheduler did before tiers.
+"""
+
+import time
+from typing import Dict, List, Optional
+
+from config.settings import SCAN_TIER_INTERVALS, WATCHLIST
+from infra.logging import log
+from service import universe
+from service.database import get_open_positions
+
+TIERS = ("portfolio", "watchlist", "long_tail")
+
+
+class ScanPlanner:
+    def __init__(self, tick_seconds: float = 300, speed: float = 1.0, intervals: Optional[Dict[str, float]] = None):
+        self.tick_seconds = tick_seconds
+        intervals = intervals or SCAN_TIER_INTERVALS
+        # intervals are in market time; a replay clock compresses them too
+        self.intervals = {tier: intervals[tier] / speed for tier in TIERS}
+        self.last_scanned: Dict[str, float] = {}
+        # when a never-scanned symbol was first planned; its staleness counts from here
+        self._first_seen: Dict[str, float] = {}
+
+    def tiers(self) -> Dict[str, List[str]]:
+        """Current tier membership; each symbol lands in its highest-priority tier."""
+        portfolio = sorted(p["symbol"] for p in get_open_positions())
+        watch = [s.upper() for s in WATCHLIST]
+        if universe.read_index():
+            watch += universe.load_universe(tiers=("core",))
+            long_tail = universe.load_universe(tiers=("long_tail",))
+        else:
+            # load_universe falls back to the untiered symbols file
+            portfolio += universe.load_universe()
+            long_tail = []
+        seen = set()
+        out = {}
+        for tier, members in (("portfolio", portfolio), ("watchlist", watch), ("long_tail", long_tail)):
+            out[tier] = [s for s in members if not (s in seen or seen.add(s))]
+        return out
+
+    def _ticks(self, tier: str) -> int:
+        return max(1, int(round(self.intervals[tier] / self.tick_seconds)))
+
+    def plan(self, now: Optional[float] = None) -> List[str]:
+        """Symbols to scan this tick, highest-priority tier first."""
+        now = time.time() if now is None else now
+        tick = int(now // self.tick_seconds)
+        selected: List[str] = []
+        summary = []
+        for tier, members in self.tiers().items():
+            ticks = self._ticks(tier)
+            slot = tick % ticks
+            # past its slot (missed tick, reshuffled membership): leaving it for
+            # the next tick would breach the interval. Half a tick absorbs drift.
+            overdue_after = self.intervals[tier] - self.tick_seconds / 2
+            picked = []
+            for i, symbol in enumerate(members):
+                last = self.last_scanned.get(symbol) or self._first_seen.setdefault(symbol, now)
+                if i % ticks == slot or now - last > overdue_after:
+                    picked.append(symbol)
+            selected.extend(picked)
+            summary.append(f"{tier} {len(picked)}/{len(members)}")
+        log.info(f"Scan plan for tick {tick}: " + ", ".join(summary))
+        return selected
+
+    def mark_scanned(self, symbols: List[str], when: Optional[float] = None) -> None:
+        when = time.time() if when is None else when
+        for symbol in symbols:
+            self.last_scanned[symbol] = when
+
+    def max_staleness(self, now: Optional[float] = None) -> Dict[str, float]:
+        """Oldest scan age per tier in seconds (never-scanned symbols count from first plan)."""
+        now = time.time() if now is None else now
+        out = {}
+        for tier, members in self.tiers().items():
+            ages = [now - (self.last_scanned.get(s) or self._first_seen.get(s, now)) for s in members]
+            out[tier] = max(ages) if ages else 0.0
+        return out
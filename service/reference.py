@@ -0,0 +1,232 @@
+"""
+Daily reference data: multi-day volume and volatility baselines per symbol.
+
+Once a day, after the close, `build_reference_data` fetches `REFERENCE_LOOKBACK`
+of `INTERVAL` bars for the scan universe and derives, per symbol, the 20-day
+average daily volume, daily ATR, the previous close and the typical (median)
+volume of every intraday slot (bar position since `SESSION_OPEN`). Everything
+is stored as a handful of arrays in one `.npz` file (`REFERENCE_FILE`).
+
+Scans load the file once (`refresh` re-reads it only when it changes) and
+`lookup(symbol)` is a dict hit into those arrays, so `compute_features` can
+compare the current bar against the symbol's usual volume at that time of day
+instead of the last few intraday bars.
+"""
+
+import os
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from config.settings import (
+    INTERVAL,
+    REFERENCE_FILE,
+    REFERENCE_LOOKBACK,
+    REFERENCE_REBUILD_AFTER,
+    SESSION_CLOSE,
+    SESSION_OPEN,
+)
+from core.data_fetch import FetchUnavailable, fetch_bars, flatten_columns, get_provider
+from core.fetch_control import Prefetcher
+from core.timeframes import parse_minutes
+from infra.logging import log
+from service import universe
+
+IST = universe.IST
+
+
+def _minutes(hhmm: str) -> int:
+    hours, mins = (int(part) for part in hhmm.split(":"))
+    return hours * 60 + mins
+
+
+def session_slots() -> int:
+    """Number of `INTERVAL` bars in a session."""
+    base = parse_minutes(INTERVAL) or 5
+    return -(-(_minutes(SESSION_CLOSE) - _minutes(SESSION_OPEN)) // base)
+
+
+def slot_of(ts) -> int:
+    """Bar position of `ts` (market wall-clock time) within its session; -1 outside it."""
+    slot = (ts.hour * 60 + ts.minute - _minutes(SESSION_OPEN)) // (parse_minutes(INTERVAL) or 5)
+    return slot if 0 <= slot < session_slots() else -1
+
+
+class Reference(NamedTuple):
+    symbol: str
+    as_of: str  # last complete session the figures cover (YYYY-MM-DD)
+    avg_volume: float  # 20-day average daily volume
+    atr: float  # 14-day ATR on daily bars
+    prev_close: float
+    slot_volume: np.ndarray  # median volume per intraday slot (NaN = no data)
+
+    @property
+    def atr_pct(self) -> float:
+        return self.atr / self.prev_close * 100 if self.prev_close else 0.0
+
+    def typical_volume(self, ts) -> Optional[float]:
+        """Usual volume of the bar at `ts`, or None outside the session or without history."""
+        slot = slot_of(ts)
+        if slot < 0:
+            return None
+        value = float(self.slot_volume[slot])
+        return value if value > 0 else None
+
+
+class ReferenceData:
+    """The arrays of one reference file, indexed by symbol."""
+
+    def __init__(self, arrays: Optional[Dict[str, np.ndarray]] = None, mtime: Optional[float] = None):
+        arrays = arrays or {}
+        self.mtime = mtime
+        self.built = float(arrays["built"]) if "built" in arrays else None
+        self._symbols = arrays.get("symbols", np.array([], dtype="U1"))
+        self._as_of = arrays.get("as_of", np.array([], dtype="datetime64[D]"))
+        self._daily = arrays.get("daily", np.zeros((0, 3), dtype=np.float32))
+        self._slots = arrays.get("slot_volume", np.zeros((0, session_slots()), dtype=np.float32))
+        self._rows = {str(symbol): i for i, symbol in enumerate(self._symbols)}
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> "ReferenceData":
+        path = path or REFERENCE_FILE
+        try:
+            mtime = os.path.getmtime(path)
+            with np.load(path, allow_pickle=False) as npz:
+                arrays = {name: npz[name] for name in npz.files}
+        except (OSError, ValueError, KeyError) as exc:
+            if os.path.exists(path):
+                log.error(f"Failed to read reference data {path}: {exc}", exc_info=True)
+            return cls()
+        if str(arrays.get("interval")) != INTERVAL or arrays["slot_volume"].shape[1] != session_slots():
+            log.warning(f"Reference data {path} was built for another interval or session; ignoring it")
+            return cls(mtime=mtime)
+        return cls(arrays, mtime)
+
+    def lookup(self, symbol: str) -> Optional[Reference]:
+        i = self._rows.get(symbol)
+        if i is None:
+            return None
+        avg_volume, atr, prev_close = self._daily[i]
+        return Reference(symbol, str(self._as_of[i]), float(avg_volume), float(atr), float(prev_close),
+                         self._slots[i])
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+
+_data: Optional[ReferenceData] = None
+
+
+def refresh() -> ReferenceData:
+    """Load the reference file, re-reading it only if it changed since the last load."""
+    global _data
+    try:
+        mtime = os.path.getmtime(REFERENCE_FILE)
+    except OSError:
+        mtime = None
+    if _data is None or _data.mtime != mtime:
+        _data = ReferenceData.load()
+        if len(_data):
+            log.info(f"Loaded reference data for {len(_data)} symbols")
+    return _data
+
+
+def lookup(symbol: str) -> Optional[Reference]:
+    """Reference figures for `symbol`, or None if it has none."""
+    return (_data if _data is not None else refresh()).lookup(symbol)
+
+
+def _complete_sessions(df, now: datetime):
+    # today's bars only count once the session is over
+    dates = df.index.date
+    if now.weekday() < 5 and (now.hour * 60 + now.minute) < _minutes(SESSION_CLOSE):
+        df = df[dates < now.date()]
+    return df
+
+
+def _symbol_reference(df, now: datetime) -> Optional[tuple]:
+    if df is None or df.empty:
+        return None
+    df = _complete_sessions(flatten_columns(df).dropna(), now)
+    stats = universe._daily_stats(df)
+    if stats is None:
+        return None
+    # median over the same sessions of each slot's volume
+    sessions = sorted(set(df.index.date))[-20:]
+    df = df[df.index.date >= sessions[0]]
+    slots = (df.index.hour * 60 + df.index.minute - _minutes(SESSION_OPEN)) // (parse_minutes(INTERVAL) or 5)
+    volume = df["Volume"].groupby([df.index.date, np.asarray(slots)]).sum()
+    per_slot = volume.unstack().reindex(columns=range(session_slots())).median()
+    slot_volume = per_slot.to_numpy(dtype=np.float32, na_value=np.nan)
+    atr = stats["atr_pct"] * stats["price"] / 100
+    return stats["last_seen"], (stats["avg_volume"], atr, stats["price"]), slot_volume
+
+
+def write_reference(rows: Dict[str, tuple], path: Optional[str] = None, built: Optional[float] = None) -> None:
+    path = path or REFERENCE_FILE
+    symbols = sorted(rows)
+    arrays = {
+        "symbols": np.array(symbols, dtype=str),
+        "as_of": np.array([rows[s][0] for s in symbols], dtype="datetime64[D]"),
+        "daily": np.array([rows[s][1] for s in symbols], dtype=np.float32).reshape(-1, 3),
+        "slot_volume": np.array([rows[s][2] for s in symbols], dtype=np.float32).reshape(-1, session_slots()),
+        "interval": np.array(INTERVAL),
+        "built": np.array(datetime.now(IST).timestamp() if built is None else built),
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+
+def build_reference_data(symbols: Optional[Sequence[str]] = None, provider=None,
+                         now: Optional[datetime] = None) -> Dict[str, tuple]:
+    """Fetch the universe's recent bars and rewrite the reference file."""
+    provider = provider or get_provider()
+    symbols = list(symbols) if symbols is not None else universe.load_universe()
+    now = now or datetime.now(IST)
+    fetch = lambda s: fetch_bars(s, period=REFERENCE_LOOKBACK, provider=provider)
+    prefetch = Prefetcher(symbols, fetch) if provider.remote and len(symbols) > 1 else None
+    rows: Dict[str, tuple] = {}
+    missing: List[str] = []
+    try:
+        for symbol in symbols:
+            try:
+                row = _symbol_reference(prefetch.fetch(symbol) if prefetch else fetch(symbol), now)
+            except FetchUnavailable as exc:
+                log.warning(f"Reference build skipped {symbol}: {exc}")
+                row = None
+            except Exception as exc:
+                log.error(f"Reference build failed for {symbol}: {exc}", exc_info=True)
+                row = None
+            if row is None:
+                missing.append(symbol)
+            else:
+                rows[symbol] = row
+    finally:
+        if prefetch is not None:
+            prefetch.close()
+    # keep yesterday's figures for symbols that could not be fetched this time
+    previous = ReferenceData.load()
+    for symbol in missing:
+        old = previous.lookup(symbol)
+        if old is not None:
+            rows[symbol] = (old.as_of, (old.avg_volume, old.atr, old.prev_close), old.slot_volume)
+    write_reference(rows, built=now.timestamp())
+    refresh()
+    log.info(f"Reference data built for {len(rows)}/{len(symbols)} symbols ({len(missing)} not fetched)")
+    return rows
+
+
+def is_stale(now: Optional[datetime] = None) -> bool:
+    """True once today's session has closed and the reference data predates it."""
+    now = now or datetime.now(IST)
+    hour, minute = (int(p) for p in REFERENCE_REBUILD_AFTER.split(":"))
+    if (now.hour, now.minute) < (hour, minute) or now.weekday() >= 5:
+        return False
+    built = refresh().built
+    if built is None:
+        return True
+    built_at = datetime.fromtimestamp(built, IST)
+    return built_at.date() < now.date() or (built_at.hour, built_at.minute) < (hour, minute)
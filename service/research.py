@@ -2,18 +2,30 @@
 Market scan helper shared by runner and Telegram commands.
 """
 
+import contextvars
+import heapq
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Generator, List, Optional, Set, Tuple
 
-import pandas as pd
-
-from core.data_fetch import fetch_data
+from core.data_fetch import FetchUnavailable, fetch_data, get_provider
 from core.decision_engine import decide
+from core.feature_cache import cache as feature_cache
+from core.fetch_control import Prefetcher
 from core.indicators import compute_features
+from core.timeframes import cache as timeframe_cache
+from core.quotes import quotes
 from core.news_sentiment import fetch_news, finbert_sentiment
-from infra.database import record_trade_decision
-from infra.logging import log
+from infra.database import record_decisions
+from infra import api, metrics, profiling
+from infra.logging import log, set_log_context
 from infra.monitor import record_snapshot, save_intraday_graph
+from service import reference, universe
+from service.decisions import OutcomeTracker, decision_rows
 from service.database import get_open_positions
 from config.settings import (
     SYMBOLS_FILE,
@@ -24,29 +36,261 @@ from config.settings import (
     TOP_N,
     MONITOR_GRAPH_POINTS,
     MONITOR_MAX_SELL_GRAPHS,
+    SCAN_CARRYOVER_MAX,
+    SCAN_CARRYOVER_MAX_ATTEMPTS,
+    SCAN_PROGRESS_EVERY,
+    SCAN_STAGE_TIMEOUTS,
+    SCAN_STAGE_WORKERS,
 )
 
+# symbols a deadline or stage timeout cut from earlier scans -> consecutive
+# timeouts; never-attempted ones go first next time, ones that timed out last
+_carryover: Dict[str, int] = {}
+_stage_pool: Optional[ThreadPoolExecutor] = None
+# calls that overran their timeout and still hold a thread of `_stage_pool`
+_abandoned: Set = set()
+_stage_lock = threading.Lock()
 
-def _load_symbol_universe() -> List[str]:
+
+def _reset_stage_pool() -> None:
+    # a forked scan worker inherits the pool object but none of its threads
+    global _stage_pool
+    _stage_pool = None
+    _abandoned.clear()
+
+
+os.register_at_fork(after_in_child=_reset_stage_pool)
+
+
+class StageTimeout(Exception):
+    """A scan stage did not finish within its timeout (or the scan deadline)."""
+
+
+def _run_stage(stage: str, fn: Callable, *args, deadline_at: Optional[float] = None):
+    """
+    Call `fn(*args)` with the stage's `SCAN_STAGE_TIMEOUTS` budget, capped by
+    the scan deadline. A call that overruns is abandoned (its thread finishes
+    in the background) and `StageTimeout` is raised. Once half the pool is
+    held by abandoned calls, later stages get a fresh pool rather than queue
+    behind them. The call runs in the caller's log context.
+    """
+    timeout = SCAN_STAGE_TIMEOUTS.get(stage)
+    if deadline_at is not None:
+        remaining = deadline_at - time.perf_counter()
+        timeout = remaining if timeout is None else min(timeout, remaining)
+    if timeout is None:
+        return fn(*args)
+    if timeout <= 0:
+        raise StageTimeout(f"no time left for {stage}")
+    future = _stage_executor().submit(contextvars.copy_context().run, fn, *args)
     try:
-        df = pd.read_csv(SYMBOLS_FILE)
-        symbols = [str(s).upper().strip() for s in df.get("symbol", []) if str(s).strip()]
-        return symbols
-    except Exception as exc:
-        log.error(f"Failed to load symbols file {SYMBOLS_FILE}: {exc}", exc_info=True)
-        return []
+        return future.result(timeout=timeout)
+    except FuturesTimeout:
+        if not future.cancel():
+            _abandon(future)
+        metrics.incr(f"timeout_{stage}")
+        raise StageTimeout(f"{stage} exceeded {timeout:.1f}s")
 
 
-def perform_scan(
+def _stage_executor() -> ThreadPoolExecutor:
+    global _stage_pool
+    with _stage_lock:
+        if _stage_pool is None:
+            _stage_pool = ThreadPoolExecutor(max_workers=SCAN_STAGE_WORKERS, thread_name_prefix="scan-stage")
+        return _stage_pool
+
+
+def _abandon(future) -> None:
+    global _stage_pool
+    with _stage_lock:
+        _abandoned.add(future)
+        if len(_abandoned) < max(1, SCAN_STAGE_WORKERS // 2) or _stage_pool is None:
+            future.add_done_callback(_abandoned.discard)
+            return
+        # the stuck calls keep their threads in the old pool until they return
+        log.warning(f"{len(_abandoned)} stage calls still running past their timeout; starting a fresh stage pool")
+        metrics.incr("stage_pool_replaced")
+        _stage_pool.shutdown(wait=False)
+        _stage_pool = None
+        _abandoned.clear()
+
+
+def _load_symbol_universe() -> List[str]:
+    # Ranked scan tiers from the universe index, or SYMBOLS_FILE if none built yet
+    symbols = universe.load_universe()
+    if not symbols:
+        log.error(f"No symbols loaded from universe index or {SYMBOLS_FILE}")
+    return symbols
+
+
+class TopCandidates:
+    """
+    Bounded min-heap holding the `size` best-scoring BUY candidates.
+
+    Entries are compact tuples `(score, -seq, record, trace)`; the heap root is
+    the weakest kept candidate, so an evicted entry and its trace frame are
+    dropped as soon as a better one arrives. Equal scores keep the earlier
+    symbol, matching a stable descending sort.
+    """
+
+    def __init__(self, size: int):
+        self.size = max(0, size)
+        self.heap: List = []
+        self.seen = 0
+
+    def offer(self, score: float, seq: int, record: tuple, make_trace: Callable) -> bool:
+        """Keep `record` if it ranks in the top `size`; `make_trace` runs only then."""
+        self.seen += 1
+        key = (score, -seq)
+        if len(self.heap) < self.size:
+            heapq.heappush(self.heap, key + (record, make_trace()))
+        elif self.size and key > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, key + (record, make_trace()))
+        else:
+            return False
+        return True
+
+    def ranked(self) -> List:
+        return sorted(self.heap, key=lambda entry: entry[:2], reverse=True)
+
+
+def _format_confidence(rsi, atr_pct, sentiment) -> str:
+    return f"rsi={rsi}, atr_pct={atr_pct}, sentiment={sentiment}"
+
+
+def _decision_features(f: Dict, sentiment, bars) -> Dict:
+    # numeric columns stored with each decision (see service.decisions)
+    return {"rsi": f["rsi"], "atr_pct": f["atr_pct"], "vol_spike": f.get("vol_spike"),
+            "sentiment": sentiment, "bar_ts": str(bars.timestamp(-1))}
+
+
+def _prioritise(symbols: List[str], held: Set[str], carry: Optional[List[str]] = None,
+                retry: Optional[List[str]] = None) -> List[str]:
+    """
+    Open positions first (keeping their relative order), then `carry`, then
+    the rest, then `retry` (symbols that timed out last time).
+    """
+    first = [s for s in symbols if s in held]
+    carry = [s for s in carry or [] if s not in held]
+    seen = set(first) | set(carry)
+    retry = [s for s in retry or [] if s not in seen]
+    seen.update(retry)
+    return first + carry + [s for s in symbols if s not in seen] + retry
+
+
+def _carried(scope: str, active_positions: Set[str]) -> Tuple[List[str], List[str]]:
+    """Carried-over symbols for a scan of `scope`: (not reached yet, timed out before)."""
+    carry, retry = [], []
+    for symbol, attempts in _carryover.items():
+        if scope != "portfolio" or symbol in active_positions:
+            (retry if attempts else carry).append(symbol)
+    return carry, retry
+
+
+def _update_carryover(unreached: List[str], failed: List[str], done: List[str]) -> None:
+    """Record a scan's deferred symbols; drop repeat offenders and cap the size."""
+    for symbol in done:
+        _carryover.pop(symbol, None)
+    for symbol in unreached:
+        _carryover.setdefault(symbol, 0)
+    for symbol in failed:
+        attempts = _carryover.get(symbol, 0) + 1
+        if attempts >= SCAN_CARRYOVER_MAX_ATTEMPTS:
+            _carryover.pop(symbol, None)
+            metrics.incr("carryover_dropped")
+            log.warning(f"{symbol}: timed out in {attempts} scans in a row; no longer carried over")
+        else:
+            _carryover[symbol] = attempts
+    while len(_carryover) > SCAN_CARRYOVER_MAX:
+        _carryover.pop(next(iter(_carryover)))
+        metrics.incr("carryover_dropped")
+
+
+def _analyse_symbol(symbol: str, active_positions: Set[str], now_iso: str,
+                    deadline_at: Optional[float] = None, fetch: Optional[Callable] = None) -> Tuple:
+    """
+    Fetch, filter and decide a single symbol.
+
+    Returns `(action, features, sentiment, bars)`; `action` is "SKIP" when the
+    symbol has no usable data or fails the price/volume/ATR filters. Raises
+    `StageTimeout` if the fetch overruns and `FetchUnavailable` if the
+    provider keeps failing; a news timeout scores no headlines.
+    """
+    fetch = fetch or fetch_data
+    cached = feature_cache.lookup(
+        symbol,
+        lambda s: _run_stage("fetch", fetch, s, deadline_at=deadline_at),
+        lambda d: compute_features(d, timeframe_cache.frames(symbol, d), reference.lookup(symbol)),
+    )
+    bars, f = cached["bars"], cached["features"]
+    if bars is None or bars.empty:
+        metrics.incr("fetch_empty")
+    if not f:
+        log.debug("Skipping %s: insufficient data", symbol)
+        return "SKIP", None, None, bars
+    if f["price"] < MIN_PRICE:
+        log.debug("Skipping %s: price %s < MIN_PRICE", symbol, f["price"])
+        return "SKIP", f, None, bars
+    if f["avg_volume"] < MIN_AVG_VOLUME:
+        log.debug("Skipping %s: avg_volume %s < MIN_AVG_VOLUME", symbol, f["avg_volume"])
+        return "SKIP", f, None, bars
+    if not (MIN_ATR_PCT <= f["atr_pct"] <= MAX_ATR_PCT):
+        log.debug("Skipping %s: atr_pct %s not in range", symbol, f["atr_pct"])
+        return "SKIP", f, None, bars
+    snapshot_stats = {
+        "price": f.get("price"),
+        "session_low": f.get("session_low"),
+        "session_high": f.get("session_high"),
+        "vwap": f.get("vwap"),
+        "rsi": f.get("rsi"),
+        "atr_pct": f.get("atr_pct"),
+        "avg_volume": f.get("avg_volume"),
+        "vol_spike": f.get("vol_spike"),
+        "pct_from_low": f.get("pct_from_low"),
+        "pct_from_high": f.get("pct_from_high"),
+    }
+    if not cached["snapshotted"]:
+        # one analysis row per bar; repeat scans within the bar add nothing new
+        with metrics.stage("snapshot"):
+            record_snapshot(symbol, snapshot_stats, now_iso)
+        feature_cache.mark_snapshotted(symbol)
+    with metrics.stage("news"):
+        try:
+            headlines = _run_stage("news", fetch_news, symbol, deadline_at=deadline_at)
+        except StageTimeout as exc:
+            log.warning(f"{symbol}: {exc}; deciding without news")
+            headlines = []
+    with metrics.stage("sentiment"):
+        sentiment = finbert_sentiment(headlines)
+    with metrics.stage("decide"):
+        action = decide(symbol, f, sentiment, open_positions=active_positions)
+    return action, f, sentiment, bars
+
+
+def scan_stream(
     scope: str = "whole",
     symbols: Optional[List[str]] = None,
     top_n: int = TOP_N,
-) -> Dict:
+    deadline: Optional[float] = None,
+    carryover: Optional[bool] = None,
+) -> Generator[Dict, None, Dict]:
     """
-    Run the indicator + sentiment scan across the provided symbol list.
+    Generator form of `perform_scan`.
 
-    `scope` can be "whole" (default) to use the full universe or "portfolio"
-    to restrict to open positions.
+    Yields one event per symbol as soon as it is analysed, open positions
+    first, and returns the final scan result (`StopIteration.value`). Events
+    carry `symbol`, `action` (BUY/SELL/HOLD/IGNORE/SKIP/TIMEOUT/UNAVAILABLE/ERROR), `held`,
+    `price`, `confidence`, `graph`, `index`, `total` and `elapsed` seconds.
+    BUY events are raw signals; the ranked top-N is only known at the end.
+
+    With `deadline` (seconds), symbols not reached in time are listed in
+    `skipped_symbols`, as are symbols whose fetch timed out or that the fetch
+    controller gave up on. With `carryover` (default: only when no explicit
+    `symbols` are given) the next carry-over scan takes them too: unreached
+    ones first, timed-out ones last and only up to
+    `SCAN_CARRYOVER_MAX_ATTEMPTS` times. `analysed_symbols` lists every symbol
+    the scan got to. With a remote provider, upcoming fetches run ahead of
+    the analysis, up to the controller's concurrency limit.
     """
     timestamp = datetime.utcnow()
     active_positions = {p["symbol"] for p in get_open_positions()}
@@ -58,86 +302,148 @@ def perform_scan(
         target_symbols = sorted(active_positions)
     else:
         target_symbols = _load_symbol_universe()
+    if carryover is None:
+        carryover = symbols is None
+    carry, retry = _carried(scope, active_positions) if carryover else ([], [])
+    target_symbols = _prioritise(target_symbols, active_positions, carry, retry)
 
     if not target_symbols:
         log.warning("No symbols available to scan.")
 
-    buy_candidates: List[Dict] = []
+    top_buys = TopCandidates(top_n if allow_buy else 0)
     sell_candidates: List[Dict] = []
     hold_candidates: List[str] = []
     processed = 0
+    fetch_failed: List[str] = []
+    fetch_ok: List[str] = []
+    first_alert: Optional[float] = None
+    quote_batch: List[Tuple[str, float, str]] = []
+    skipped: List[str] = []
+    unreached: List[str] = []
+    analysed: List[str] = []
+    symbol_features: Dict[str, Dict] = {}
 
     sell_graphs = 0
     now_iso = timestamp.isoformat()
-    for symbol in target_symbols:
+    scan_metrics = metrics.begin_scan(scope)
+    set_log_context(scan_id=uuid.uuid4().hex[:12])
+    outcomes = OutcomeTracker()
+    outcomes.load()
+    reference.refresh()
+    scan_start = time.perf_counter()
+    deadline_at = scan_start + deadline if deadline else None
+    total = len(target_symbols)
+    prefetch = None
+    if get_provider().remote and total > 1:
+        prefetch = Prefetcher(target_symbols, fetch_data, want=feature_cache.needs_fetch)
+    for seq, symbol in enumerate(target_symbols):
+        if deadline_at is not None and time.perf_counter() >= deadline_at:
+            unreached = target_symbols[seq:]
+            skipped.extend(unreached)
+            break
         processed += 1
+        analysed.append(symbol)
+        symbol_start = time.perf_counter()
+        set_log_context(symbol=symbol)
+        event = {"symbol": symbol, "action": "ERROR", "held": symbol in active_positions,
+                 "price": None, "confidence": None, "graph": None, "index": processed, "total": total}
         try:
-            df = fetch_data(symbol)
-            f = compute_features(df)
-            if not f:
-                log.debug(f"Skipping {symbol}: insufficient data")
-                continue
-            if f["price"] < MIN_PRICE:
-                log.debug(f"Skipping {symbol}: price {f['price']} < MIN_PRICE")
-                continue
-            if f["avg_volume"] < MIN_AVG_VOLUME:
-                log.debug(f"Skipping {symbol}: avg_volume {f['avg_volume']} < MIN_AVG_VOLUME")
-                continue
-            if not (MIN_ATR_PCT <= f["atr_pct"] <= MAX_ATR_PCT):
-                log.debug(f"Skipping {symbol}: atr_pct {f['atr_pct']} not in range")
-                continue
-            snapshot_stats = {
-                "price": f.get("price"),
-                "session_low": f.get("session_low"),
-                "session_high": f.get("session_high"),
-                "vwap": f.get("vwap"),
-                "rsi": f.get("rsi"),
-                "atr_pct": f.get("atr_pct"),
-                "avg_volume": f.get("avg_volume"),
-                "vol_spike": f.get("vol_spike"),
-                "pct_from_low": f.get("pct_from_low"),
-                "pct_from_high": f.get("pct_from_high"),
-            }
-            record_snapshot(symbol, snapshot_stats, now_iso)
-            sentiment = finbert_sentiment(fetch_news(symbol))
-            action = decide(symbol, f, sentiment, open_positions=active_positions)
-            confidence = f"rsi={f['rsi']}, atr_pct={f['atr_pct']}, sentiment={sentiment}"
-            price = round(f["price"], 2)
-            df_snapshot = df.tail(MONITOR_GRAPH_POINTS).copy()
+            action, f, sentiment, bars = _analyse_symbol(
+                symbol, active_positions, now_iso, deadline_at, prefetch.fetch if prefetch else None
+            )
+            (fetch_failed if bars is None or bars.empty else fetch_ok).append(symbol)
+            outcomes.observe(symbol, bars)
+            if f:
+                bar_ts = str(bars.timestamp(-1))
+                quote_batch.append((symbol, f["price"], bar_ts))
+                symbol_features[symbol] = {"action": action, "bar_ts": bar_ts,
+                                           "sentiment": sentiment, "features": f}
+            event["action"] = action
+            if action != "SKIP":
+                price = round(f["price"], 2)
+                event["price"] = price
+                event["confidence"] = _format_confidence(f["rsi"], f["atr_pct"], sentiment)
             if action == "BUY" and allow_buy:
                 score = f.get("vol_spike", 0.0) + (f.get("rsi", 0.0) / 100)
-                buy_candidates.append(
-                    {
-                        "symbol": symbol,
-                        "price": price,
-                        "confidence": confidence,
-                        "score": score,
-                        "trace_df": df_snapshot,
-                    }
+                top_buys.offer(
+                    score,
+                    seq,
+                    (symbol, price, f["rsi"], f["atr_pct"], sentiment, f.get("vol_spike"), bar_ts),
+                    lambda: bars.tail(MONITOR_GRAPH_POINTS).copy(),
                 )
             elif action == "SELL":
                 graph_path = None
                 if sell_graphs < MONITOR_MAX_SELL_GRAPHS:
-                    graph_path = save_intraday_graph(symbol, df_snapshot, now_iso)
+                    with metrics.stage("graph"):
+                        graph_path = save_intraday_graph(symbol, bars.tail(MONITOR_GRAPH_POINTS), now_iso)
                     sell_graphs += 1
+                event["graph"] = graph_path
                 sell_candidates.append(
-                    {"symbol": symbol, "price": price, "confidence": confidence, "graph": graph_path}
+                    {
+                        "symbol": symbol,
+                        "price": price,
+                        "confidence": event["confidence"],
+                        "graph": graph_path,
+                        **_decision_features(f, sentiment, bars),
+                    }
                 )
             elif action == "HOLD":
                 hold_candidates.append(symbol)
+        except (StageTimeout, FetchUnavailable) as exc:
+            event["action"] = "TIMEOUT" if isinstance(exc, StageTimeout) else "UNAVAILABLE"
+            analysed.pop()
+            skipped.append(symbol)
+            log.warning(f"{symbol}: {exc}; deferred to the next scan")
         except Exception as exc:
+            metrics.incr("scan_error")
             log.error(f"{symbol}: scan error {exc}", exc_info=True)
+        finally:
+            scan_metrics.observe_symbol(symbol, time.perf_counter() - symbol_start)
+        event["elapsed"] = time.perf_counter() - scan_start
+        yield event
+        if first_alert is None and event["action"] == "SELL" and event["held"]:
+            # measured after the consumer has handled (e.g. sent) the alert
+            first_alert = time.perf_counter() - scan_start
+            scan_metrics.observe_latency("first_alert", first_alert)
 
-    buy_candidates.sort(key=lambda entry: entry["score"], reverse=True)
-    selected_buys = buy_candidates[:top_n] if allow_buy else []
-    filtered_buy_count = max(0, len(buy_candidates) - len(selected_buys))
+    set_log_context(symbol=None)
+    if prefetch is not None:
+        prefetch.close()
+    if carryover:
+        _update_carryover(unreached, [s for s in skipped if s not in unreached], analysed)
+    if skipped:
+        metrics.incr("symbols_deferred", len(skipped))
+    if deadline_at is not None and processed < total:
+        metrics.incr("deadline_miss")
+        log.warning(f"Scan deadline of {deadline:.0f}s hit after {processed}/{total} symbols; "
+                    f"{len(skipped)} deferred to the next scan")
+    universe.note_fetch_results(fetch_failed, fetch_ok)
+    outcomes.flush()
+    # share the latest closes with other processes (e.g. the Telegram listener)
+    quotes.publish(quote_batch)
 
-    for cand in selected_buys:
-        trace = cand.pop("trace_df", None)
-        if trace is not None:
-            cand["graph"] = save_intraday_graph(cand["symbol"], trace, now_iso)
+    selected_buys = []
+    for score, _, (symbol, price, rsi, atr_pct, sentiment, vol_spike, bar_ts), trace in top_buys.ranked():
+        with metrics.stage("graph"):
+            graph_path = save_intraday_graph(symbol, trace, now_iso)
+        selected_buys.append(
+            {
+                "symbol": symbol,
+                "price": price,
+                "confidence": _format_confidence(rsi, atr_pct, sentiment),
+                "score": score,
+                "graph": graph_path,
+                "rsi": rsi,
+                "atr_pct": atr_pct,
+                "vol_spike": vol_spike,
+                "sentiment": sentiment,
+                "bar_ts": bar_ts,
+            }
+        )
+    top_buys.heap.clear()
+    filtered_buy_count = max(0, top_buys.seen - len(selected_buys))
 
-    return {
+    result = {
         "scope": scope,
         "symbols_scanned": processed,
         "buy_candidates": selected_buys,
@@ -145,17 +451,94 @@ def perform_scan(
         "hold_candidates": hold_candidates,
         "filtered_buy_count": filtered_buy_count,
         "active_positions": sorted(active_positions),
+        "time_to_first_alert": first_alert,
+        "skipped_symbols": skipped,
+        "analysed_symbols": analysed,
+        "deadline_missed": deadline_at is not None and processed < total,
         "timestamp": timestamp.strftime("%Y-%m-%d %H:%M"),
         "timestamp_iso": timestamp.isoformat(),
+        "metrics": _end_scan(scan_metrics),
     }
+    # local HTTP API clients read this instead of triggering scans
+    api.publish_scan(result, symbol_features)
+    return result
+
+
+def _end_scan(scan_metrics) -> Dict:
+    set_log_context(scan_id=None, symbol=None)
+    return metrics.end_scan(scan_metrics)
+
+
+def perform_scan(
+    scope: str = "whole",
+    symbols: Optional[List[str]] = None,
+    top_n: int = TOP_N,
+    on_result: Optional[Callable[[Dict], None]] = None,
+    deadline: Optional[float] = None,
+    carryover: Optional[bool] = None,
+) -> Dict:
+    """
+    Run the indicator + sentiment scan across the provided symbol list.
+
+    `scope` can be "whole" (default) to use the full universe or "portfolio"
+    to restrict to open positions. `on_result`, if given, is called with each
+    per-symbol event from `scan_stream` as soon as it is available. With
+    `deadline` (seconds) the scan returns a partial result when time runs out;
+    `carryover` is passed on to `scan_stream`.
+    """
+    with profiling.profiled("scan", scope):
+        stream = scan_stream(scope=scope, symbols=symbols, top_n=top_n, deadline=deadline,
+                             carryover=carryover)
+        while True:
+            try:
+                event = next(stream)
+            except StopIteration as stop:
+                return stop.value
+            if on_result is not None:
+                try:
+                    on_result(event)
+                except Exception as exc:
+                    log.error(f"{event['symbol']}: scan callback error {exc}", exc_info=True)
+
+
+class AlertStreamer:
+    """
+    `perform_scan` callback that alerts SELLs on held names immediately and
+    sends a progress summary every `progress_every` symbols for the rest.
+    """
+
+    def __init__(self, send: Callable[[str], None], progress_every: int = SCAN_PROGRESS_EVERY):
+        self.send = send
+        self.progress_every = progress_every
+        self.alerted: Set[str] = set()
+        self.buys = 0
+        self.sells = 0
+
+    def __call__(self, event: Dict) -> None:
+        action = event["action"]
+        if action == "BUY":
+            self.buys += 1
+        elif action == "SELL":
+            self.sells += 1
+            if event["held"]:
+                self.send(
+                    f"{event['symbol']} — SELL\n"
+                    f"Confidence: {event['confidence']}\n"
+                    f"Price: {event['price']}"
+                    + (f"\nGraph: {event['graph']}" if event.get("graph") else "")
+                )
+                self.alerted.add(event["symbol"])
+        index, total = event["index"], event["total"]
+        if self.progress_every and index % self.progress_every == 0 and index < total:
+            self.send(
+                f"Scan progress: {index}/{total} symbols, "
+                f"{self.sells} SELL and {self.buys} BUY signals so far ({event['elapsed']:.0f}s)"
+            )
 
 
 def persist_scan_results(scan_result: Dict) -> None:
     ts = scan_result.get("timestamp_iso") or datetime.utcnow().isoformat()
-    for sell in scan_result.get("sell_candidates", []):
-        record_trade_decision(sell["symbol"], "SELL", sell["price"], sell["confidence"])
-    for buy in scan_result.get("buy_candidates", []):
-        record_trade_decision(buy["symbol"], "BUY", buy["price"], buy["confidence"])
+    record_decisions(decision_rows(scan_result))
     log.debug(
         f"Persisted {len(scan_result.get('sell_candidates', []))} SELLs and "
         f"{len(scan_result.get('buy_candidates', []))} BUYs at {ts}"
@@ -199,4 +582,13 @@ def format_summary_text(scan_result: Dict) -> str:
     if extra:
         lines.append(f"{extra} buy candidates filtered after TOP_N cap.")
 
+    first_alert = scan_result.get("time_to_first_alert")
+    if first_alert is not None:
+        lines.append(f"First SELL alert after {first_alert:.1f}s.")
+
+    skipped = scan_result.get("skipped_symbols", [])
+    if skipped:
+        reason = "deadline hit" if scan_result.get("deadline_missed") else "timed out"
+        lines.append(f"{len(skipped)} symbols skipped ({reason}); they are retried in the next scan.")
+
     return "\n".join(lines)
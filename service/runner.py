@@ -2,24 +2,40 @@
 Runner module for starting the service.
 """
 
+from config import settings
+from core.data_fetch import get_provider
 from infra.telegram import send_message
 from infra.logging import log
-from service.research import perform_scan, persist_scan_results
+from service.research import AlertStreamer, perform_scan, persist_scan_results
 
 
 def start_service():
     pass
 
 
-def run_once():
+def run_once(symbols=None, workers=None, deadline=None, carryover=None):
     log.info("Running market scan (runner.run_once)")
-    scan_result = perform_scan(scope="whole")
+    workers = settings.SCAN_WORKERS if workers is None else workers
+    if deadline is None and settings.SCAN_DEADLINE_SECONDS:
+        # finish inside the bar so the next tick starts on fresh data
+        deadline = settings.SCAN_DEADLINE_SECONDS / get_provider().clock_speed
+    # held-position SELLs go out while the rest of the universe is scanned
+    streamer = AlertStreamer(send_message)
+    if workers > 0:
+        from service.distributed import run_distributed_scan
+        scan_result = run_distributed_scan(scope="whole", symbols=symbols, workers=workers, on_result=streamer,
+                                           deadline=deadline, carryover=carryover)
+    else:
+        scan_result = perform_scan(scope="whole", symbols=symbols, on_result=streamer, deadline=deadline,
+                                   carryover=carryover)
     persist_scan_results(scan_result)
     timestamp = scan_result.get("timestamp")
     if not timestamp:
         timestamp = "unknown"
 
     for sell in scan_result.get("sell_candidates", []):
+        if sell["symbol"] in streamer.alerted:
+            continue
         msg = (
             f"{sell['symbol']} — SELL\n"
             f"Confidence: {sell['confidence']}\n"
@@ -48,7 +64,11 @@ def run_once():
     if scan_result.get("filtered_buy_count"):
         log.info(f"Filtered {scan_result['filtered_buy_count']} extra buy candidates after TOP_N cap.")
 
+    if scan_result.get("time_to_first_alert") is not None:
+        log.info(f"Time to first SELL alert: {scan_result['time_to_first_alert']:.2f}s")
+
     if not (scan_result.get("sell_candidates") or scan_result.get("buy_candidates")):
         log.debug("No BUY/SELL signals were issued this scan.")
 
     log.info("Market scan complete.")
+    return scan_result
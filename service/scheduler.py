@@ -5,17 +5,37 @@ Scheduler module for market tasks.
 import time
 from infra.logging import log
 from service.runner import run_once
+from core.data_fetch import get_provider
+from service import reference, universe
+from service.planner import ScanPlanner
 
 
 def market_scheduler_loop():
-    interval = 300
+    # one 5m bar per tick; a replay provider compresses the bar clock
+    speed = get_provider().clock_speed
+    interval = 300 / speed
+    planner = ScanPlanner(tick_seconds=interval, speed=speed)
     log.info("Market scheduler started.")
     while True:
         start = time.time()
         try:
-            run_once()
+            symbols = planner.plan(start)
+            # the planner's due list stands in for the whole universe
+            result = run_once(symbols=symbols, carryover=True)
+            # everything analysed, carried-over symbols included; skipped ones stay due
+            planner.mark_scanned(result["analysed_symbols"], start)
         except Exception as e:
             log.error(f"Scheduler run_once error: {e}", exc_info=True)
+        if universe.index_is_stale():
+            try:
+                universe.build_universe_index()
+            except Exception as e:
+                log.error(f"Universe index build error: {e}", exc_info=True)
+        if reference.is_stale():
+            try:
+                reference.build_reference_data()
+            except Exception as e:
+                log.error(f"Reference data build error: {e}", exc_info=True)
         elapsed = time.time() - start
-        sleep_time = max(1, interval - elapsed)
+        sleep_time = max(min(1, interval), interval - elapsed)
         time.sleep(sleep_time)
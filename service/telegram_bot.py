@@ -4,7 +4,7 @@ Telegram bot integration and listener.
 
 import time
 import requests
-from infra.telegram import parse_command, send_message
+from infra.telegram import handle_command, send_message
 from infra.logging import log
 from config.settings import TELEGRAM_BOT_TOKEN, TELEGRAM_CHAT_ID
 
@@ -28,7 +28,7 @@ def telegram_listener_loop():
                     if not isinstance(msg, str):
                         continue
                     try:
-                        reply = parse_command(msg)
+                        reply = handle_command(msg)
                         if reply:
                             send_message(reply)
                     except Exception as e:
@@ -0,0 +1,261 @@
+"""
+Liquidity-ranked symbol universe index.
+
+An end-of-day job (`build_universe_index`) fetches daily bars for every
+symbol in `SYMBOLS_FILE` and stores price, liquidity, ATR and last-seen
+metadata in a compact CSV. Intraday scans load the pre-filtered, ranked list
+from it (`load_universe`) instead of fetching symbols that never pass
+`MIN_PRICE`/`MIN_AVG_VOLUME`. Symbols whose fetches keep failing are
+quarantined until a rebuild sees data for them again.
+
+Updates to the index (`note_fetch_results`, the end of a rebuild) hold
+SQLite's write lock on the main database while they read, modify and replace
+the file, so scans in the daemon, scheduler and Telegram listener don't
+overwrite each other's fail counts.
+"""
+
+import csv
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from config.settings import (
+    SYMBOLS_FILE,
+    MIN_PRICE,
+    MIN_AVG_VOLUME,
+    UNIVERSE_INDEX_FILE,
+    UNIVERSE_CORE_SIZE,
+    UNIVERSE_QUARANTINE_FAILS,
+    UNIVERSE_FILTER_SLACK,
+    UNIVERSE_REBUILD_AFTER,
+)
+from core.data_fetch import FetchUnavailable, fetch_bars, flatten_columns, get_provider
+from infra import database
+from infra.logging import log
+
+FIELDS = ["symbol", "tier", "rank", "price", "avg_volume", "turnover", "atr_pct", "last_seen", "fail_count"]
+SCAN_TIERS = ("core", "long_tail")
+BARS_PER_SESSION = 75
+IST = timezone(timedelta(hours=5, minutes=30))
+
+_cache = {"path": None, "mtime": None, "rows": {}}
+
+
+def _read_symbols_file() -> List[str]:
+    try:
+        with open(SYMBOLS_FILE, "r", newline="") as f:
+            return [row["symbol"].upper().strip() for row in csv.DictReader(f) if (row.get("symbol") or "").strip()]
+    except (OSError, KeyError) as exc:
+        log.error(f"Failed to load symbols file {SYMBOLS_FILE}: {exc}", exc_info=True)
+        return []
+
+
+def _daily_stats(df) -> Optional[Dict]:
+    import pandas as pd
+    if df is None or df.empty:
+        return None
+    df = flatten_columns(df)
+    daily = df.resample("1D").agg({"High": "max", "Low": "min", "Close": "last", "Volume": "sum"}).dropna()
+    daily = daily[daily["Volume"] > 0].tail(20)
+    if daily.empty:
+        return None
+    prev_close = daily["Close"].shift()
+    tr = pd.concat(
+        [daily["High"] - daily["Low"], (daily["High"] - prev_close).abs(), (daily["Low"] - prev_close).abs()],
+        axis=1,
+    ).max(axis=1)
+    price = float(daily["Close"].iloc[-1])
+    avg_volume = float(daily["Volume"].mean())
+    atr = float(tr.tail(14).mean())
+    return {
+        "price": price,
+        "avg_volume": avg_volume,
+        "turnover": price * avg_volume,
+        "atr_pct": (atr / price * 100) if price else 0.0,
+        "last_seen": daily.index[-1].strftime("%Y-%m-%d"),
+    }
+
+
+def _passes_filters(stats: Dict) -> bool:
+    # MIN_AVG_VOLUME is a per-5m-bar average; compare on the same scale
+    per_bar = stats["avg_volume"] / BARS_PER_SESSION
+    return (
+        stats["price"] >= MIN_PRICE * (1 - UNIVERSE_FILTER_SLACK)
+        and per_bar >= MIN_AVG_VOLUME * (1 - UNIVERSE_FILTER_SLACK)
+    )
+
+
+def _assign_tiers(rows: Dict[str, Dict]) -> None:
+    eligible = [r for r in rows.values() if r["tier"] == "eligible"]
+    eligible.sort(key=lambda r: r["turnover"], reverse=True)
+    for rank, row in enumerate(eligible, start=1):
+        row["rank"] = rank
+        row["tier"] = "core" if rank <= UNIVERSE_CORE_SIZE else "long_tail"
+    for row in rows.values():
+        if row["tier"] not in SCAN_TIERS:
+            row["rank"] = 0
+
+
+def build_universe_index(symbols: Optional[Sequence[str]] = None, provider=None) -> Dict[str, Dict]:
+    """Fetch daily bars for the universe and rewrite the index file."""
+    provider = provider or get_provider()
+    symbols = list(symbols) if symbols is not None else _read_symbols_file()
+    previous = read_index()
+    rows: Dict[str, Dict] = {}
+    for symbol in symbols:
+        prev = previous.get(symbol, {})
+        throttled = False
+        try:
+            stats = _daily_stats(fetch_bars(symbol, period="1mo", interval="1d", provider=provider))
+        except FetchUnavailable as exc:
+            # provider trouble, not the symbol's: keep its standing for the next build
+            log.warning(f"Universe build skipped {symbol}: {exc}")
+            stats, throttled = None, True
+        except Exception as exc:
+            log.error(f"Universe build failed for {symbol}: {exc}", exc_info=True)
+            stats = None
+        if stats is None:
+            fails = int(prev.get("fail_count", 0)) + (0 if throttled else 1)
+            row = {k: prev.get(k, 0.0) for k in ("price", "avg_volume", "turnover", "atr_pct")}
+            row.update(symbol=symbol, last_seen=prev.get("last_seen", ""), fail_count=fails, rank=0)
+            row["tier"] = "quarantined" if fails >= UNIVERSE_QUARANTINE_FAILS else prev.get("tier", "long_tail")
+            if row["tier"] in SCAN_TIERS:
+                row["tier"] = "eligible"
+        else:
+            row = dict(stats, symbol=symbol, fail_count=0, rank=0)
+            row["tier"] = "eligible" if _passes_filters(stats) else "filtered"
+        rows[symbol] = row
+    _assign_tiers(rows)
+    with _index_lock():
+        write_index(rows)
+    with open(_built_marker(), "w") as f:
+        f.write(datetime.now(IST).isoformat())
+    counts = {}
+    for row in rows.values():
+        counts[row["tier"]] = counts.get(row["tier"], 0) + 1
+    log.info(f"Universe index built for {len(rows)} symbols: {counts}")
+    return rows
+
+
+def _built_marker() -> str:
+    return f"{UNIVERSE_INDEX_FILE}.built"
+
+
+@contextmanager
+def _index_lock():
+    """Cross-process lock for read-modify-write of the index file."""
+    conn = sqlite3.connect(database.DB_PATH, timeout=30, isolation_level=None)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        yield
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+
+
+def write_index(rows: Dict[str, Dict], path: Optional[str] = None) -> None:
+    path = path or UNIVERSE_INDEX_FILE
+    tmp = f"{path}.tmp"
+    ordered = sorted(rows.values(), key=lambda r: (r["rank"] == 0, r["rank"], r["symbol"]))
+    with open(tmp, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for r in ordered:
+            writer.writerow([
+                r["symbol"], r["tier"], r["rank"],
+                f"{float(r['price']):.2f}", f"{float(r['avg_volume']):.0f}", f"{float(r['turnover']):.0f}",
+                f"{float(r['atr_pct']):.3f}", r["last_seen"], r["fail_count"],
+            ])
+    os.replace(tmp, path)
+
+
+def read_index(path: Optional[str] = None) -> Dict[str, Dict]:
+    """Index rows keyed by symbol, cached until the file changes."""
+    path = path or UNIVERSE_INDEX_FILE
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {}
+    if _cache["mtime"] == mtime and _cache["path"] == path:
+        return _cache["rows"]
+    rows = {}
+    try:
+        with open(path, "r", newline="") as f:
+            for r in csv.DictReader(f):
+                rows[r["symbol"]] = {
+                    "symbol": r["symbol"],
+                    "tier": r["tier"],
+                    "rank": int(r["rank"]),
+                    "price": float(r["price"]),
+                    "avg_volume": float(r["avg_volume"]),
+                    "turnover": float(r["turnover"]),
+                    "atr_pct": float(r["atr_pct"]),
+                    "last_seen": r["last_seen"],
+                    "fail_count": int(r["fail_count"]),
+                }
+    except (OSError, KeyError, ValueError) as exc:
+        log.error(f"Failed to read universe index {path}: {exc}", exc_info=True)
+        return {}
+    _cache.update(path=path, mtime=mtime, rows=rows)
+    return rows
+
+
+def load_universe(tiers: Iterable[str] = SCAN_TIERS) -> List[str]:
+    """Ranked symbols for the requested tiers; falls back to SYMBOLS_FILE."""
+    rows = read_index()
+    if not rows:
+        return _read_symbols_file()
+    wanted = set(tiers)
+    selected = [r for r in rows.values() if r["tier"] in wanted]
+    selected.sort(key=lambda r: r["rank"])
+    return [r["symbol"] for r in selected]
+
+
+def note_fetch_results(failed: Iterable[str], succeeded: Iterable[str]) -> None:
+    """Track persistent fetch failures from intraday scans in the index."""
+    failed = list(failed)
+    rows = read_index()
+    succeeded = [s for s in succeeded if rows.get(s, {}).get("fail_count")]
+    if not rows or not (failed or succeeded):
+        return
+    with _index_lock():
+        # re-read under the lock (another process may have written since);
+        # copies, so a failed write leaves the cache intact
+        rows = {symbol: dict(row) for symbol, row in read_index().items()}
+        _update_fail_counts(rows, failed, succeeded)
+
+
+def _update_fail_counts(rows: Dict[str, Dict], failed: List[str], succeeded: List[str]) -> None:
+    changed = False
+    for symbol in failed:
+        row = rows.get(symbol)
+        if row is None:
+            continue
+        row["fail_count"] += 1
+        if row["fail_count"] >= UNIVERSE_QUARANTINE_FAILS and row["tier"] != "quarantined":
+            row["tier"] = "quarantined"
+            log.warning(f"{symbol}: quarantined after {row['fail_count']} failed fetches")
+        changed = True
+    for symbol in succeeded:
+        row = rows.get(symbol)
+        if row is not None and row["fail_count"]:
+            row["fail_count"] = 0
+            changed = True
+    if changed:
+        write_index(rows)
+
+
+def index_is_stale(now: Optional[datetime] = None) -> bool:
+    """True once today's session has closed and the index predates it."""
+    now = now or datetime.now(IST)
+    hour, minute = (int(p) for p in UNIVERSE_REBUILD_AFTER.split(":"))
+    if (now.hour, now.minute) < (hour, minute) or now.weekday() >= 5:
+        return False
+    try:
+        with open(_built_marker(), "r") as f:
+            built = datetime.fromisoformat(f.read().strip())
+    except (OSError, ValueError):
+        return True
+    return built.date() < now.date() or (built.hour, built.minute) < (hour, minute)
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.synthetic import generate_ohlcv  # noqa: E402
+from core.bars import Bars  # noqa: E402
+
+
+@pytest.fixture
+def frame():
+    """Five synthetic 5m sessions for one symbol."""
+    return generate_ohlcv("SYN0001")
+
+
+@pytest.fixture
+def bars(frame):
+    return Bars.from_frame(frame)
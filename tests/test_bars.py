@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+import pandas as pd
+
+from core.bars import Bars
+
+
+def _assert_same(a: Bars, b: Bars):
+    for name in Bars.__slots__[:-1]:
+        left, right = getattr(a, name), getattr(b, name)
+        assert left.dtype == right.dtype, name
+        np.testing.assert_array_equal(left, right, err_msg=name)
+    assert str(a.tz) == str(b.tz)
+
+
+def test_from_frame_drops_nan_rows(frame):
+    frame = frame.copy()
+    frame.iloc[3, frame.columns.get_loc("Close")] = np.nan
+    bars = Bars.from_frame(frame)
+    assert len(bars) == len(frame) - 1
+    assert bars.ts[3] == frame.index[4].value
+
+
+def test_to_frame_round_trip(frame, bars):
+    back = bars.to_frame()
+    pd.testing.assert_index_equal(back.index, frame.index.as_unit("ns"))
+    np.testing.assert_allclose(back["Close"], frame["Close"], rtol=1e-6)
+    np.testing.assert_array_equal(back["Volume"], frame["Volume"])
+    _assert_same(Bars.from_frame(back), bars)
+
+
+def test_payload_round_trip_through_json(bars):
+    payload = json.loads(json.dumps(bars.to_payload()))
+    restored = Bars.from_payload(payload)
+    _assert_same(restored, bars)
+    assert restored.timestamp(-1) == bars.timestamp(-1)
+    assert restored.session_start() == bars.session_start()
+
+
+def test_payload_round_trip_of_a_view(bars):
+    view = bars.tail(10)
+    restored = Bars.from_payload(view.to_payload())
+    _assert_same(restored, view.copy())
+
+
+def test_payload_round_trip_empty():
+    restored = Bars.from_payload(Bars.empty_bars().to_payload())
+    assert restored.empty
+    assert restored.tz is None
+
+
+def test_session_start_and_search(frame, bars):
+    last_day = frame.index[-1].date()
+    assert bars.session_start() == int((frame.index.date != last_day).sum())
+    assert bars.search(frame.index[7]) == 7
+    # naive stamps are read in the bars' timezone
+    assert bars.search(frame.index[7].tz_localize(None)) == 7
@@ -0,0 +1,57 @@
+import os
+import threading
+
+import pytest
+
+from core.positions import PositionBook
+from infra import database
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, "DB_PATH", os.path.join(tmp_path, "market.db"))
+    database.initialize_db()
+    return database
+
+
+def test_upsert_averages_cost_and_keeps_it_on_sells(db):
+    assert db.add_to_position("abc", 10, 100.0, "t1") == {"symbol": "ABC", "qty": 10, "price": 100.0, "timestamp": "t1"}
+    assert db.add_to_position("ABC", 10, 110.0, "t2")["price"] == pytest.approx(105.0)
+    row = db.add_to_position("ABC", -5, 0.0, "t3")
+    assert (row["qty"], row["price"], row["timestamp"]) == (15, pytest.approx(105.0), "t3")
+
+
+def test_upsert_closes_position_at_zero(db):
+    db.add_to_position("ABC", 10, 100.0, "t1")
+    assert db.add_to_position("ABC", -15, 0.0, "t2") is None
+    assert db.get_open_positions() == []
+    # a sale with no position leaves nothing behind either
+    assert db.add_to_position("XYZ", -1, 0.0, "t3") is None
+    assert db.get_open_positions() == []
+
+
+def test_concurrent_upserts_lose_no_update(db):
+    def buy():
+        for _ in range(25):
+            db.add_to_position("ABC", 1, 100.0, "t")
+
+    threads = [threading.Thread(target=buy) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    (row,) = db.get_open_positions()
+    assert row["qty"] == 100
+
+
+def test_book_sees_writes_from_other_connections(db):
+    book = PositionBook()
+    assert book.positions() == []
+    db.add_to_position("ABC", 2, 50.0, "t1")
+    assert [(p["symbol"], p["qty"]) for p in book.positions()] == [("ABC", 2)]
+    book.apply("abc", -2, 0.0)
+    assert book.symbols() == []
+    valued = PositionBook()
+    valued.apply("XYZ", 4, 10.0)
+    mtm = valued.mark_to_market({"XYZ": 12.0})
+    assert (mtm["cost"], mtm["value"], mtm["pnl"]) == (40.0, 48.0, 8.0)
@@ -0,0 +1,89 @@
+import os
+import random
+
+import pytest
+
+from bench.suite import offline_environment
+from bench.synthetic import generate_ohlcv, synthetic_symbols
+from core.feature_cache import cache as feature_cache
+from service import distributed, research
+from service.research import TopCandidates, _prioritise, _update_carryover
+
+
+@pytest.mark.parametrize("size", [0, 1, 5, 50])
+def test_top_candidates_match_stable_sort(size):
+    rng = random.Random(size)
+    # few distinct scores, so ties between symbols are common
+    offers = [(rng.choice([0.1, 0.2, 0.3, 0.4]), seq) for seq in range(40)]
+    top = TopCandidates(size)
+    traced = []
+    for score, seq in offers:
+        top.offer(score, seq, (f"S{seq}",), lambda seq=seq: traced.append(seq) or seq)
+    expected = sorted(offers, key=lambda o: o[0], reverse=True)[:size]
+    assert [(score, -neg_seq) for score, neg_seq, _, _ in top.ranked()] == expected
+    assert [trace for *_, trace in top.ranked()] == [seq for _, seq in expected]
+    assert top.seen == len(offers)
+    # traces are built only for offers that were kept at the time
+    assert set(seq for _, seq in expected) <= set(traced)
+    if size == 0:
+        assert traced == []
+
+
+@pytest.fixture
+def carryover(monkeypatch):
+    state = {}
+    monkeypatch.setattr(research, "_carryover", state)
+    return state
+
+
+def test_carryover_attempts_and_drop(carryover, monkeypatch):
+    monkeypatch.setattr(research, "SCAN_CARRYOVER_MAX_ATTEMPTS", 3)
+    _update_carryover(unreached=["A", "B"], failed=["C"], done=[])
+    assert carryover == {"A": 0, "B": 0, "C": 1}
+    assert research._carried("full", set()) == (["A", "B"], ["C"])
+    assert research._carried("portfolio", {"B", "C"}) == (["B"], ["C"])
+    _update_carryover(unreached=[], failed=["C"], done=["A"])
+    assert carryover == {"B": 0, "C": 2}
+    # a third timeout in a row stops carrying the symbol
+    _update_carryover(unreached=[], failed=["C"], done=["B"])
+    assert carryover == {}
+
+
+def test_carryover_is_capped(carryover, monkeypatch):
+    monkeypatch.setattr(research, "SCAN_CARRYOVER_MAX", 3)
+    _update_carryover(unreached=["A", "B", "C", "D", "E"], failed=[], done=[])
+    assert list(carryover) == ["C", "D", "E"]
+
+
+def test_prioritise_order():
+    symbols = ["A", "B", "C", "D", "E", "F"]
+    ordered = _prioritise(symbols, held={"E", "B"}, carry=["F", "B"], retry=["A", "F"])
+    assert ordered == ["B", "E", "F", "C", "D", "A"]
+    assert _prioritise(symbols, held=set()) == symbols
+
+
+def _summary(result):
+    return (
+        [(b["symbol"], b["price"], b["confidence"]) for b in result["buy_candidates"]],
+        [s["symbol"] for s in result["sell_candidates"]],
+        result["hold_candidates"],
+        result["filtered_buy_count"],
+        sorted(result["analysed_symbols"]),
+        result["skipped_symbols"],
+    )
+
+
+def test_sharded_scan_matches_in_process():
+    # enough symbols for some BUYs as well as SELL/HOLD on the held ones
+    symbols = synthetic_symbols(200)
+    frames = {symbol: generate_ohlcv(symbol) for symbol in symbols}
+    with offline_environment(frames, symbols[:4]) as tmp:
+        feature_cache.clear()
+        expected = research.perform_scan(symbols=symbols, top_n=5)
+        feature_cache.clear()
+        sharded = distributed.run_distributed_scan(
+            symbols=symbols, top_n=5, workers=2, shard_size=50, queue_path=os.path.join(tmp, "queue.db")
+        )
+    assert expected["buy_candidates"] and expected["hold_candidates"]
+    assert sharded["symbols_scanned"] == len(symbols)
+    assert _summary(sharded) == _summary(expected)
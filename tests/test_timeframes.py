@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.bars import Bars
+from core.timeframes import FIELDS, TimeframeCache, _aggregate, _base_arrays, resample_ohlcv
+
+
+def _assert_same(a, b):
+    assert set(a) == set(b)
+    for field in a:
+        np.testing.assert_array_equal(a[field], b[field], err_msg=field)
+
+
+def _full(bars: Bars, minutes: int):
+    return _aggregate(_base_arrays(bars), minutes)
+
+
+@pytest.mark.parametrize("tf, minutes", [("15m", 15), ("1h", 60)])
+def test_incremental_extension_matches_full(bars, tf, minutes):
+    cache = TimeframeCache(max_entries=8)
+    # grow one base bar at a time across partial buckets and a session boundary
+    for end in range(80, 160):
+        window = bars[:end]
+        _assert_same(cache.bars("SYN", tf, window), _full(window, minutes))
+    assert cache.stats["full"] == 1
+    assert cache.stats["incremental"] == 79
+
+
+@pytest.mark.parametrize("tf, minutes", [("15m", 15), ("1h", 60)])
+def test_sliding_window_matches_full(bars, tf, minutes):
+    cache = TimeframeCache(max_entries=8)
+    size = 150
+    for start in range(0, 40, 3):
+        window = bars[start:start + size]
+        _assert_same(cache.bars("SYN", tf, window), _full(window, minutes))
+    assert cache.stats["full"] == 1
+
+
+def test_unchanged_and_unrelated_frames(bars):
+    cache = TimeframeCache(max_entries=8)
+    cache.bars("SYN", "15m", bars[:100])
+    cache.bars("SYN", "15m", bars[:100])
+    assert cache.stats["unchanged"] == 1
+    # a frame that does not extend the cached one is aggregated from scratch
+    window = bars[200:300]
+    _assert_same(cache.bars("SYN", "15m", window), _full(window, 15))
+    assert cache.stats["full"] == 2
+
+
+def test_frames_covers_configured_timeframes(bars):
+    cache = TimeframeCache(max_entries=8)
+    frames = cache.frames("SYN", bars)
+    assert set(frames) == {"15m", "1h"}
+    frame = cache.frame("SYN", "1h")
+    assert frame.index.tz is not None
+    assert list(frame.columns) == list(FIELDS)
+
+
+def test_resample_matches_pandas(frame):
+    # hourly buckets anchored at the 09:15 session open, never spanning sessions
+    expected = (
+        frame.resample("60min", offset="15min")
+        .agg({"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"})
+        .dropna()
+    )
+    result = resample_ohlcv(frame, 60)
+    np.testing.assert_array_equal(result.index.as_unit("ns").asi8, expected.index.as_unit("ns").asi8)
+    for field in ("Open", "High", "Low", "Close"):
+        np.testing.assert_allclose(result[field], expected[field], rtol=1e-6, err_msg=field)
+    np.testing.assert_array_equal(result["Volume"], expected["Volume"].astype(np.int64))
+
+
+def test_resample_empty():
+    assert resample_ohlcv(pd.DataFrame(), 15).empty